@@ -1,14 +1,46 @@
 from django.contrib import admin
 from django.db import models
+from django.db.models import Count
+from django.utils.html import format_html, format_html_join
+from .analytics import get_item_analysis
+from . import search
+from .archive import restore_attempt
+from .rollover import promote
+from .pagination import EstimatedCountPaginator
 from .models import (
     Subject, Experiment, Question, UserProfile, LabProgress, QuestionAttempt,
-    Test, MCQQuestion, TestAttempt, TestResponse
+    Test, MCQQuestion, TestAttempt, TestResponse, CohortRollup, ArchivedAttempt
 )
 
+def _format_stat(value):
+    return '-' if value is None else f"{value:.3f}"
+
+def _format_frequencies(frequencies):
+    return ', '.join(f"{label}: {count}" for label, count in frequencies.items())
+
 class QuestionInline(admin.TabularInline):
     model = Question
     extra = 1
 
+class TestListFilter(admin.SimpleListFilter):
+    """Filter by test using titles only, without loading each test's subject"""
+    title = 'test'
+    parameter_name = 'test__id__exact'
+    
+    def lookups(self, request, model_admin):
+        return Test.objects.order_by('title').values_list('id', 'title')
+    
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(test_id=self.value())
+        return queryset
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow with every submission"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
 @admin.register(Subject)
 class SubjectAdmin(admin.ModelAdmin):
     list_display = ('name', 'created_at', 'updated_at')
@@ -18,6 +50,7 @@ class SubjectAdmin(admin.ModelAdmin):
 class ExperimentAdmin(admin.ModelAdmin):
     list_display = ('title', 'subject', 'created_at', 'updated_at')
     list_filter = ('subject', 'created_at')
+    list_select_related = ('subject',)
     search_fields = ('title', 'objective', 'theory')
     inlines = [QuestionInline]
     fieldsets = (
@@ -35,6 +68,13 @@ class ExperimentAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of icontains scans over TextFields
+        if search_term and search.is_supported():
+            ids = search.search_ids(search_term, search.KIND_EXPERIMENT)
+            return (queryset.none() if ids is None else queryset.filter(pk__in=ids)), False
+        return super().get_search_results(request, queryset, search_term)
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -42,6 +82,7 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ('role', 'branch', 'current_semester', 'division', 'is_profile_complete')
     search_fields = ('full_name', 'roll_no', 'user__email')
     readonly_fields = ('created_at', 'updated_at')
+    raw_id_fields = ('user',)
     fieldsets = (
         ('User Information', {
             'fields': ('user', 'full_name', 'roll_no', 'role')
@@ -56,19 +97,32 @@ class UserProfileAdmin(admin.ModelAdmin):
             'fields': ('is_profile_complete', 'created_at', 'updated_at')
         }),
     )
+    actions = ['promote_to_next_semester']
+    
+    @admin.action(description='Promote selected students to the next semester')
+    def promote_to_next_semester(self, request, queryset):
+        counts = promote(queryset)
+        self.message_user(
+            request, f"Promoted {counts['promoted']} students; {counts['held']} stay in the final semester.",
+        )
 
 @admin.register(LabProgress)
-class LabProgressAdmin(admin.ModelAdmin):
+class LabProgressAdmin(LargeTableAdmin):
     list_display = ('student', 'experiment', 'status', 'last_accessed')
     list_filter = ('status', 'last_accessed')
+    list_select_related = ('student', 'experiment__subject')
     search_fields = ('student__username', 'student__email', 'experiment__title')
     readonly_fields = ('started_at', 'last_accessed', 'completed_at')
+    autocomplete_fields = ('student', 'experiment')
 
 @admin.register(QuestionAttempt)
-class QuestionAttemptAdmin(admin.ModelAdmin):
+class QuestionAttemptAdmin(LargeTableAdmin):
     list_display = ('student', 'question', 'is_correct', 'attempted_at')
     list_filter = ('is_correct', 'attempted_at')
+    list_select_related = ('student', 'question')
     search_fields = ('student__username', 'student__email', 'question__question_text')
+    autocomplete_fields = ('student',)
+    raw_id_fields = ('question',)
 
 # MCQ Test Admin Classes
 class MCQQuestionInline(admin.TabularInline):
@@ -84,9 +138,12 @@ class MCQQuestionInline(admin.TabularInline):
 class TestAdmin(admin.ModelAdmin):
     list_display = ('title', 'experiment', 'subject', 'difficulty', 'question_count', 'passing_score_display', 'is_active', 'created_at')
     list_filter = ('difficulty', 'is_active', 'subject', 'created_at')
+    list_select_related = ('experiment__subject', 'subject')
     search_fields = ('title', 'description', 'subject__name', 'experiment__title')
     inlines = [MCQQuestionInline]
-    readonly_fields = ('created_at', 'updated_at', 'total_marks')
+    autocomplete_fields = ('experiment',)
+    raw_id_fields = ('created_by',)
+    readonly_fields = ('created_at', 'updated_at', 'total_marks', 'item_analysis_report')
     
     fieldsets = (
         ('Basic Information', {
@@ -97,7 +154,7 @@ class TestAdmin(admin.ModelAdmin):
             'description': 'Select an experiment to associate this test with. The subject will be auto-filled.'
         }),
         ('Test Configuration', {
-            'fields': ('difficulty', 'duration', 'passing_marks', 'is_active')
+            'fields': ('difficulty', 'duration', 'passing_marks', 'questions_per_attempt', 'shuffle_options', 'is_active')
         }),
         ('Auto-calculated Fields', {
             'fields': ('total_marks',),
@@ -108,8 +165,16 @@ class TestAdmin(admin.ModelAdmin):
             'fields': ('created_by', 'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
+        ('Item Analysis', {
+            'fields': ('item_analysis_report',),
+            'classes': ('collapse',),
+            'description': 'Statistics computed from all completed attempts of this test.'
+        }),
     )
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_question_count=Count('mcq_questions'))
+    
     def save_model(self, request, obj, form, change):
         if not change:  # Only set created_by for new objects
             obj.created_by = request.user
@@ -143,8 +208,9 @@ class TestAdmin(admin.ModelAdmin):
         return readonly
     
     def question_count(self, obj):
-        return obj.mcq_questions.count()
+        return obj._question_count
     question_count.short_description = 'Questions'
+    question_count.admin_order_field = '_question_count'
     
     def passing_score_display(self, obj):
         if obj.total_marks > 0:
@@ -152,29 +218,104 @@ class TestAdmin(admin.ModelAdmin):
             return f"{obj.passing_marks}/{obj.total_marks} ({percentage:.1f}%)"
         return f"{obj.passing_marks}/0 (0%)"
     passing_score_display.short_description = 'Passing Score'
+    
+    def item_analysis_report(self, obj):
+        if not obj or not obj.pk:
+            return '-'
+        analysis = get_item_analysis(obj)
+        if not analysis['attempt_count']:
+            return 'No completed attempts yet.'
+        
+        questions = obj.mcq_questions.only('id', 'order', 'correct_option')
+        rows = format_html_join(
+            '',
+            '<tr><td>Q{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>',
+            (
+                (
+                    question.order,
+                    question.correct_option,
+                    _format_stat(item['difficulty']),
+                    _format_stat(item['discrimination']),
+                    _format_stat(item['group_index']),
+                    _format_frequencies(item['frequencies']),
+                )
+                for question in questions
+                for item in [analysis['items'].get(question.id)]
+                if item
+            )
+        )
+        return format_html(
+            '<p>Attempts: {} | Mean score: {} | KR-20: {}</p>'
+            '<table><thead><tr><th>Question</th><th>Key</th><th>Difficulty (p)</th>'
+            '<th>Point-biserial</th><th>Upper-lower</th><th>Option counts</th></tr></thead>'
+            '<tbody>{}</tbody></table>',
+            analysis['attempt_count'],
+            analysis['mean_score'],
+            _format_stat(analysis['kr20']),
+            rows,
+        )
+    item_analysis_report.short_description = 'Item Statistics'
 
 @admin.register(MCQQuestion)
 class MCQQuestionAdmin(admin.ModelAdmin):
     list_display = ('test', 'order', 'question_text_preview', 'correct_option', 'marks')
-    list_filter = ('test', 'correct_option', 'marks')
+    list_filter = (TestListFilter, 'correct_option', 'marks')
+    list_select_related = ('test__subject',)
     search_fields = ('question_text', 'test__title')
     ordering = ('test', 'order')
+    autocomplete_fields = ('test',)
+    readonly_fields = ('difficulty_index', 'discrimination_index', 'distractor_frequencies')
+    
+    def get_search_results(self, request, queryset, search_term):
+        # Use the full-text index instead of icontains scans over TextFields
+        if search_term and search.is_supported():
+            ids = search.search_ids(search_term, search.KIND_MCQ)
+            return (queryset.none() if ids is None else queryset.filter(pk__in=ids)), False
+        return super().get_search_results(request, queryset, search_term)
     
     def question_text_preview(self, obj):
         return obj.question_text[:50] + "..." if len(obj.question_text) > 50 else obj.question_text
     question_text_preview.short_description = 'Question Preview'
+    
+    def _item_stats(self, obj):
+        if not obj or not obj.pk:
+            return None
+        return get_item_analysis(obj.test)['items'].get(obj.pk)
+    
+    def difficulty_index(self, obj):
+        item = self._item_stats(obj)
+        return _format_stat(item['difficulty']) if item else '-'
+    difficulty_index.short_description = 'Difficulty (p-value)'
+    
+    def discrimination_index(self, obj):
+        item = self._item_stats(obj)
+        if not item:
+            return '-'
+        return f"{_format_stat(item['discrimination'])} (upper-lower: {_format_stat(item['group_index'])})"
+    discrimination_index.short_description = 'Discrimination (point-biserial)'
+    
+    def distractor_frequencies(self, obj):
+        item = self._item_stats(obj)
+        return _format_frequencies(item['frequencies']) if item else '-'
+    distractor_frequencies.short_description = 'Option Counts'
 
 class TestResponseInline(admin.TabularInline):
     model = TestResponse
     extra = 0
     readonly_fields = ('question', 'selected_option', 'is_correct', 'answered_at')
+    raw_id_fields = ('question',)
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('question', 'attempt__student__profile')
 
 @admin.register(TestAttempt)
-class TestAttemptAdmin(admin.ModelAdmin):
+class TestAttemptAdmin(LargeTableAdmin):
     list_display = ('student', 'test', 'status', 'score', 'total_marks', 'percentage', 'is_passed', 'started_at')
-    list_filter = ('status', 'test', 'started_at')
+    list_filter = ('status', TestListFilter, 'started_at')
+    list_select_related = ('student', 'test__subject')
     search_fields = ('student__username', 'student__email', 'test__title')
     readonly_fields = ('started_at', 'completed_at', 'percentage', 'is_passed')
+    autocomplete_fields = ('student', 'test')
     inlines = [TestResponseInline]
     
     def get_readonly_fields(self, request, obj=None):
@@ -185,7 +326,48 @@ class TestAttemptAdmin(admin.ModelAdmin):
         return readonly
 
 @admin.register(TestResponse)
-class TestResponseAdmin(admin.ModelAdmin):
+class TestResponseAdmin(LargeTableAdmin):
     list_display = ('attempt', 'question', 'selected_option', 'is_correct', 'answered_at')
     list_filter = ('is_correct', 'selected_option', 'answered_at')
+    list_select_related = ('attempt__student__profile', 'attempt__test', 'question')
     search_fields = ('attempt__student__username', 'question__question_text')
+    raw_id_fields = ('attempt', 'question')
+
+@admin.register(ArchivedAttempt)
+class ArchivedAttemptAdmin(LargeTableAdmin):
+    list_display = ('student', 'test', 'score', 'total_marks', 'percentage', 'response_count', 'completed_at', 'archived_at')
+    list_filter = (TestListFilter, 'completed_at')
+    list_select_related = ('student', 'test__subject')
+    search_fields = ('student__username', 'student__email', 'test__title')
+    exclude = ('responses',)
+    actions = ['restore']
+    
+    def get_queryset(self, request):
+        # The packed responses are only needed when restoring
+        return super().get_queryset(request).defer('responses')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    @admin.action(description='Restore selected attempts to the live tables')
+    def restore(self, request, queryset):
+        count = 0
+        for archived in queryset:
+            restore_attempt(archived)
+            count += 1
+        self.message_user(request, f'Restored {count} attempts.')
+
+@admin.register(CohortRollup)
+class CohortRollupAdmin(admin.ModelAdmin):
+    list_display = ('branch', 'semester', 'division', 'subject', 'student_count', 'avg_score', 'pass_rate', 'completion_rate', 'p50', 'computed_at')
+    list_filter = ('branch', 'semester', 'division')
+    list_select_related = ('subject',)
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
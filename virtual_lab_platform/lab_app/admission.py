@@ -0,0 +1,160 @@
+"""
+Admission control for request storms.
+
+When a whole division opens or submits a test at once, every request
+would go straight to the database. ``admission_control`` puts two limits
+in front of a view, per scope (a test, say), kept in the cache so every
+worker sharing the cache sees the same counts:
+
+* a token bucket: ``burst`` tokens, refilled every ``burst / rate``
+  seconds, so at most ``rate`` requests per second on average get in,
+  in bursts of up to ``burst``;
+* a concurrency limit: at most ``concurrency`` requests of the scope run
+  the view at the same time.
+
+A request over either limit does not touch the database. It gets a small
+"you're in the queue" page with status 503 and ``Retry-After``. The page
+waits that long, with some jitter, and retries by itself; a POST is
+submitted again with the same form data, so answers are not lost. Clients
+asking for JSON get ``{"queued": true, "retry_after": n}``.
+
+Limits are set per view in ``settings.ADMISSION_CONTROL``; a view without
+an entry is not limited. Admitted and queued requests are counted per
+view, for ``admission_metrics``. Counters use ``cache.add`` and
+``cache.incr``, which are atomic in the shared cache backends. With the
+default local-memory cache each process enforces its own limits.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.shortcuts import render
+
+# Keeps a concurrency counter from staying high if a worker dies mid-request
+SLOT_TIMEOUT = 5 * 60
+METRICS_TIMEOUT = 7 * 24 * 3600
+# Retry-After for requests queued by the concurrency limit
+CONCURRENCY_RETRY_AFTER = 2
+
+OUTCOMES = ('admitted', 'rate_limited', 'concurrency_limited')
+
+
+def get_limits(name):
+    """The view's limits from ``settings.ADMISSION_CONTROL``, or None"""
+    limits = getattr(settings, 'ADMISSION_CONTROL', {}).get(name)
+    if not limits:
+        return None
+    return {'rate': limits.get('rate'), 'burst': limits.get('burst') or limits.get('rate'),
+            'concurrency': limits.get('concurrency')}
+
+
+def _key(*parts):
+    return 'lab_app:admission:' + ':'.join(str(part) for part in parts)
+
+
+def _incr(key, timeout):
+    """Atomically add one to a counter created on first use"""
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:  # expired between add() and incr()
+        cache.add(key, 1, timeout)
+        return 1
+
+
+def _take_token(name, scope, rate, burst):
+    """Return 0 if a token was taken, else the seconds until the bucket refills"""
+    period = burst / rate
+    now = time.time()
+    window = int(now // period)
+    if _incr(_key('bucket', name, scope, window), math.ceil(period) + 1) <= burst:
+        return 0
+    return max(1, math.ceil((window + 1) * period - now))
+
+
+def _acquire_slot(name, scope, concurrency):
+    key = _key('active', name, scope)
+    if _incr(key, SLOT_TIMEOUT) <= concurrency:
+        return key
+    _release_slot(key)
+    return None
+
+
+def _release_slot(key):
+    try:
+        cache.decr(key)
+    except ValueError:  # the counter expired meanwhile
+        pass
+
+
+def _record(name, outcome):
+    _incr(_key('metrics', name, outcome), METRICS_TIMEOUT)
+
+
+def metrics(names=None):
+    """Admission counts and limits per limited view"""
+    names = names or list(getattr(settings, 'ADMISSION_CONTROL', {}))
+    counts = cache.get_many([_key('metrics', name, outcome) for name in names for outcome in OUTCOMES])
+    return {
+        name: {
+            'limits': get_limits(name),
+            **{outcome: counts.get(_key('metrics', name, outcome), 0) for outcome in OUTCOMES},
+        }
+        for name in names
+    }
+
+
+def queued_response(request, retry_after):
+    """The lightweight 503 a queued request gets; renders no database data"""
+    if 'application/json' in request.headers.get('Accept', ''):
+        response = JsonResponse({'queued': True, 'retry_after': retry_after}, status=503)
+    else:
+        response = render(request, 'admission_queue.html', {
+            'retry_after': retry_after,
+            'method': request.method,
+            # Re-posted as is, CSRF token included
+            'form_data': list(request.POST.lists()) if request.method == 'POST' else [],
+        }, status=503)
+    response['Retry-After'] = str(retry_after)
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def admission_control(name, scope=None):
+    """
+    Limit a view as configured in ``settings.ADMISSION_CONTROL[name]``.
+    ``scope(request, *args, **kwargs)`` returns the key the limits apply
+    to, such as the test id taken from the URL; by default the limits
+    apply to the view as a whole. Put it above ``login_required`` and the
+    like, so queued requests skip them too.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            limits = get_limits(name)
+            if limits is None:
+                return view_func(request, *args, **kwargs)
+            key = scope(request, *args, **kwargs) if scope else 'all'
+
+            if limits['rate']:
+                retry_after = _take_token(name, key, limits['rate'], limits['burst'])
+                if retry_after:
+                    _record(name, 'rate_limited')
+                    return queued_response(request, retry_after)
+            slot = None
+            if limits['concurrency']:
+                slot = _acquire_slot(name, key, limits['concurrency'])
+                if slot is None:
+                    _record(name, 'concurrency_limited')
+                    return queued_response(request, CONCURRENCY_RETRY_AFTER)
+            _record(name, 'admitted')
+            try:
+                return view_func(request, *args, **kwargs)
+            finally:
+                if slot is not None:
+                    _release_slot(slot)
+        return wrapper
+    return decorator
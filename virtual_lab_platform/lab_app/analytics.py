@@ -0,0 +1,326 @@
+"""
+Analytics for MCQ tests and student cohorts.
+
+Item statistics are computed from the response matrix of completed
+attempts (one row per attempt, one column per question) using NumPy.
+Attempts of a test that draws its questions from a bank
+(lab_app/question_pool.py) only count for the questions they were shown.
+NumPy is imported by the functions that use it: this module is loaded
+with the admin on every start-up and management command, and NumPy
+alone took longer to import than the rest of the project.
+Cohort rollups aggregate test results and lab progress per branch,
+semester, division and subject into ``CohortRollup`` rows.
+"""
+import hashlib
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from .models import (
+    CohortRollup, Experiment, LabProgress, MCQQuestion, Subject, TestAttempt,
+    TestResponse, UserProfile
+)
+from .question_pool import decode_ids
+
+# Option letters are encoded as small integers; 0 means "not answered"
+OPTION_CODES = {'A': 1, 'B': 2, 'C': 3, 'D': 4}
+OPTION_LABELS = ['Blank', 'A', 'B', 'C', 'D']
+
+# Classic upper/lower group size for the discrimination index
+GROUP_FRACTION = 0.27
+
+ITEM_ANALYSIS_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def load_response_matrix(test):
+    """
+    Load the responses of all completed attempts of a test.
+
+    Returns (attempt_ids, question_ids, keys, choices, shown) where
+    ``choices`` is an (attempts x questions) int8 array of option codes,
+    ``shown`` a boolean array of the same shape marking the questions each
+    attempt was asked (all of them, unless the attempt drew a sample of
+    the bank), both id arrays are sorted and ``keys`` holds the code of
+    the correct option for each question.
+    """
+    import numpy as np
+
+    questions = list(
+        MCQQuestion.objects.filter(test=test)
+        .order_by('id')
+        .values_list('id', 'correct_option')
+    )
+    question_ids = np.array([q[0] for q in questions], dtype=np.int64)
+    keys = np.array([OPTION_CODES.get(q[1], 0) for q in questions], dtype=np.int8)
+
+    rows = list(
+        TestResponse.objects.filter(
+            attempt__test=test,
+            attempt__status='completed',
+        ).values_list('attempt_id', 'question_id', 'selected_option')
+    )
+    attempts = list(
+        TestAttempt.objects.filter(test=test, status='completed')
+        .order_by('id')
+        .values_list('id', 'draw')
+    )
+    attempt_ids = np.array([a[0] for a in attempts], dtype=np.int64)
+
+    shown = np.ones((len(attempt_ids), len(question_ids)), dtype=bool)
+    if len(question_ids):
+        for row, (_, draw) in enumerate(attempts):
+            if draw is None:
+                continue
+            drawn = np.array(decode_ids(draw), dtype=np.int64)
+            col_idx = np.searchsorted(question_ids, drawn).clip(max=len(question_ids) - 1)
+            shown[row] = False
+            # Questions deleted since the draw are not in the matrix
+            shown[row, col_idx[question_ids[col_idx] == drawn]] = True
+
+    choices = np.zeros((len(attempt_ids), len(question_ids)), dtype=np.int8)
+    if rows and len(question_ids) and len(attempt_ids):
+        resp_attempts = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        resp_questions = np.fromiter((r[1] for r in rows), dtype=np.int64, count=len(rows))
+        resp_codes = np.fromiter(
+            (OPTION_CODES.get(r[2], 0) for r in rows), dtype=np.int8, count=len(rows)
+        )
+        row_idx = np.searchsorted(attempt_ids, resp_attempts).clip(max=len(attempt_ids) - 1)
+        col_idx = np.searchsorted(question_ids, resp_questions).clip(max=len(question_ids) - 1)
+        # Ignore rows that appeared between the queries
+        known = (attempt_ids[row_idx] == resp_attempts) & (question_ids[col_idx] == resp_questions)
+        choices[row_idx[known], col_idx[known]] = resp_codes[known]
+
+    return attempt_ids, question_ids, keys, choices, shown
+
+
+def compute_item_statistics(keys, choices, shown=None):
+    """
+    Compute per-item and test-level statistics from a response matrix.
+
+    Returns a dict with the KR-20 reliability, mean total score and, per
+    item, the number of attempts that were shown it, the difficulty
+    (p-value), corrected point-biserial discrimination, upper/lower group
+    index and option frequencies. Each item's statistics only use the
+    attempts ``shown`` it (default: every attempt saw every item); KR-20
+    assumes a common form, so it is left out when they did not.
+    """
+    import numpy as np
+
+    n_attempts, n_items = choices.shape
+    if shown is None:
+        shown = np.ones(choices.shape, dtype=bool)
+    weights = shown.astype(np.float64)
+    seen = shown.sum(axis=0)
+    correct = (choices == keys[np.newaxis, :]) & (choices != 0) & shown
+    scored = correct.astype(np.float64)
+    totals = scored.sum(axis=1)
+
+    frequencies = (
+        (choices[:, :, np.newaxis] == np.arange(len(OPTION_LABELS))) & shown[:, :, np.newaxis]
+    ).sum(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p_values = scored.sum(axis=0) / seen
+
+        # Correlate each item with the total of the *other* items so that an
+        # item does not inflate its own discrimination.
+        rest = totals[:, np.newaxis] - scored
+        item_dev = (scored - p_values) * weights
+        rest_dev = (rest - (rest * weights).sum(axis=0) / seen) * weights
+        denom = np.sqrt((item_dev ** 2).sum(axis=0) * (rest_dev ** 2).sum(axis=0))
+        point_biserial = np.where(denom > 0, (item_dev * rest_dev).sum(axis=0) / denom, np.nan)
+
+    group_index = np.full(n_items, np.nan)
+    for idx in range(n_items):
+        rows = np.flatnonzero(shown[:, idx])
+        if not len(rows):
+            continue
+        group_size = max(1, int(round(len(rows) * GROUP_FRACTION)))
+        order = rows[np.argsort(totals[rows], kind='stable')]
+        group_index[idx] = scored[order[-group_size:], idx].mean() - scored[order[:group_size], idx].mean()
+
+    kr20 = None
+    if n_attempts > 1 and n_items > 1 and shown.all():
+        total_variance = totals.var()
+        if total_variance > 0:
+            kr20 = float(n_items / (n_items - 1) * (1 - (p_values * (1 - p_values)).sum() / total_variance))
+
+    def _clean(value):
+        return None if np.isnan(value) else round(float(value), 3)
+
+    items = []
+    for idx in range(n_items):
+        items.append({
+            'attempts': int(seen[idx]),
+            'difficulty': _clean(p_values[idx]),
+            'discrimination': _clean(point_biserial[idx]),
+            'group_index': _clean(group_index[idx]),
+            'frequencies': dict(zip(OPTION_LABELS, frequencies[idx].tolist())),
+        })
+
+    return {
+        'attempt_count': n_attempts,
+        'kr20': round(kr20, 3) if kr20 is not None else None,
+        'mean_score': round(float(totals.mean()), 2) if n_attempts else None,
+        'items': items,
+    }
+
+
+def _item_analysis_version(test):
+    """
+    Identify the data an item analysis was computed from: the completed
+    attempts and the question set with its answer key. Questions added,
+    removed or re-keyed (bulk updates included) change the version.
+    """
+    attempts = TestAttempt.objects.filter(test=test, status='completed').aggregate(
+        count=Count('id'), latest=Max('id'),
+    )
+    answer_key = MCQQuestion.objects.filter(test=test).order_by('id').values_list('id', 'correct_option')
+    digest = hashlib.sha1(repr(list(answer_key)).encode()).hexdigest()[:16]
+    return f"{attempts['count']}:{attempts['latest']}:{digest}"
+
+
+def get_item_analysis(test):
+    """
+    Return the item analysis for a test, cached per version of its
+    attempts and answer key (see ``_item_analysis_version``).
+
+    The result dict has the same shape as ``compute_item_statistics`` but
+    ``items`` is keyed by question id.
+    """
+    cache_key = f'lab_app:item_analysis:{test.pk}:{_item_analysis_version(test)}'
+    analysis = cache.get(cache_key)
+    if analysis is None:
+        _, question_ids, keys, choices, shown = load_response_matrix(test)
+        analysis = compute_item_statistics(keys, choices, shown)
+        analysis['items'] = dict(zip(question_ids.tolist(), analysis['items']))
+        cache.set(cache_key, analysis, ITEM_ANALYSIS_CACHE_TIMEOUT)
+    return analysis
+
+
+ROLLUP_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _summarize_scores(scores, passed):
+    """Average, pass rate and percentiles of a group of best scores"""
+    import numpy as np
+
+    if not len(scores):
+        return {'avg_score': None, 'pass_rate': None, **{f'p{q}': None for q in ROLLUP_PERCENTILES}}
+    percentiles = np.percentile(scores, ROLLUP_PERCENTILES)
+    summary = {
+        'avg_score': round(float(scores.mean()), 2),
+        'pass_rate': round(float(passed.mean() * 100), 2),
+    }
+    for q, value in zip(ROLLUP_PERCENTILES, percentiles):
+        summary[f'p{q}'] = round(float(value), 2)
+    return summary
+
+
+def build_cohort_rollups():
+    """
+    Recompute every ``CohortRollup`` row.
+
+    A cohort is the set of students sharing branch, current semester and
+    division; its subjects are the active subjects of that branch and
+    semester. Scores use each student's best completed attempt per test.
+    Returns the number of rows written.
+    """
+    import numpy as np
+
+    students = UserProfile.objects.filter(role='student', user__is_staff=False).values_list(
+        'user_id', 'branch', 'current_semester', 'division'
+    )
+    student_cohort = {}
+    cohort_sizes = defaultdict(int)
+    for user_id, branch, semester, division in students:
+        cohort = (branch, semester, division or '')
+        student_cohort[user_id] = cohort
+        cohort_sizes[cohort] += 1
+
+    subjects_by_catalog = defaultdict(list)
+    for subject_id, branch, semester in Subject.objects.filter(is_active=True).values_list('id', 'branch', 'semester'):
+        subjects_by_catalog[(branch, semester)].append(subject_id)
+
+    experiment_counts = dict(
+        Experiment.objects.filter(is_active=True, subject__is_active=True)
+        .values('subject_id')
+        .annotate(total=Count('id'))
+        .values_list('subject_id', 'total')
+    )
+
+    # Best attempt per (student, test), aggregated in the database
+    best_results = (
+        TestAttempt.objects.filter(status='completed', test__subject__is_active=True)
+        .values('student_id', 'test_id')
+        .annotate(
+            best_pct=Max('percentage'),
+            best_score=Max('score'),
+            subject_id=F('test__subject_id'),
+            passing_marks=F('test__passing_marks'),
+            test_marks=F('test__total_marks'),
+        )
+        .values_list('student_id', 'subject_id', 'best_pct', 'best_score', 'passing_marks', 'test_marks')
+    )
+    scores = defaultdict(list)
+    passes = defaultdict(list)
+    for student_id, subject_id, best_pct, best_score, passing_marks, test_marks in best_results:
+        cohort = student_cohort.get(student_id)
+        if cohort is None:
+            continue
+        scores[(cohort, subject_id)].append(best_pct)
+        # Compared as percentages (with slack for float rounding): attempts
+        # drawn from a question bank cover fewer marks than the test
+        if test_marks:
+            passed = best_pct >= passing_marks / test_marks * 100 - 1e-9
+        else:
+            passed = best_score >= passing_marks
+        passes[(cohort, subject_id)].append(passed)
+
+    completed = defaultdict(int)
+    completed_rows = (
+        LabProgress.objects.filter(status='completed', experiment__is_active=True)
+        .values('student_id', 'experiment__subject_id')
+        .annotate(done=Count('id'))
+        .values_list('student_id', 'experiment__subject_id', 'done')
+    )
+    for student_id, subject_id, done in completed_rows:
+        cohort = student_cohort.get(student_id)
+        if cohort is not None:
+            completed[(cohort, subject_id)] += done
+
+    now = timezone.now()
+    rollups = []
+    for cohort, size in cohort_sizes.items():
+        branch, semester, division = cohort
+        subject_ids = subjects_by_catalog.get((branch, semester), [])
+        # None stands for the cohort-wide row over all subjects
+        for subject_id in subject_ids + [None]:
+            scope = subject_ids if subject_id is None else [subject_id]
+            cohort_scores = np.array(
+                [s for sid in scope for s in scores.get((cohort, sid), [])], dtype=np.float64
+            )
+            cohort_passes = np.array(
+                [p for sid in scope for p in passes.get((cohort, sid), [])], dtype=bool
+            )
+            possible = size * sum(experiment_counts.get(sid, 0) for sid in scope)
+            done = sum(completed.get((cohort, sid), 0) for sid in scope)
+            rollups.append(CohortRollup(
+                branch=branch,
+                semester=semester,
+                division=division,
+                subject_id=subject_id,
+                student_count=size,
+                result_count=len(cohort_scores),
+                completion_rate=round(done / possible * 100, 2) if possible else None,
+                computed_at=now,
+                **_summarize_scores(cohort_scores, cohort_passes),
+            ))
+
+    with transaction.atomic():
+        CohortRollup.objects.all().delete()
+        CohortRollup.objects.bulk_create(rollups, batch_size=500)
+    return len(rollups)
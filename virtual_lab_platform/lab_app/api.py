@@ -0,0 +1,242 @@
+"""
+Read-only JSON API for the mobile client and the dashboards.
+
+Every endpoint needs a logged-in session and answers with ``values()``
+rows rather than serialised model instances. ``?fields=a,b`` trims rows
+to the listed fields (each endpoint has a small default set). Attempts
+are paged with an opaque cursor over ``(completed_at, id)``: every page
+is an index range scan, and new attempts do not shift the pages a client
+already has. ``dashboard`` returns all dashboard widgets in one response.
+"""
+import asyncio
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db.models import Avg, Count, Exists, F, OuterRef, Q
+from django.http import JsonResponse
+
+from .archive import attempt_history
+from .async_utils import gather_queries
+from .models import Experiment, LabProgress, Subject, Test, TestAttempt, UserProfile
+from .pagination import decode_cursor, encode_cursor
+from .routers import read_from_replica
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def _load_profile(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Authentication required.', 401)
+    profile = UserProfile.objects.filter(user=request.user).first()
+    if profile is None or not profile.is_profile_complete:
+        raise ApiError('Complete your profile first.', 403)
+    return profile
+
+
+def api_view(view_func):
+    """GET-only JSON endpoint for a logged-in user with a complete profile"""
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return _error('Method not allowed.', 405)
+            try:
+                profile = await sync_to_async(_load_profile)(request)
+                return JsonResponse(await view_func(request, profile, *args, **kwargs))
+            except ApiError as e:
+                return _error(str(e), e.status)
+    else:
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return _error('Method not allowed.', 405)
+            try:
+                return JsonResponse(view_func(request, _load_profile(request), *args, **kwargs))
+            except ApiError as e:
+                return _error(str(e), e.status)
+    return read_from_replica(wrapper)
+
+
+def _selected(request, available, default):
+    """Field names from ``?fields=``, checked against ``available``"""
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(default)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}.")
+    return names
+
+
+def _value_args(available, names):
+    """
+    ``values()`` arguments for public field names, mapped to lookups or
+    expressions in ``available`` (a plain model field maps to itself).
+    """
+    plain = [name for name in names if available[name] == name]
+    aliased = {name: available[name] for name in names if available[name] != name}
+    return plain, {name: F(lookup) if isinstance(lookup, str) else lookup for name, lookup in aliased.items()}
+
+
+def _values(queryset, available, names):
+    plain, aliased = _value_args(available, names)
+    return queryset.values(*plain, **aliased)
+
+
+def _int_param(request, name, default=None):
+    value = request.GET.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f'{name} must be an integer.')
+
+
+def _catalog(profile):
+    return Subject.objects.filter(semester=profile.current_semester, branch=profile.branch, is_active=True)
+
+
+SUBJECT_FIELDS = {
+    'id': 'id', 'name': 'name', 'description': 'description', 'semester': 'semester', 'branch': 'branch',
+    'experiment_count': Count('experiments', filter=Q(experiments__is_active=True)),
+}
+SUBJECT_DEFAULT = ('id', 'name', 'experiment_count')
+
+
+@api_view
+def subjects(request, profile):
+    """The subjects of the student's branch and semester"""
+    names = _selected(request, SUBJECT_FIELDS, SUBJECT_DEFAULT)
+    return {'results': list(_values(_catalog(profile), SUBJECT_FIELDS, names))}
+
+
+EXPERIMENT_FIELDS = {
+    'id': 'id', 'subject_id': 'subject_id', 'title': 'title', 'objective': 'objective', 'theory': 'theory',
+    'procedure': 'procedure', 'simulation_url': 'simulation_url',
+    'has_test': Exists(Test.objects.filter(experiment=OuterRef('pk'), is_active=True)),
+}
+EXPERIMENT_DEFAULT = ('id', 'title', 'has_test')
+
+
+@api_view
+def subject_experiments(request, profile, subject_id):
+    """Active experiments of one subject in the student's catalog"""
+    if not _catalog(profile).filter(id=subject_id).exists():
+        raise ApiError('Subject not found.', 404)
+    names = _selected(request, EXPERIMENT_FIELDS, EXPERIMENT_DEFAULT)
+    experiments = Experiment.objects.filter(subject_id=subject_id, is_active=True)
+    return {'results': list(_values(experiments, EXPERIMENT_FIELDS, names))}
+
+
+PROGRESS_FIELDS = {
+    'experiment_id': 'experiment_id', 'experiment_title': 'experiment__title',
+    'subject_id': 'experiment__subject_id', 'status': 'status', 'started_at': 'started_at',
+    'last_accessed': 'last_accessed', 'completed_at': 'completed_at',
+}
+PROGRESS_DEFAULT = ('experiment_id', 'status', 'completed_at')
+
+
+@api_view
+def progress(request, profile):
+    """The user's lab progress, optionally for one ``?subject=`` or ``?status=``"""
+    names = _selected(request, PROGRESS_FIELDS, PROGRESS_DEFAULT)
+    rows = LabProgress.objects.filter(student=request.user).order_by('-last_accessed')
+    subject_id = _int_param(request, 'subject')
+    if subject_id is not None:
+        rows = rows.filter(experiment__subject_id=subject_id)
+    if request.GET.get('status'):
+        rows = rows.filter(status=request.GET['status'])
+    return {'results': list(_values(rows, PROGRESS_FIELDS, names))}
+
+
+ATTEMPT_FIELDS = {
+    'test_id': 'test_id', 'test_title': 'test__title', 'subject_id': 'test__subject_id',
+    'score': 'score', 'total_marks': 'total_marks', 'percentage': 'percentage',
+    'time_taken': 'time_taken', 'started_at': 'started_at',
+}
+ATTEMPT_DEFAULT = ('test_id', 'test_title', 'score', 'total_marks', 'percentage')
+
+
+@api_view
+def attempts(request, profile):
+    """
+    Completed test attempts, newest first. Rows always carry ``id``,
+    ``completed_at`` and ``archived``; pass the response's ``next`` as
+    ``?cursor=`` for the following page (``null`` on the last one).
+    """
+    names = _selected(request, ATTEMPT_FIELDS, ATTEMPT_DEFAULT)
+    limit = min(max(_int_param(request, 'limit', DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            cursor = decode_cursor(cursor, (datetime, int))
+        except ValueError as e:
+            raise ApiError(str(e))
+    plain, aliased = _value_args(ATTEMPT_FIELDS, names)
+    rows = attempt_history(request.user, plain, aliased, cursor=cursor or None, limit=limit)
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'results': rows,
+        'next': encode_cursor(rows[-1]['completed_at'], rows[-1]['id']) if more else None,
+    }
+
+
+@api_view
+async def dashboard(request, profile):
+    """Everything the dashboard shows, fetched concurrently, in one response"""
+    user = request.user
+    catalog = _catalog(profile)
+    progress_rows = LabProgress.objects.filter(student=user)
+    completed = TestAttempt.objects.filter(student=user, status='completed')
+    (subject_rows, total_experiments, progress_counts, available_tests,
+     test_stats, recent_progress, recent_tests) = await gather_queries(
+        lambda: list(_values(catalog, SUBJECT_FIELDS, SUBJECT_DEFAULT)),
+        lambda: Experiment.objects.filter(subject__in=catalog, is_active=True).count(),
+        lambda: progress_rows.aggregate(
+            completed=Count('id', filter=Q(status='completed')),
+            in_progress=Count('id', filter=Q(status='in_progress')),
+        ),
+        lambda: Test.objects.filter(subject__in=catalog, is_active=True).count(),
+        lambda: completed.aggregate(count=Count('id'), avg=Avg('percentage')),
+        lambda: list(_values(progress_rows.order_by('-last_accessed')[:5], PROGRESS_FIELDS, (
+            'experiment_id', 'experiment_title', 'status', 'last_accessed',
+        ))),
+        lambda: list(completed.order_by('-completed_at').values(
+            'id', 'test_id', 'percentage', 'completed_at', test_title=F('test__title'),
+        )[:3]),
+    )
+    return {
+        'profile': {
+            'full_name': profile.full_name, 'roll_no': profile.roll_no, 'branch': profile.branch,
+            'semester': profile.current_semester, 'division': profile.division,
+        },
+        'stats': {
+            'total_experiments': total_experiments,
+            'completed_experiments': progress_counts['completed'],
+            'in_progress_experiments': progress_counts['in_progress'],
+            'progress_percentage': round(
+                progress_counts['completed'] / total_experiments * 100, 1
+            ) if total_experiments else 0,
+            'available_tests': available_tests,
+            'completed_tests': test_stats['count'],
+            'avg_test_score': round(test_stats['avg'], 1) if test_stats['avg'] else 0,
+        },
+        'subjects': subject_rows,
+        'recent_progress': recent_progress,
+        'recent_tests': recent_tests,
+    }
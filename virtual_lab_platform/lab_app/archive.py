@@ -0,0 +1,216 @@
+"""
+Archival of old test attempts.
+
+``TestAttempt`` and ``TestResponse`` grow with every submission. Completed
+attempts older than a cutoff are moved into ``ArchivedAttempt``: one
+summary row per attempt (score, marks, timestamps) with its responses
+packed into a zlib-compressed, column-oriented JSON blob, along with the
+question draw of attempts on a pooled test. Student history
+and the leaderboards read the summaries, the result page unpacks the blob
+on demand, and ``restore_attempt`` moves an attempt back into the live
+tables. ``attempt_history`` and ``subject_attempt_stats`` read a student's
+completed attempts from both tables.
+
+Each chunk is archived in its own transaction, so an interrupted run
+loses nothing and the next run continues with the attempts that are left.
+Item analysis and the cohort rollups only cover the live tables.
+"""
+import heapq
+import json
+import zlib
+
+from django.db import router, transaction
+from django.db.models import Count, Max, Sum
+from django.utils.dateparse import parse_datetime
+
+from .models import ArchivedAttempt, MCQQuestion, TestAttempt, TestResponse
+from .pagination import keyset_after
+from .question_pool import decode_ids, encode_ids
+
+CHUNK_SIZE = 500
+
+COLUMNS = ('question_id', 'selected_option', 'is_correct', 'answered_at')
+
+
+def pack_responses(rows, draw=None, draw_seed=None):
+    """
+    Compress ``(question_id, selected_option, is_correct, answered_at)``
+    rows, and the attempt's ``draw`` and ``draw_seed`` when it has them
+    """
+    columns = {name: [] for name in COLUMNS}
+    for question_id, selected_option, is_correct, answered_at in rows:
+        columns['question_id'].append(question_id)
+        columns['selected_option'].append(selected_option)
+        columns['is_correct'].append(is_correct)
+        columns['answered_at'].append(answered_at.isoformat())
+    if draw is not None:
+        columns['draw'] = decode_ids(draw)
+    if draw_seed is not None:
+        columns['draw_seed'] = draw_seed
+    return zlib.compress(json.dumps(columns, separators=(',', ':')).encode(), 9)
+
+
+def unpack_responses(blob):
+    """Return the packed responses as a list of dicts keyed by ``COLUMNS``"""
+    columns = json.loads(zlib.decompress(bytes(blob)))
+    columns['answered_at'] = [parse_datetime(value) for value in columns['answered_at']]
+    return [dict(zip(COLUMNS, row)) for row in zip(*(columns[name] for name in COLUMNS))]
+
+
+def unpack_draw(blob):
+    """The packed ``(draw, draw_seed)``; None for attempts without them"""
+    columns = json.loads(zlib.decompress(bytes(blob)))
+    draw = columns.get('draw')
+    return (None if draw is None else encode_ids(draw)), columns.get('draw_seed')
+
+
+def archived_responses(archived):
+    """
+    Unsaved ``TestResponse`` objects for an archived attempt, ordered like
+    the result page, so templates can show them like live responses.
+    Responses to questions deleted since archiving are left out.
+    """
+    rows = unpack_responses(archived.responses)
+    questions = MCQQuestion.objects.in_bulk([row['question_id'] for row in rows])
+    responses = [
+        TestResponse(
+            question=questions[row['question_id']], selected_option=row['selected_option'],
+            is_correct=row['is_correct'], answered_at=row['answered_at'],
+        )
+        for row in rows if row['question_id'] in questions
+    ]
+    responses.sort(key=lambda r: (r.question.order, r.question.id))
+    return responses
+
+
+def attempt_history(user, fields=(), expressions=None, cursor=None, limit=20):
+    """
+    ``values()`` rows of the user's completed attempts, live and archived,
+    newest first: the ``fields`` and ``expressions`` lookups (both models
+    share the test, score and timing fields) plus ``id``, ``completed_at``
+    and ``archived``. ``cursor`` is the ``(completed_at, id)`` of the last
+    row of the previous page. Each table is read with one keyset query of
+    at most ``limit + 1`` rows, so up to ``limit + 1`` rows are returned;
+    the extra row tells the caller there is another page.
+    """
+    live = TestAttempt.objects.filter(student=user, status='completed')
+    archived = ArchivedAttempt.objects.filter(student=user)
+    if cursor is not None:
+        live = live.filter(keyset_after(('completed_at', 'id'), cursor))
+        archived = archived.filter(keyset_after(('completed_at', 'attempt_id'), cursor))
+    expressions = expressions or {}
+    live = live.order_by('-completed_at', '-id').values(*fields, 'completed_at', 'id', **expressions)
+    archived = archived.order_by('-completed_at', '-attempt_id').values(
+        *fields, 'completed_at', 'attempt_id', **expressions
+    )
+    live_rows = [{**row, 'archived': False} for row in live[:limit + 1]]
+    # The archived rows keep their original attempt id, which cannot be aliased to ``id``
+    archived_rows = [{**row, 'id': row.pop('attempt_id'), 'archived': True} for row in archived[:limit + 1]]
+    merged = heapq.merge(live_rows, archived_rows, key=lambda row: (row['completed_at'], row['id']), reverse=True)
+    return list(merged)[:limit + 1]
+
+
+def subject_attempt_stats(user):
+    """
+    Per-subject attempt count, percentage sum, average and best over the
+    user's completed attempts, live and archived: one GROUP BY per table, merged
+    here. Returns dicts sorted by subject name.
+    """
+    def grouped(queryset):
+        return queryset.values('test__subject_id', 'test__subject__name').annotate(
+            attempts=Count('id'), total=Sum('percentage'), best=Max('percentage'),
+        ).order_by()
+
+    stats = {}
+    for row in [*grouped(TestAttempt.objects.filter(student=user, status='completed')),
+                *grouped(ArchivedAttempt.objects.filter(student=user))]:
+        entry = stats.setdefault(row['test__subject_id'], {
+            'subject_id': row['test__subject_id'], 'name': row['test__subject__name'],
+            'attempts': 0, 'total_score': 0.0, 'best_score': row['best'],
+        })
+        entry['attempts'] += row['attempts']
+        entry['total_score'] += row['total']
+        entry['best_score'] = max(entry['best_score'], row['best'])
+    for entry in stats.values():
+        entry['avg_score'] = round(entry['total_score'] / entry['attempts'], 1)
+    return sorted(stats.values(), key=lambda entry: entry['name'])
+
+
+def archive_attempts(cutoff, chunk_size=CHUNK_SIZE, limit=None, stdout=None):
+    """
+    Archive completed attempts finished before ``cutoff``, ``chunk_size`` at
+    a time and at most ``limit`` in total. Returns the number archived.
+    """
+    archived = 0
+    while limit is None or archived < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - archived)
+        count = _archive_chunk(cutoff, size)
+        if not count:
+            break
+        archived += count
+        if stdout is not None:
+            stdout.write(f'Archived {archived} attempts')
+    return archived
+
+
+@transaction.atomic
+def _archive_chunk(cutoff, size):
+    attempts = list(
+        TestAttempt.objects.filter(status='completed', completed_at__lt=cutoff).order_by('id')[:size]
+    )
+    if not attempts:
+        return 0
+    ids = [attempt.id for attempt in attempts]
+
+    rows = {}
+    responses = TestResponse.objects.filter(attempt_id__in=ids).order_by('attempt_id', 'question_id')
+    for attempt_id, *row in responses.values_list('attempt_id', *COLUMNS):
+        rows.setdefault(attempt_id, []).append(row)
+
+    ArchivedAttempt.objects.bulk_create([
+        ArchivedAttempt(
+            attempt_id=attempt.id, student_id=attempt.student_id, test_id=attempt.test_id,
+            score=attempt.score, total_marks=attempt.total_marks, percentage=attempt.percentage,
+            time_taken=attempt.time_taken, started_at=attempt.started_at,
+            completed_at=attempt.completed_at, response_count=len(rows.get(attempt.id, [])),
+            responses=pack_responses(rows.get(attempt.id, []), attempt.draw, attempt.draw_seed),
+        )
+        for attempt in attempts
+    ])
+
+    # Plain DELETEs: the collector would load every row to send post_delete,
+    # and the leaderboards keep counting the archived scores anyway
+    db = router.db_for_write(TestAttempt)
+    TestResponse.objects.filter(attempt_id__in=ids)._raw_delete(db)
+    TestAttempt.objects.filter(id__in=ids)._raw_delete(db)
+    return len(attempts)
+
+
+@transaction.atomic
+def restore_attempt(archived):
+    """Move an archived attempt and its responses back into the live tables"""
+    draw, draw_seed = unpack_draw(archived.responses)
+    attempt = TestAttempt.objects.create(
+        id=archived.attempt_id, student_id=archived.student_id, test_id=archived.test_id,
+        status='completed', score=archived.score, total_marks=archived.total_marks,
+        percentage=archived.percentage, time_taken=archived.time_taken,
+        completed_at=archived.completed_at, draw=draw, draw_seed=draw_seed,
+    )
+    rows = unpack_responses(archived.responses)
+    question_ids = set(MCQQuestion.objects.filter(
+        pk__in=[row['question_id'] for row in rows]
+    ).values_list('pk', flat=True))
+    responses = TestResponse.objects.bulk_create([
+        TestResponse(attempt=attempt, question_id=row['question_id'],
+                     selected_option=row['selected_option'], is_correct=row['is_correct'])
+        for row in rows if row['question_id'] in question_ids
+    ])
+    # auto_now_add overwrote the timestamps on insert; put the originals back
+    TestAttempt.objects.filter(pk=attempt.pk).update(started_at=archived.started_at)
+    answered_at = {row['question_id']: row['answered_at'] for row in rows}
+    for response in responses:
+        response.answered_at = answered_at[response.question_id]
+    TestResponse.objects.bulk_update(responses, ['answered_at'])
+    archived.delete()
+    attempt.started_at = archived.started_at
+    return attempt
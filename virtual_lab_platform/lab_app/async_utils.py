@@ -0,0 +1,70 @@
+"""
+Helpers for the async student views.
+
+On Django 4.2 the async ORM methods (``aget()``, ``acount()``...) hand
+every query to the request's single thread-sensitive executor, so
+``asyncio.gather`` over them still runs the queries one after another.
+``gather_queries`` instead runs independent read queries on worker
+threads, each with its own database connection, so they overlap on the
+database server.
+
+The workers come from one process-wide pool of ``ASYNC_QUERY_WORKERS``
+threads rather than the event loop's default executor: under WSGI every
+async view runs in a fresh event loop, and per-loop threads would each
+leave a database connection behind.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections, connection
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASYNC_QUERY_WORKERS', 8),
+    thread_name_prefix='lab_app-query',
+)
+
+
+def _in_transaction():
+    return connection.in_atomic_block
+
+
+def _run_on_worker(func):
+    # Same connection lifecycle as a request: honour CONN_MAX_AGE and
+    # CONN_HEALTH_CHECKS for the worker thread's own connection
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+async def gather_queries(*funcs):
+    """
+    Call the zero-argument callables concurrently and return their results
+    in order. Each callable must evaluate its queryset (``list()``,
+    ``count()``...) rather than return it lazily.
+
+    Inside a transaction the queries must see its uncommitted rows, so
+    they run one after another on the request's own connection.
+    """
+    if await sync_to_async(_in_transaction)():
+        return await sync_to_async(lambda: [func() for func in funcs])()
+    return await asyncio.gather(*(
+        sync_to_async(_run_on_worker, thread_sensitive=False, executor=_executor)(func)
+        for func in funcs
+    ))
+
+
+def async_login_required(view_func):
+    """``login_required`` for ``async def`` views (Django 4.2's is sync only)"""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,47 @@
+"""
+SQLite backend tuned for concurrent writers.
+
+Every new connection switches the database to WAL journaling and applies
+the PRAGMAs below, and write transactions start with ``BEGIN IMMEDIATE``
+so a transaction takes the write lock up front (waiting up to
+``busy_timeout``) instead of failing with "database is locked" when it
+later tries to upgrade a read lock. Individual PRAGMAs can be overridden
+with ``OPTIONS['pragmas']``.
+"""
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.utils.asyncio import async_unsafe
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,          # milliseconds
+    'mmap_size': 256 * 1024 * 1024,  # bytes
+    'cache_size': -64000,           # negative values are KiB, i.e. 64 MB
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(SQLiteDatabaseWrapper):
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_pragmas(self):
+        return {**DEFAULT_PRAGMAS, **self.settings_dict['OPTIONS'].get('pragmas', {})}
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        pragmas = self.get_pragmas()
+        if self.is_in_memory_db():
+            # WAL and mmap do not apply to in-memory databases (e.g. tests)
+            pragmas.pop('journal_mode', None)
+            pragmas.pop('mmap_size', None)
+        for name, value in pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
@@ -0,0 +1,316 @@
+"""
+Benchmark suite for the hot paths.
+
+Each benchmark builds its own fixture and returns the callable to time,
+plus an optional untimed ``prepare`` step that runs before every round.
+Every benchmark has a query budget: the most SQL queries a single run
+may issue. ``run_benchmarks`` times each case over enough rounds for a
+stable median and returns a JSON-serialisable report, and
+``compare_with_baseline`` lists the cases that got slower or chattier
+than a saved report.
+
+The suite writes to the database, so run it through
+``manage.py run_benchmarks``, which uses a throwaway test database.
+"""
+import gc
+import platform
+import random
+import statistics
+import time
+from datetime import timedelta
+from unittest import mock
+
+import django
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection, reset_queries
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .middleware import ProfileRequiredMiddleware, SessionActivityMiddleware
+from .models import (
+    Experiment, LabProgress, MCQQuestion, Subject, Test, TestAttempt, TestResponse
+)
+from .synthetic import _markdown
+from .templatetags.markdown_extras import markdown_format
+
+# Time each case for about this long, within the round limits
+TARGET_SECONDS = 1.0
+MIN_ROUNDS = 10
+MAX_ROUNDS = 200
+
+BENCHMARKS = []
+
+
+def benchmark(name, budget):
+    """Register a fixture function as a benchmark with a query budget"""
+    def decorator(fixture):
+        BENCHMARKS.append({'name': name, 'budget': budget, 'fixture': fixture})
+        return fixture
+    return decorator
+
+
+class Fixtures:
+    """Shared objects the benchmarks build on, created once per suite run"""
+
+    def __init__(self, scale):
+        self.scale = scale
+        self.counter = 0
+        self.admin = User.objects.create_superuser('bench-admin', 'bench-admin@example.com', 'password')
+        self.subject = Subject.objects.create(name='Benchmark Lab', description='d', semester=1, branch='CSE')
+
+    def unique(self, label):
+        self.counter += 1
+        return f'{label}-{self.counter}'
+
+    def student(self):
+        username = self.unique('bench-student')
+        user = User.objects.create_user(username, f'{username}@example.com', 'password')
+        profile = user.profile
+        profile.full_name = username
+        profile.roll_no = username.replace('-', '')
+        profile.contact_number = '9876543210'
+        profile.save()
+        return user
+
+    def test(self, questions):
+        experiment = Experiment.objects.create(
+            subject=self.subject, title=self.unique('Experiment'), objective='o', theory='t', procedure='p'
+        )
+        test = Test.objects.create(
+            title=self.unique('Test'), description='d', experiment=experiment, subject=self.subject,
+            duration=30, created_by=self.admin, total_marks=questions, passing_marks=questions // 2,
+        )
+        MCQQuestion.objects.bulk_create([
+            MCQQuestion(
+                test=test, question_text=f'Q{i}', option_a='a', option_b='b', option_c='c',
+                option_d='d', correct_option='ABCD'[i % 4], order=i,
+            )
+            for i in range(questions)
+        ])
+        return experiment, test
+
+    def history(self, student, tests, experiments):
+        """Completed attempts with responses on ``tests`` and progress on ``experiments``"""
+        now = timezone.now()
+        attempts = TestAttempt.objects.bulk_create([
+            TestAttempt(
+                student=student, test=test, status='completed', score=5, total_marks=10,
+                percentage=50.0, completed_at=now - timedelta(hours=i),
+            )
+            for i, test in enumerate(tests)
+        ])
+        questions = {}
+        for question in MCQQuestion.objects.filter(test__in=tests):
+            questions.setdefault(question.test_id, []).append(question)
+        TestResponse.objects.bulk_create([
+            TestResponse(attempt=attempt, question=q, selected_option='A', is_correct=q.correct_option == 'A')
+            for attempt in attempts for q in questions.get(attempt.test_id, [])
+        ])
+        LabProgress.objects.bulk_create([
+            LabProgress(student=student, experiment=e, status='completed' if i % 2 else 'in_progress')
+            for i, e in enumerate(experiments)
+        ])
+
+
+def _experiment_page_markdown():
+    rnd = random.Random(1)
+    sections = [_markdown(rnd, "Ohm's Law", section) for section in ('Objective', 'Theory', 'Procedure')]
+    return sections + [f'What is the **unit** of {word}?' for word in ('current', 'voltage', 'resistance')]
+
+
+@benchmark('markdown_format.experiment_page', budget=0)
+def bench_markdown_page(fixtures):
+    texts = _experiment_page_markdown()
+    return {'run': lambda: [markdown_format(text) for text in texts]}
+
+
+@benchmark('markdown_format.short_text', budget=0)
+def bench_markdown_short(fixtures):
+    return {'run': lambda: markdown_format('Ohm\'s law: *V* = **I** x R')}
+
+
+def _submission(fixtures, questions):
+    student = fixtures.student()
+    experiment, test = fixtures.test(questions)
+    client = Client()
+    client.force_login(student)
+    url = reverse('lab_app:experiment_test', args=[experiment.id])
+    answers = {f'question_{q.id}': 'ABCD'[i % 3] for i, q in enumerate(test.mcq_questions.all())}
+
+    def prepare():
+        TestAttempt.objects.create(student=student, test=test, status='started', total_marks=questions)
+
+    def run():
+        response = client.post(url, answers)
+        assert response.status_code == 302, response.status_code
+
+    return {'prepare': prepare, 'run': run}
+
+
+# SQLite splits the 200-row upsert into two statements (999 parameters each)
+@benchmark('submission.10_questions', budget=17)
+def bench_submission_10(fixtures):
+    return _submission(fixtures, 10)
+
+
+@benchmark('submission.50_questions', budget=17)
+def bench_submission_50(fixtures):
+    return _submission(fixtures, 50)
+
+
+@benchmark('submission.200_questions', budget=17)
+def bench_submission_200(fixtures):
+    return _submission(fixtures, 200)
+
+
+@benchmark('dashboard.large_history', budget=14)
+def bench_dashboard(fixtures):
+    student = fixtures.student()
+    pairs = [fixtures.test(10) for _ in range(max(1, int(100 * fixtures.scale)))]
+    fixtures.history(student, [t for _, t in pairs], [e for e, _ in pairs])
+    client = Client()
+    client.force_login(student)
+    url = reverse('lab_app:dashboard')
+
+    def run():
+        response = client.get(url)
+        assert response.status_code == 200, response.status_code
+
+    return {'run': run}
+
+
+@benchmark('middleware.profile_and_session', budget=0)
+def bench_middleware(fixtures):
+    student = fixtures.student()
+    chain = ProfileRequiredMiddleware(SessionActivityMiddleware(lambda request: HttpResponse()))
+    factory = RequestFactory()
+
+    def run():
+        request = factory.get('/experiment/1/')
+        request.user = student
+        request.session = SessionStore()
+        chain(request)
+
+    return {'run': run}
+
+
+def _changelist(fixtures, url_name):
+    student = fixtures.student()
+    pairs = [fixtures.test(10) for _ in range(max(1, int(60 * fixtures.scale)))]
+    fixtures.history(student, [t for _, t in pairs], [e for e, _ in pairs])
+    client = Client()
+    client.force_login(fixtures.admin)
+    url = reverse(url_name)
+
+    def run():
+        response = client.get(url)
+        assert response.status_code == 200, response.status_code
+
+    return {'run': run}
+
+
+@benchmark('admin.testattempt_changelist', budget=10)
+def bench_admin_attempts(fixtures):
+    return _changelist(fixtures, 'admin:lab_app_testattempt_changelist')
+
+
+@benchmark('admin.testresponse_changelist', budget=10)
+def bench_admin_responses(fixtures):
+    return _changelist(fixtures, 'admin:lab_app_testresponse_changelist')
+
+
+def _time_case(case, max_rounds):
+    prepare = case.get('prepare') or (lambda: None)
+    run = case['run']
+
+    # Warm-up round, which also counts the queries of one run. The async
+    # views fan reads out to worker threads with their own connections;
+    # run those on this thread's connection so every query is counted.
+    prepare()
+    reset_queries()
+    with mock.patch('lab_app.async_utils._in_transaction', return_value=True), \
+            CaptureQueriesContext(connection) as context:
+        run()
+    # Read now: later requests reset the connection's query log
+    queries = len(context.captured_queries)
+
+    timings = []
+    deadline = time.perf_counter() + TARGET_SECONDS
+    while len(timings) < max_rounds and (len(timings) < MIN_ROUNDS or time.perf_counter() < deadline):
+        prepare()
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return queries, timings
+
+
+# The submission cases post far faster than any class; the admission
+# limiter (lab_app/admission.py) would queue them
+@override_settings(ADMISSION_CONTROL={})
+def run_benchmarks(names=None, scale=1.0, max_rounds=MAX_ROUNDS, stdout=None):
+    """
+    Run the registered benchmarks (all, or those whose name starts with
+    one of ``names``) and return the report.
+    """
+    fixtures = Fixtures(scale)
+    results = {}
+    for entry in BENCHMARKS:
+        if names and not any(entry['name'].startswith(n) for n in names):
+            continue
+        case = entry['fixture'](fixtures)
+        queries, timings = _time_case(case, max_rounds)
+        results[entry['name']] = {
+            'median_ms': round(statistics.median(timings) * 1000, 4),
+            'min_ms': round(min(timings) * 1000, 4),
+            'rounds': len(timings),
+            'queries': queries,
+            'budget': entry['budget'],
+        }
+        if stdout is not None:
+            r = results[entry['name']]
+            flag = '' if queries <= entry['budget'] else '  OVER BUDGET'
+            stdout.write(
+                f"{entry['name']:<36} {r['median_ms']:>10.3f} {r['min_ms']:>10.3f} {r['rounds']:>6} "
+                f"{queries:>4}/{entry['budget']:<4}{flag}"
+            )
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'scale': scale,
+        },
+        'results': results,
+    }
+
+
+def over_budget(report):
+    return [name for name, r in report['results'].items() if r['queries'] > r['budget']]
+
+
+def compare_with_baseline(report, baseline, tolerance=0.25):
+    """
+    Return (name, metric, baseline value, current value) for every case
+    whose median time grew by more than ``tolerance`` or that issues more
+    queries than in the baseline.
+    """
+    regressions = []
+    for name, current in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        if current['median_ms'] > previous['median_ms'] * (1 + tolerance):
+            regressions.append((name, 'median_ms', previous['median_ms'], current['median_ms']))
+        if current['queries'] > previous['queries']:
+            regressions.append((name, 'queries', previous['queries'], current['queries']))
+    return regressions
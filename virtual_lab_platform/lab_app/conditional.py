@@ -0,0 +1,86 @@
+"""
+Conditional GET for the content and result pages.
+
+Each page gets a version function that reads a few cheap values (the
+content's ``updated_at``, the user's profile and their own progress or
+attempt rows) instead of running the view's queries. ``conditional_page``
+hashes that version into an ETag, adds a Last-Modified date when the
+version is made of timestamps only, and answers a matching
+``If-None-Match``/``If-Modified-Since`` with 304 before the view runs.
+
+The pages are per user, so responses are marked ``Cache-Control: private,
+no-cache`` and ``Vary: Cookie``: browsers revalidate every time, shared
+caches never store them, and the ETag includes the user id. Requests
+with pending flash messages always get the full page, so the messages
+are shown.
+"""
+import asyncio
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def _validators(request, version_func, args, kwargs):
+    """Return (etag, last_modified timestamp) for the request, or (None, None)"""
+    if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+        return None, None
+    version = version_func(request, *args, **kwargs)
+    if version is None:
+        return None, None
+    parts, last_modified = version
+    digest = hashlib.sha1(repr((request.user.pk, parts)).encode()).hexdigest()[:32]
+    return quote_etag(digest), (int(last_modified.timestamp()) if last_modified else None)
+
+
+def _finish(response, etag, last_modified):
+    if etag is not None and response.status_code == 200:
+        response.headers.setdefault('ETag', etag)
+        if last_modified is not None:
+            response.headers.setdefault('Last-Modified', http_date(last_modified))
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def conditional_page(version_func, not_modified=None):
+    """
+    Serve 304 Not Modified when ``version_func`` says the page is unchanged.
+
+    ``version_func(request, *view_args, **view_kwargs)`` runs synchronously
+    and returns ``(parts, last_modified)``: any repr-able value that changes
+    whenever the page would, and a datetime for Last-Modified (or None when
+    the version is not made of timestamps only). It may return None to
+    always render. ``not_modified(request, *view_args, **view_kwargs)``, if
+    given, runs before a 304 is sent, for side effects the view would have
+    had. Works for sync and ``async def`` views.
+    """
+    def check(request, args, kwargs):
+        etag, last_modified = _validators(request, version_func, args, kwargs)
+        if etag is None:
+            return etag, last_modified, None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None and not_modified is not None and response.status_code == 304:
+            not_modified(request, *args, **kwargs)
+        return etag, last_modified, response
+
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapper(request, *args, **kwargs):
+                etag, last_modified, response = await sync_to_async(check)(request, args, kwargs)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return _finish(response, etag, last_modified)
+        else:
+            @wraps(view_func)
+            def wrapper(request, *args, **kwargs):
+                etag, last_modified, response = check(request, args, kwargs)
+                if response is None:
+                    response = view_func(request, *args, **kwargs)
+                return _finish(response, etag, last_modified)
+        return wrapper
+    return decorator
@@ -1,4 +1,6 @@
 from django import forms
+from django.conf import settings
+from django.template.defaultfilters import filesizeformat
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from crispy_forms.helper import FormHelper
@@ -8,7 +10,18 @@ from .models import UserProfile, Subject, Experiment
 from allauth.account.forms import SignupForm, LoginForm
 from .utils import add_tailwind_form_styles
 
-class UserProfileForm(forms.ModelForm):
+class ProfilePictureSizeMixin:
+    """Reject profile picture uploads above PROFILE_PICTURE_MAX_UPLOAD_BYTES"""
+    
+    def clean_profile_picture(self):
+        picture = self.cleaned_data.get('profile_picture')
+        limit = settings.PROFILE_PICTURE_MAX_UPLOAD_BYTES
+        # Only a new upload has a content type; a kept picture is a FieldFile
+        if picture and hasattr(picture, 'content_type') and picture.size > limit:
+            raise forms.ValidationError(f'The picture must be smaller than {filesizeformat(limit)}.')
+        return picture
+
+class UserProfileForm(ProfilePictureSizeMixin, forms.ModelForm):
     """Form for creating/updating user profile"""
     
     class Meta:
@@ -53,7 +66,7 @@ class UserProfileForm(forms.ModelForm):
                 field.widget.attrs['class'] = 'mt-1 block w-full rounded-md border-gray-300 shadow-sm focus:border-indigo-500 focus:ring focus:ring-indigo-500 focus:ring-opacity-50'
 
 
-class EditProfileForm(forms.ModelForm):
+class EditProfileForm(ProfilePictureSizeMixin, forms.ModelForm):
     """Form for editing limited profile fields - ONLY name and contact number"""
     
     class Meta:
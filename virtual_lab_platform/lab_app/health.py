@@ -0,0 +1,94 @@
+"""
+Health checks for load balancers and orchestrators.
+
+``/healthz`` (liveness) only shows that the process answers requests; it
+touches neither the database nor the cache, so a database outage does
+not get every worker restarted. ``/readyz`` (readiness) answers 200 only
+when the database answers, the cache stores and returns a value, no
+migration is pending and every warm-up step (lab_app/warmup.py) has
+succeeded, failed ones being retried on each check, and 503 otherwise.
+Both are public, so ``/readyz`` only names each check as ok or failed;
+the reasons go to the log. Neither needs a login, and responses are
+never cached.
+"""
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+
+from .warmup import STATUS as WARMUP_STATUS, retry_failed as retry_warm_up
+
+logger = logging.getLogger(__name__)
+
+# Set once every migration is applied; new ones need a deploy, and a restart
+_migrations_applied = False
+
+
+def _check_database():
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+def _check_cache():
+    key, value = 'lab_app:readyz', uuid.uuid4().hex
+    cache.set(key, value, 10)
+    if cache.get(key) != value:
+        raise RuntimeError('cache did not return the stored value')
+
+
+def _check_migrations():
+    global _migrations_applied
+    if _migrations_applied:
+        return
+    executor = MigrationExecutor(connections[DEFAULT_DB_ALIAS])
+    pending = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if pending:
+        raise RuntimeError(f'{len(pending)} migrations not applied')
+    _migrations_applied = True
+
+
+def _check_warm_up():
+    # wsgi.py/asgi.py run warm-up before the server accepts connections
+    if not settings.WARM_UP_WORKERS:
+        return
+    if not WARMUP_STATUS['finished']:
+        raise RuntimeError('warm-up has not finished')
+    if WARMUP_STATUS['errors'] and not retry_warm_up():
+        raise RuntimeError(f"warm-up steps failed: {', '.join(WARMUP_STATUS['errors'])}")
+
+
+CHECKS = (
+    ('database', _check_database),
+    ('cache', _check_cache),
+    ('migrations', _check_migrations),
+    ('warm_up', _check_warm_up),
+)
+
+
+@never_cache
+def healthz(request):
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+def readyz(request):
+    checks = {}
+    for name, check in CHECKS:
+        try:
+            check()
+        except Exception as e:
+            # Failed warm-up steps were logged by warm_up() itself
+            logger.warning('Readiness check %s failed: %s', name, e)
+            checks[name] = 'failed'
+        else:
+            checks[name] = 'ok'
+    ready = all(result == 'ok' for result in checks.values())
+    return JsonResponse(
+        {'status': 'ready' if ready else 'unavailable', 'checks': checks},
+        status=200 if ready else 503,
+    )
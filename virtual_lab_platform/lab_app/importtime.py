@@ -0,0 +1,87 @@
+"""
+Import-time profile of the project start-up.
+
+Every management command (cron jobs included) pays for ``django.setup()``
+before it runs, and every deploy pays for loading the WSGI application
+once per worker. ``profile_imports`` measures either in a fresh
+interpreter started with ``python -X importtime`` and returns the wall
+time of the start-up plus the per-module breakdown CPython reports:
+
+    setup   ``django.setup()``, as ``manage.py`` does
+    wsgi    importing ``virtual_lab_platform.wsgi``, with the warm-up
+            (lab_app/warmup.py) turned off so only imports are counted
+
+Heavy libraries that only some code paths need (NumPy for the analytics,
+Pillow for profile pictures, Markdown and Pygments for content pages)
+are imported where they are used; ``DEFERRED_MODULES`` lists them, and
+the tests fail when one of them is imported at start-up again or when a
+start-up takes more than a few times its ``BUDGETS`` entry. The budget
+itself is enforced by ``manage.py profile_imports``, and by the tests
+when run with ``CHECK_STARTUP_BUDGET=1``.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+TARGETS = {
+    'setup': 'import django; django.setup()',
+    'wsgi': 'import virtual_lab_platform.wsgi',
+}
+# Seconds, with room for slower machines; both take about 0.4s locally
+BUDGETS = {'setup': 1.0, 'wsgi': 1.2}
+DEFERRED_MODULES = ('numpy', 'PIL', 'markdown', 'pygments')
+
+# Times the target itself, without the interpreter's own start-up
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+print(json.dumps({{'seconds': time.perf_counter() - start, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def parse_importtime(output):
+    """
+    Parse ``-X importtime`` output into ``(name, self_us, cumulative_us,
+    depth)`` tuples, in the order CPython reports them (children first).
+    """
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        stripped = name.lstrip(' ')
+        rows.append((stripped, int(fields[0]), int(fields[1]), (len(name) - len(stripped) - 1) // 2))
+    return rows
+
+
+def profile_imports(target):
+    """
+    Start ``target`` (a ``TARGETS`` key) in a fresh interpreter. Returns a
+    dict with the start-up ``seconds``, the ``imports`` reported by
+    ``-X importtime`` and the ``deferred`` modules that were imported.
+    """
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE,
+        'WARM_UP_WORKERS': '0',
+    }
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT.format(statement=TARGETS[target])],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'{target} start-up failed:\n{result.stderr[-2000:]}')
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = set(report['modules'])
+    return {
+        'seconds': report['seconds'],
+        'imports': parse_importtime(result.stderr),
+        'deferred': [name for name in DEFERRED_MODULES if name in modules],
+    }
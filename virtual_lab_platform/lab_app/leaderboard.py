@@ -0,0 +1,239 @@
+"""
+Incrementally maintained leaderboards for tests and subjects.
+
+Each board is kept in the cache as a sorted list of
+``(-score, seconds, student_id)`` tuples plus a ``{student_id: (-score,
+seconds)}`` index, so ranks are found with a binary search. A test board
+holds every student's best attempt (highest score, then shortest time);
+a subject board holds the sum of a student's best attempts over the
+subject's tests. Boards are rebuilt from the database on a cache miss and
+updated in place when an attempt is completed. Archived attempts still
+count, so archiving leaves the boards unchanged.
+
+A rebuild reads the database without holding the subject lock, so an
+attempt recorded meanwhile could be missing from the board it stores.
+Every board has a generation counter that ``record_attempt`` and
+``invalidate`` bump before they write; a rebuild compares it before the
+database read and after storing the board, and drops the board again if
+it changed.
+"""
+import time
+from bisect import bisect_left, insort
+from itertools import chain
+
+from django.core.cache import cache
+
+from .models import ArchivedAttempt, Test, TestAttempt
+
+LEADERBOARD_CACHE_TIMEOUT = 60 * 60 * 24
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2.0
+
+# Attempts without a recorded duration rank after every timed attempt
+UNTIMED_SECONDS = 10 ** 9
+
+
+def _test_key(test_id):
+    return f'lab_app:leaderboard:test:{test_id}'
+
+
+def _subject_key(subject_id):
+    return f'lab_app:leaderboard:subject:{subject_id}'
+
+
+def _test_subject_key(test_id):
+    return f'lab_app:leaderboard:test_subject:{test_id}'
+
+
+def subject_of(test_id):
+    """
+    The subject id of a test, cached so that deleting many attempts (a
+    cascade from their test, say) does not read the test once per attempt.
+    ``forget_test`` drops it when the test is saved or deleted.
+    """
+    key = _test_subject_key(test_id)
+    subject_id = cache.get(key)
+    if subject_id is None:
+        subject_id = Test.objects.filter(pk=test_id).values_list('subject_id', flat=True).first()
+        if subject_id is not None:
+            cache.set(key, subject_id, LEADERBOARD_CACHE_TIMEOUT)
+    return subject_id
+
+
+def forget_test(test_id):
+    cache.delete(_test_subject_key(test_id))
+
+
+def _generation_key(board_key):
+    return f'{board_key}:generation'
+
+
+def _bump(*board_keys):
+    for key in map(_generation_key, board_keys):
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:  # evicted meanwhile; the next add starts over
+            pass
+
+
+def _seconds(time_taken):
+    return int(time_taken.total_seconds()) if time_taken is not None else UNTIMED_SECONDS
+
+
+def _board_from_best(best):
+    ranking = sorted((entry[0], entry[1], student_id) for student_id, entry in best.items())
+    return {'best': best, 'ranking': ranking}
+
+
+def _best_per_test(**filters):
+    """Map test_id -> {student_id: (-score, seconds)} from completed and archived attempts"""
+    best = {}
+    fields = ('test_id', 'student_id', 'score', 'time_taken')
+    rows = chain(
+        TestAttempt.objects.filter(status='completed', **filters).values_list(*fields),
+        ArchivedAttempt.objects.filter(**filters).values_list(*fields),
+    )
+    for test_id, student_id, score, time_taken in rows:
+        entry = (-score, _seconds(time_taken))
+        per_test = best.setdefault(test_id, {})
+        if student_id not in per_test or entry < per_test[student_id]:
+            per_test[student_id] = entry
+    return best
+
+
+def _build_test_board(test_id):
+    best = _best_per_test(test_id=test_id).get(test_id, {})
+    return _board_from_best(best)
+
+
+def _build_subject_board(subject_id):
+    totals = {}
+    per_test = _best_per_test(test__subject_id=subject_id)
+    for best in per_test.values():
+        for student_id, (neg_score, seconds) in best.items():
+            current = totals.get(student_id, (0, 0))
+            totals[student_id] = (current[0] + neg_score, current[1] + seconds)
+    return _board_from_best(totals)
+
+
+def _cached_board(key, build):
+    board = cache.get(key)
+    if board is None:
+        generation = cache.get(_generation_key(key))
+        board = build()
+        cache.set(key, board, LEADERBOARD_CACHE_TIMEOUT)
+        # An attempt recorded since the read may be missing from the board
+        if cache.get(_generation_key(key)) != generation:
+            cache.delete(key)
+    return board
+
+
+def get_test_board(test_id):
+    return _cached_board(_test_key(test_id), lambda: _build_test_board(test_id))
+
+
+def get_subject_board(subject_id):
+    return _cached_board(_subject_key(subject_id), lambda: _build_subject_board(subject_id))
+
+
+def _replace_entry(board, student_id, entry):
+    """Swap a student's entry in a board, keeping the ranking sorted"""
+    previous = board['best'].get(student_id)
+    if previous is not None:
+        ranking = board['ranking']
+        index = bisect_left(ranking, (previous[0], previous[1], student_id))
+        if index < len(ranking) and ranking[index][2] == student_id:
+            del ranking[index]
+    board['best'][student_id] = entry
+    insort(board['ranking'], (entry[0], entry[1], student_id))
+
+
+def _acquire(lock_key):
+    deadline = time.monotonic() + LOCK_WAIT
+    while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def record_attempt(attempt):
+    """
+    Fold a completed attempt into the test and subject boards.
+
+    Only an improvement on the student's best attempt changes the boards,
+    so retakes with a lower score are ignored. If the boards cannot be
+    locked they are dropped and rebuilt on the next read instead.
+    """
+    if attempt.status != 'completed':
+        return
+    test_id = attempt.test_id
+    subject_id = attempt.test.subject_id
+    lock_key = f'lab_app:leaderboard:lock:{subject_id}'
+    if not _acquire(lock_key):
+        invalidate(test_id, subject_id)
+        return
+    try:
+        test_board = cache.get(_test_key(test_id))
+        subject_board = cache.get(_subject_key(subject_id))
+        if test_board is None or subject_board is None:
+            # Rebuilding reads the attempt straight from the database
+            invalidate(test_id, subject_id)
+            return
+
+        entry = (-attempt.score, _seconds(attempt.time_taken))
+        previous = test_board['best'].get(attempt.student_id)
+        if previous is not None and previous <= entry:
+            return
+        _replace_entry(test_board, attempt.student_id, entry)
+
+        old_total = subject_board['best'].get(attempt.student_id, (0, 0))
+        old_part = previous or (0, 0)
+        new_total = (
+            old_total[0] - old_part[0] + entry[0],
+            old_total[1] - old_part[1] + entry[1],
+        )
+        _replace_entry(subject_board, attempt.student_id, new_total)
+
+        # Before writing, so a rebuild that stores its board after this one
+        # sees the change and drops it
+        _bump(_test_key(test_id), _subject_key(subject_id))
+        cache.set_many({
+            _test_key(test_id): test_board,
+            _subject_key(subject_id): subject_board,
+        }, LEADERBOARD_CACHE_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+
+
+def invalidate(test_id, subject_id):
+    _bump(_test_key(test_id), _subject_key(subject_id))
+    cache.delete_many([_test_key(test_id), _subject_key(subject_id)])
+
+
+def get_rank(board, student_id):
+    """
+    Return (rank, board size) for a student, or (None, size) if unranked.
+
+    Students with the same score and time share a rank.
+    """
+    entry = board['best'].get(student_id)
+    size = len(board['ranking'])
+    if entry is None:
+        return None, size
+    return bisect_left(board['ranking'], entry) + 1, size
+
+
+def top_entries(board, limit=10):
+    """Return the first ``limit`` entries as dicts with their shared ranks"""
+    ranking = board['ranking']
+    entries = []
+    for neg_score, seconds, student_id in ranking[:limit]:
+        entries.append({
+            'rank': bisect_left(ranking, (neg_score, seconds)) + 1,
+            'student_id': student_id,
+            'score': -neg_score,
+            'seconds': seconds if seconds != UNTIMED_SECONDS else None,
+        })
+    return entries
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from lab_app.archive import CHUNK_SIZE, archive_attempts, restore_attempt
+from lab_app.models import ArchivedAttempt, TestAttempt
+from datetime import datetime, time as dt_time, timedelta
+import time
+
+class Command(BaseCommand):
+    help = ('Move completed test attempts older than a cutoff, with their responses, out of the '
+            'live tables into compressed archive rows. Safe to interrupt and run again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Archive attempts completed more than this many days ago')
+        parser.add_argument('--before', type=str, help='Archive attempts completed before this date (YYYY-MM-DD) instead')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Attempts moved per transaction')
+        parser.add_argument('--limit', type=int, help='Stop after this many attempts')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the attempts that would be archived')
+        parser.add_argument('--restore', type=int, metavar='ATTEMPT_ID',
+                            help='Move one archived attempt back into the live tables and exit')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['restore'] is not None:
+            archived = ArchivedAttempt.objects.filter(attempt_id=kwargs['restore']).first()
+            if archived is None:
+                raise CommandError(f"No archived attempt with id {kwargs['restore']}")
+            restore_attempt(archived)
+            self.stdout.write(self.style.SUCCESS(f"Restored attempt {kwargs['restore']}"))
+            return
+
+        if kwargs['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        if kwargs['before']:
+            day = parse_date(kwargs['before'])
+            if day is None:
+                raise CommandError('--before must be a date like 2024-06-30')
+            cutoff = timezone.make_aware(datetime.combine(day, dt_time.min))
+        else:
+            cutoff = timezone.now() - timedelta(days=kwargs['days'])
+
+        if kwargs['dry_run']:
+            count = TestAttempt.objects.filter(status='completed', completed_at__lt=cutoff).count()
+            self.stdout.write(f'{count} attempts completed before {cutoff:%Y-%m-%d %H:%M} would be archived')
+            return
+
+        started = time.monotonic()
+        archived = archive_attempts(
+            cutoff, chunk_size=kwargs['chunk_size'], limit=kwargs['limit'], stdout=self.stdout,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {archived} attempts completed before {cutoff:%Y-%m-%d %H:%M} '
+            f'in {time.monotonic() - started:.1f}s'
+        ))
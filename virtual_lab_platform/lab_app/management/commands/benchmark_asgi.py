@@ -0,0 +1,117 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from lab_app.models import Experiment
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import time
+
+class Command(BaseCommand):
+    help = ('Compare the WSGI and ASGI request handlers on the read-heavy student pages, '
+            'with the same number of requests in flight on each')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=str, help='Student username to browse as (default: first complete student profile)')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page and handler')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at once')
+        parser.add_argument('--handler', choices=['wsgi', 'asgi', 'both'], default='both')
+
+    def handle(self, *args, **kwargs):
+        user = self.get_user(kwargs['user'])
+        paths = self.get_paths(user)
+        handlers = ['wsgi', 'asgi'] if kwargs['handler'] == 'both' else [kwargs['handler']]
+
+        self.stdout.write(f'Browsing as {user.username}, {kwargs["requests"]} requests per page, '
+                          f'concurrency {kwargs["concurrency"]}')
+        self.stdout.write(f"{'Handler':<8} {'Page':<28} {'Req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'Errors':>7}")
+        failed = 0
+        for handler in handlers:
+            for path in paths:
+                result = self.run(handler, user, path, kwargs['requests'], kwargs['concurrency'])
+                self.stdout.write(
+                    f"{handler:<8} {path:<28} {result['throughput']:>8.1f} "
+                    f"{result['p50']:>8.2f} {result['p95']:>8.2f} {result['errors']:>7}"
+                )
+                failed += result['errors']
+        # Error responses are fast and would make the timings meaningless
+        if failed:
+            raise CommandError(f'{failed} requests did not get a 2xx/3xx response')
+
+    def get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'User "{username}" does not exist')
+        user = User.objects.filter(
+            profile__role='student', profile__is_profile_complete=True, is_staff=False
+        ).order_by('id').first()
+        if user is None:
+            raise CommandError('No student with a complete profile; pass --user')
+        return user
+
+    def get_paths(self, user):
+        profile = user.profile
+        paths = [reverse('lab_app:dashboard')]
+        experiment = Experiment.objects.filter(
+            subject__branch=profile.branch, subject__semester=profile.current_semester,
+            subject__is_active=True, is_active=True,
+        ).select_related('subject').order_by('id').first()
+        if experiment is not None:
+            paths.append(reverse('lab_app:subject_list', args=[experiment.subject_id]))
+            paths.append(reverse('lab_app:experiment_detail', args=[experiment.id]))
+        return paths
+
+    def run(self, handler, user, path, requests, concurrency):
+        # The test clients send Host: testserver, which ALLOWED_HOSTS only
+        # accepts under the test runner (AsyncClient cannot change it on 4.2)
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            if handler == 'wsgi':
+                return self.run_wsgi(user, path, requests, concurrency)
+            return asyncio.run(self.run_asgi(user, path, requests, concurrency))
+
+    def run_wsgi(self, user, path, requests, concurrency):
+        local = threading.local()
+
+        def fetch(_):
+            # One client (and session cookie) per thread, like browser tabs
+            if not hasattr(local, 'client'):
+                local.client = Client(raise_request_exception=False)
+                local.client.force_login(user)
+            started = time.perf_counter()
+            response = local.client.get(path)
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fetch, range(requests)))
+        return self.summarize(results, time.perf_counter() - started)
+
+    async def run_asgi(self, user, path, requests, concurrency):
+        client = AsyncClient(raise_request_exception=False)
+        await asyncio.to_thread(client.force_login, user)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path)
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(fetch() for _ in range(requests)))
+        return self.summarize(results, time.perf_counter() - started)
+
+    def summarize(self, results, elapsed):
+        latencies = sorted(latency for latency, status in results if 200 <= status < 400)
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else 0.0
+        return {
+            'throughput': len(latencies) / elapsed,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'errors': len(results) - len(latencies),
+        }
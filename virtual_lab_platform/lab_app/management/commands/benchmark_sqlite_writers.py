@@ -0,0 +1,110 @@
+from django.core.management.base import BaseCommand
+from django.db.utils import ConnectionHandler, OperationalError
+import os
+import tempfile
+import threading
+import time
+
+PROFILES = {
+    'stock': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}},
+    'tuned': {'ENGINE': 'lab_app.backends.sqlite3', 'OPTIONS': {'timeout': 20}},
+}
+
+class Command(BaseCommand):
+    help = 'Measure write throughput of the stock and tuned SQLite profiles under parallel writers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help='Number of parallel writer threads')
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds to run each profile')
+        parser.add_argument('--profile', choices=['stock', 'tuned', 'both'], default='both')
+
+    def handle(self, *args, **kwargs):
+        profiles = ['stock', 'tuned'] if kwargs['profile'] == 'both' else [kwargs['profile']]
+        self.stdout.write(f"{'Profile':<8} {'Writers':>7} {'Commits':>8} {'Errors':>7} {'Tx/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for profile in profiles:
+            result = self.run_profile(profile, kwargs['writers'], kwargs['duration'])
+            self.stdout.write(
+                f"{profile:<8} {kwargs['writers']:>7} {result['commits']:>8} {result['errors']:>7} "
+                f"{result['throughput']:>9.1f} {result['p50']:>8.2f} {result['p95']:>8.2f}"
+            )
+
+    def run_profile(self, profile, writers, duration):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            handler = ConnectionHandler({
+                'default': {**PROFILES[profile], 'NAME': os.path.join(tmpdir, 'bench.sqlite3')},
+            })
+            setup = handler['default']
+            with setup.cursor() as cursor:
+                cursor.execute(
+                    "CREATE TABLE progress (id INTEGER PRIMARY KEY, student INTEGER, "
+                    "experiment INTEGER, touches INTEGER, UNIQUE (student, experiment))"
+                )
+            setup.close()
+
+            latencies = []
+            errors = [0]
+            lock = threading.Lock()
+            deadline = time.monotonic() + duration
+
+            def writer(worker):
+                # Connections are per thread, like request-handling threads
+                connection = handler['default']
+                n = 0
+                while time.monotonic() < deadline:
+                    n += 1
+                    started = time.perf_counter()
+                    try:
+                        self.submit(connection, worker, n % 50)
+                    except OperationalError:
+                        with lock:
+                            errors[0] += 1
+                        continue
+                    with lock:
+                        latencies.append(time.perf_counter() - started)
+                connection.close()
+
+            threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+            started = time.monotonic()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.monotonic() - started
+
+        latencies.sort()
+        def percentile(q):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else 0.0
+        return {
+            'commits': len(latencies),
+            'errors': errors[0],
+            'throughput': len(latencies) / elapsed,
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+        }
+
+    def submit(self, connection, student, experiment):
+        """Read-then-write transaction, shaped like a progress update on submission"""
+        connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT touches FROM progress WHERE student = %s AND experiment = %s",
+                    [student, experiment],
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute(
+                        "INSERT INTO progress (student, experiment, touches) VALUES (%s, %s, 1)",
+                        [student, experiment],
+                    )
+                else:
+                    cursor.execute(
+                        "UPDATE progress SET touches = %s WHERE student = %s AND experiment = %s",
+                        [row[0] + 1, student, experiment],
+                    )
+            connection.commit()
+        except OperationalError:
+            connection.rollback()
+            raise
+        finally:
+            connection.set_autocommit(True)
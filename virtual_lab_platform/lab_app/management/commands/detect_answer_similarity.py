@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from lab_app.models import Test
+from lab_app.proctoring import (
+    find_similar_attempts, DEFAULT_WINDOW_MINUTES, DEFAULT_MIN_SHARED_WRONG
+)
+
+class Command(BaseCommand):
+    help = 'Report pairs of attempts on a test with suspiciously similar answer sheets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_id', type=int, help='ID of the test to analyse')
+        parser.add_argument('--window', type=int, default=DEFAULT_WINDOW_MINUTES,
+                            help='Only compare attempts started within this many minutes of each other')
+        parser.add_argument('--min-shared-wrong', type=int, default=DEFAULT_MIN_SHARED_WRONG,
+                            help='Minimum number of identical wrong answers for a pair to be reported')
+        parser.add_argument('--limit', type=int, default=50, help='Number of pairs to report')
+
+    def handle(self, *args, **kwargs):
+        try:
+            test = Test.objects.get(id=kwargs['test_id'])
+        except Test.DoesNotExist:
+            raise CommandError(f"Test {kwargs['test_id']} does not exist")
+
+        pairs = find_similar_attempts(
+            test,
+            window_minutes=kwargs['window'],
+            min_shared_wrong=kwargs['min_shared_wrong'],
+            limit=kwargs['limit'],
+        )
+        if not pairs:
+            self.stdout.write(self.style.SUCCESS(f"No suspicious pairs found for '{test.title}'"))
+            return
+
+        self.stdout.write(f"Suspicious answer-sheet pairs for '{test.title}':")
+        self.stdout.write(
+            f"{'#':>3}  {'Attempts':<15} {'Div':<4} {'Same':>5} {'SameWrong':>9} {'BothWrong':>9} "
+            f"{'Ratio':>6} {'Run':>4} {'Gap(min)':>8}  Students"
+        )
+        for rank, pair in enumerate(pairs, start=1):
+            students = ' / '.join(f"{name or '?'} ({roll_no or '-'})" for name, roll_no in pair['students'])
+            attempts = f"{pair['attempts'][0]}-{pair['attempts'][1]}"
+            self.stdout.write(
+                f"{rank:>3}  {attempts:<15} {pair['division']:<4} {pair['identical']:>5} "
+                f"{pair['shared_wrong']:>9} {pair['both_wrong']:>9} {pair['wrong_match_ratio']:>6.2f} "
+                f"{pair['longest_run']:>4} {pair['start_gap_minutes']:>8}  {students}"
+            )
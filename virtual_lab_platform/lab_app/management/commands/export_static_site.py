@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from lab_app.static_export import export_site
+import time
+
+class Command(BaseCommand):
+    help = ('Render every active subject and experiment page into a static HTML bundle with '
+            'fingerprinted assets. Only pages whose content changed since the last build are rendered.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=str, default=str(settings.STATIC_EXPORT_ROOT),
+                            help='Bundle directory (default: STATIC_EXPORT_ROOT)')
+        parser.add_argument('--full', action='store_true', help='Render every page, ignoring the last build manifest')
+
+    def handle(self, *args, **kwargs):
+        started = time.monotonic()
+        counts = export_site(kwargs['output'], full=kwargs['full'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported to {kwargs['output']}: {counts['written']} pages written, {counts['unchanged']} unchanged, "
+            f"{counts['removed']} removed in {time.monotonic() - started:.2f}s"
+        ))
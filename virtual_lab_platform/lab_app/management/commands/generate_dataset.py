@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from lab_app.synthetic import DatasetGenerator
+from lab_app import search
+import time
+
+class Command(BaseCommand):
+    help = ('Generate a deterministic synthetic dataset (students, catalog, attempts, responses, '
+            'lab progress) for benchmarks and load tests. Use a scratch database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=3000, help='Number of student accounts')
+        parser.add_argument('--subjects', type=int, default=200, help='Subjects, spread over every branch and semester')
+        parser.add_argument('--experiments-per-subject', type=int, default=5, help='Experiments (each with a test) per subject')
+        parser.add_argument('--questions', type=int, default=20, help='MCQs per test')
+        parser.add_argument('--days', type=int, default=120, help='Length of the simulated history in days')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed; the same seed gives the same data')
+        parser.add_argument('--prefix', type=str, default='synth', help='Username and roll number prefix (alphanumeric)')
+        parser.add_argument('--password', type=str, default='password', help='Password of every generated student')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk INSERT')
+        parser.add_argument('--skip-search-index', action='store_true', help='Do not rebuild the search index afterwards')
+
+    def handle(self, *args, **kwargs):
+        if not kwargs['prefix'].isalnum():
+            raise CommandError('--prefix must be alphanumeric (it is used in roll numbers)')
+        generator = DatasetGenerator(
+            students=kwargs['students'], subjects=kwargs['subjects'],
+            experiments_per_subject=kwargs['experiments_per_subject'],
+            questions_per_test=kwargs['questions'], days=kwargs['days'], seed=kwargs['seed'],
+            prefix=kwargs['prefix'], password=kwargs['password'], batch_size=kwargs['batch_size'],
+            stdout=self.stdout,
+        )
+        started = time.monotonic()
+        try:
+            counts = generator.run()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if not kwargs['skip_search_index']:
+            index_started = time.monotonic()
+            documents = search.rebuild_index()
+            self.stdout.write(f'search index: {documents} documents in {time.monotonic() - index_started:.1f}s')
+
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total} rows ({counts['responses']} responses) in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,241 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from lab_app.models import Experiment, MCQQuestion
+from allauth.account.models import EmailAddress
+from http.cookiejar import CookieJar
+import random
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROUTES = [
+    'login (GET)', 'login (POST)', 'dashboard', 'subject_list', 'experiment_detail',
+    'experiment_test (GET)', 'experiment_test (POST)', 'experiment_test_result',
+]
+
+def allowed_host():
+    """A host name the configured ALLOWED_HOSTS accepts; localhost when DEBUG allows it"""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+class ClientSession:
+    """Requests through Django's WSGI handler in this process"""
+
+    def __init__(self, index):
+        # A Host header ALLOWED_HOSTS accepts (the client's default
+        # 'testserver' is only allowed under the test runner), and an
+        # address per student, as each sits at their own lab machine
+        self.client = Client(
+            raise_request_exception=False, HTTP_HOST=allowed_host(),
+            REMOTE_ADDR=f'10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256 + 1}',
+        )
+
+    def request(self, method, path, data=None):
+        if method == 'POST':
+            return self.client.post(path, data or {}).status_code
+        return self.client.get(path).status_code
+
+class HttpSession:
+    """Requests against a running server, with cookies and CSRF like a browser"""
+
+    class NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), self.NoRedirect,
+        )
+
+    def request(self, method, path, data=None):
+        url = self.base_url + path
+        body = None
+        headers = {'Referer': url}
+        if method == 'POST':
+            token = next((c.value for c in self.cookies if c.name == 'csrftoken'), '')
+            body = urllib.parse.urlencode({**(data or {}), 'csrfmiddlewaretoken': token}).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        try:
+            with self.opener.open(urllib.request.Request(url, body, headers, method=method), timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            # Redirects land here too because they are not followed
+            return e.code
+
+class Command(BaseCommand):
+    help = ('Simulate a lab session: N students log in, browse an experiment, take its test '
+            'and view the result. Reports per-route latency percentiles, throughput and '
+            'error rates. Runs in-process unless --base-url points at a running server. '
+            'The simulated students are created for the run and deleted afterwards; it refuses '
+            'to run unless DEBUG is on or --scratch says the database is disposable. In-process '
+            'runs switch admission control off; for a server, set its ADMISSION_TEST_* limits.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=20, help='Simulated students')
+        parser.add_argument('--concurrency', type=int, help='Students active at once (default: all of them)')
+        parser.add_argument('--iterations', type=int, default=1, help='Test attempts per student after logging in')
+        parser.add_argument('--experiment', type=int, help='Experiment to use (default: first active one with a test)')
+        parser.add_argument('--base-url', type=str, default='', help='Server to drive, e.g. http://127.0.0.1:8000')
+        parser.add_argument('--password', type=str, help='Password of the simulated students (default: random per run)')
+        parser.add_argument('--think', type=float, default=0.0, help='Maximum random pause in seconds between pages')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for answers and pauses')
+        parser.add_argument('--scratch', action='store_true',
+                            help='Confirm the database is disposable (needed when DEBUG is off)')
+
+    def handle(self, *args, **kwargs):
+        if not (settings.DEBUG or kwargs['scratch']):
+            raise CommandError('loadtest creates accounts and test attempts; run it against a development '
+                               'or scratch database (DEBUG on), or pass --scratch to confirm')
+        kwargs['password'] = kwargs['password'] or secrets.token_urlsafe(16)
+        experiment = self.get_experiment(kwargs['experiment'])
+        questions = list(
+            MCQQuestion.objects.filter(test=experiment.mcq_test).values_list('id', flat=True)
+        )
+        emails = self.ensure_students(kwargs['students'], experiment.subject, kwargs['password'])
+        try:
+            # Measures the application, not the admission limiter, whose
+            # queued 503s would count as failures (in-process runs only;
+            # a server given by --base-url applies its own limits)
+            with override_settings(ADMISSION_CONTROL={}):
+                failed = self.run(experiment, questions, emails, kwargs)
+        finally:
+            # Their attempts and progress go with them
+            User.objects.filter(username__in=emails).delete()
+        if failed:
+            raise CommandError(f'{failed} requests failed')
+
+    def run(self, experiment, questions, emails, kwargs):
+        urls = {
+            'login': reverse('account_login'),
+            'dashboard': reverse('lab_app:dashboard'),
+            'subject_list': reverse('lab_app:subject_list', args=[experiment.subject_id]),
+            'experiment_detail': reverse('lab_app:experiment_detail', args=[experiment.id]),
+            'experiment_test': reverse('lab_app:experiment_test', args=[experiment.id]),
+            'experiment_test_result': reverse('lab_app:experiment_test_result', args=[experiment.id]),
+        }
+        samples = {route: [] for route in ROUTES}
+        errors = {route: 0 for route in ROUTES}
+        lock = threading.Lock()
+        slots = threading.BoundedSemaphore(kwargs['concurrency'] or len(emails))
+
+        def timed(session, route, method, path, expected, data=None):
+            started = time.perf_counter()
+            try:
+                status = session.request(method, path, data)
+            except Exception:
+                status = None
+            elapsed = time.perf_counter() - started
+            with lock:
+                if status == expected:
+                    samples[route].append(elapsed)
+                else:
+                    errors[route] += 1
+
+        def simulate(index, email):
+            with slots:
+                browse(index, email)
+
+        def browse(index, email):
+            rnd = random.Random(kwargs['seed'] + index)
+            session = HttpSession(kwargs['base_url']) if kwargs['base_url'] else ClientSession(index)
+
+            def think():
+                if kwargs['think']:
+                    time.sleep(rnd.uniform(0, kwargs['think']))
+
+            try:
+                timed(session, 'login (GET)', 'GET', urls['login'], 200)
+                timed(session, 'login (POST)', 'POST', urls['login'], 302,
+                      {'login': email, 'password': kwargs['password']})
+                for _ in range(kwargs['iterations']):
+                    for route in ('dashboard', 'subject_list', 'experiment_detail'):
+                        think()
+                        timed(session, route, 'GET', urls[route], 200)
+                    think()
+                    timed(session, 'experiment_test (GET)', 'GET', urls['experiment_test'], 200)
+                    answers = {f'question_{qid}': rnd.choice('ABCD') for qid in questions}
+                    think()
+                    timed(session, 'experiment_test (POST)', 'POST', urls['experiment_test'], 302, answers)
+                    timed(session, 'experiment_test_result', 'GET', urls['experiment_test_result'], 200)
+            finally:
+                connections.close_all()
+
+        target = kwargs['base_url'] or 'in-process WSGI handler'
+        self.stdout.write(f'{len(emails)} students on "{experiment.title}" ({len(questions)} questions) via {target}')
+        threads = [threading.Thread(target=simulate, args=(i, email)) for i, email in enumerate(emails)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return self.report(samples, errors, elapsed)
+
+    def get_experiment(self, experiment_id):
+        experiments = Experiment.objects.filter(
+            is_active=True, subject__is_active=True, mcq_test__is_active=True,
+            mcq_test__mcq_questions__isnull=False,
+        ).select_related('subject', 'mcq_test').distinct().order_by('id')
+        if experiment_id:
+            experiments = experiments.filter(id=experiment_id)
+        experiment = experiments.first()
+        if experiment is None:
+            raise CommandError('No active experiment with an active, non-empty test found')
+        return experiment
+
+    def ensure_students(self, count, subject, password):
+        """Create loadtest-N@example.com students enrolled in the subject's catalog"""
+        emails = []
+        for i in range(count):
+            email = f'loadtest-{i}@example.com'
+            # Left over from an interrupted run
+            user, created = User.objects.get_or_create(username=email, defaults={'email': email})
+            user.set_password(password)
+            user.save()
+            EmailAddress.objects.get_or_create(user=user, email=email, defaults={'primary': True, 'verified': True})
+            profile = user.profile
+            profile.full_name = f'Load Test {i}'
+            profile.roll_no = f'LT{i:05d}'
+            profile.contact_number = '9000000000'
+            profile.branch = subject.branch
+            profile.current_semester = subject.semester
+            profile.role = 'student'
+            profile.save()
+            emails.append(email)
+        return emails
+
+    def report(self, samples, errors, elapsed):
+        self.stdout.write(
+            f"{'Route':<24} {'Requests':>8} {'Errors':>7} {'Err %':>6} {'Req/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+        )
+        for route in ROUTES:
+            latencies = sorted(samples[route])
+            total = len(latencies) + errors[route]
+            if not total:
+                continue
+            def percentile(q):
+                return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else 0.0
+            self.stdout.write(
+                f"{route:<24} {total:>8} {errors[route]:>7} {errors[route] * 100 / total:>6.1f} "
+                f"{len(latencies) / elapsed:>8.1f} {percentile(0.50):>8.1f} "
+                f"{percentile(0.95):>8.1f} {percentile(0.99):>8.1f}"
+            )
+        requests = sum(len(s) for s in samples.values()) + sum(errors.values())
+        failed = sum(errors.values())
+        summary = f'{requests} requests in {elapsed:.1f}s ({requests / elapsed:.1f} req/s), {failed} errors'
+        self.stdout.write(self.style.SUCCESS(summary) if not failed else self.style.WARNING(summary))
+        return failed
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from lab_app.importtime import BUDGETS, TARGETS, profile_imports
+from collections import defaultdict
+
+
+class Command(BaseCommand):
+    help = ('Profile the imports of a cold start-up (django.setup() as run by manage.py, or loading the '
+            'WSGI application) with python -X importtime, and check it against the start-up budget')
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*', help=f"Start-ups to profile: {', '.join(TARGETS)} (default: all)")
+        parser.add_argument('--top', type=int, default=15, help='Rows to list per start-up')
+        parser.add_argument('--modules', action='store_true',
+                            help='List single modules by their own import time instead of totals per package')
+
+    def handle(self, *args, **kwargs):
+        unknown = set(kwargs['targets']) - set(TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown start-ups: {', '.join(sorted(unknown))}. Choose from {', '.join(TARGETS)}.")
+
+        failures = []
+        for target in kwargs['targets'] or list(TARGETS):
+            try:
+                profile = profile_imports(target)
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            self.stdout.write(f"{target}: {profile['seconds']:.3f}s (budget {BUDGETS[target]:.1f}s), "
+                              f"{len(profile['imports'])} modules imported")
+
+            if kwargs['modules']:
+                rows = [(name, self_us) for name, self_us, _, _ in profile['imports']]
+            else:
+                totals = defaultdict(int)
+                for name, self_us, _, _ in profile['imports']:
+                    totals[name.split('.')[0]] += self_us
+                rows = list(totals.items())
+            self.stdout.write(f"  {'ms':>8}  {'Module' if kwargs['modules'] else 'Package'}")
+            for name, self_us in sorted(rows, key=lambda row: -row[1])[:kwargs['top']]:
+                self.stdout.write(f'  {self_us / 1000:>8.1f}  {name}')
+
+            if profile['seconds'] > BUDGETS[target]:
+                failures.append(f"{target} took {profile['seconds']:.3f}s, over its {BUDGETS[target]:.1f}s budget")
+            if profile['deferred']:
+                failures.append(f"{target} imports {', '.join(profile['deferred'])} at start-up")
+        if failures:
+            raise CommandError('Start-up regressions:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Start-up within budget'))
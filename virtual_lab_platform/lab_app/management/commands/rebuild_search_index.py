@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from lab_app import search
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for experiments, questions and MCQs'
+
+    def handle(self, *args, **kwargs):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING('Full-text search is only available on SQLite and PostgreSQL'))
+            return
+        count = search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} documents"))
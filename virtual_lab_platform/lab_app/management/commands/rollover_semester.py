@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from lab_app.models import UserProfile
+from lab_app.rollover import FINAL_SEMESTER, promote, student_cohort
+import time
+
+class Command(BaseCommand):
+    help = ('Move student cohorts to the next semester with set-based UPDATEs in one transaction, '
+            'then rebuild the cohort rollups')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branch', type=str, choices=[b for b, _ in UserProfile.BRANCH_CHOICES],
+                            help='Only students of this branch')
+        parser.add_argument('--semester', type=int, choices=range(1, FINAL_SEMESTER + 1),
+                            help='Only students currently in this semester')
+        parser.add_argument('--division', type=str, help='Only students of this division')
+        parser.add_argument('--step', type=int, default=1, help='Semesters to move; negative moves students back')
+        parser.add_argument('--all', action='store_true', help='Required to roll over every student when no filter is given')
+        parser.add_argument('--skip-rollups', action='store_true', help='Do not rebuild the cohort rollups afterwards')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the students that would move')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['step'] == 0:
+            raise CommandError('--step must not be 0')
+        filters = {key: kwargs[key] for key in ('branch', 'semester', 'division')}
+        if not any(filters.values()) and not kwargs['all']:
+            raise CommandError('Give --branch, --semester or --division, or --all to roll over every student')
+
+        profiles = student_cohort(**filters)
+        if kwargs['dry_run']:
+            self.stdout.write(f'{profiles.count()} students match')
+            return
+
+        started = time.monotonic()
+        counts = promote(profiles, step=kwargs['step'], refresh_rollups=not kwargs['skip_rollups'])
+        summary = (f"Moved {counts['promoted']} students by {kwargs['step']:+d} semester(s), "
+                   f"held {counts['held']} at the end of the range")
+        if counts['rollups'] is not None:
+            summary += f", rebuilt {counts['rollups']} rollup rows"
+        self.stdout.write(self.style.SUCCESS(f'{summary} in {time.monotonic() - started:.2f}s'))
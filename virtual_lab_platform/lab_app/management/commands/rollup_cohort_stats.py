@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from lab_app.analytics import build_cohort_rollups
+import time
+
+class Command(BaseCommand):
+    help = 'Recompute cohort analytics rollups (run nightly from cron, or on demand)'
+
+    def handle(self, *args, **kwargs):
+        started = time.monotonic()
+        rows = build_cohort_rollups()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} cohort rollup rows in {elapsed:.2f}s"))
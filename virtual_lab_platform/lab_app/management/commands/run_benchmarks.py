@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+from lab_app.benchmarks import compare_with_baseline, over_budget, run_benchmarks
+import json
+
+class Command(BaseCommand):
+    help = ('Time the hot paths on a throwaway test database, check their query budgets, '
+            'write the results as JSON and compare them with a saved baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Only run benchmarks whose name starts with one of these')
+        parser.add_argument('--output', type=str, default='benchmark-results.json', help='Where to write the results')
+        parser.add_argument('--baseline', type=str, help='Results file to compare against')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed slowdown of the median before it counts as a regression (0.25 = 25%%)')
+        parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for fixture sizes')
+        parser.add_argument('--max-rounds', type=int, default=200, help='Upper limit of timed rounds per benchmark')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do not prompt before replacing an existing test database')
+
+    def handle(self, *args, **kwargs):
+        baseline = None
+        if kwargs['baseline']:
+            try:
+                with open(kwargs['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read baseline: {e}')
+
+        # The async views' query workers must not keep connections open,
+        # or the test database cannot be dropped afterwards
+        connections.settings['default']['CONN_MAX_AGE'] = 0
+        setup_test_environment(debug=False)
+        runner = DiscoverRunner(interactive=kwargs['interactive'], verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            self.stdout.write(f"{'Benchmark':<36} {'Median ms':>10} {'Min ms':>10} {'Rounds':>6} Queries")
+            report = run_benchmarks(
+                names=kwargs['names'], scale=kwargs['scale'], max_rounds=kwargs['max_rounds'], stdout=self.stdout,
+            )
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        with open(kwargs['output'], 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        self.stdout.write(f"Results written to {kwargs['output']}")
+
+        failures = [f'{name} is over its query budget' for name in over_budget(report)]
+        if baseline is not None:
+            for name, metric, before, after in compare_with_baseline(report, baseline, kwargs['tolerance']):
+                failures.append(f'{name}: {metric} {before} -> {after}')
+        if failures:
+            raise CommandError('Benchmark regressions:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('All benchmarks within budget'
+                                             + (' and baseline' if baseline is not None else '')))
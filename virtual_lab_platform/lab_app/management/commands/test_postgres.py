@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+
+class Command(BaseCommand):
+    help = ('Run the test suite against a throwaway PostgreSQL server. '
+            'Needs initdb and pg_ctl on PATH (or in --pg-bin) and a non-root user.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('test_labels', nargs='*', help='Test labels passed on to manage.py test')
+        parser.add_argument('--pg-bin', type=str, default=os.environ.get('PG_BIN', ''),
+                            help='Directory containing initdb and pg_ctl')
+        parser.add_argument('--keep', action='store_true', help='Keep the data directory for inspection')
+
+    def handle(self, *args, **kwargs):
+        pg_bin = kwargs['pg_bin']
+        initdb = os.path.join(pg_bin, 'initdb') if pg_bin else shutil.which('initdb')
+        pg_ctl = os.path.join(pg_bin, 'pg_ctl') if pg_bin else shutil.which('pg_ctl')
+        if not initdb or not pg_ctl or not os.path.exists(initdb):
+            raise CommandError('initdb/pg_ctl not found; install PostgreSQL or pass --pg-bin')
+
+        workdir = tempfile.mkdtemp(prefix='vlab-pg-')
+        datadir = os.path.join(workdir, 'data')
+        port = self.free_port()
+        try:
+            subprocess.run(
+                [initdb, '-D', datadir, '-U', 'postgres', '-A', 'trust', '--no-sync', '-E', 'UTF8'],
+                check=True, stdout=subprocess.DEVNULL,
+            )
+            # Listen on a Unix socket in the work directory only
+            subprocess.run(
+                [pg_ctl, '-D', datadir, '-w', '-l', os.path.join(workdir, 'server.log'),
+                 '-o', f"-p {port} -k {workdir} -c listen_addresses='' -c fsync=off", 'start'],
+                check=True, stdout=subprocess.DEVNULL,
+            )
+        except (subprocess.CalledProcessError, OSError) as e:
+            shutil.rmtree(workdir, ignore_errors=True)
+            raise CommandError(f'Could not start PostgreSQL: {e}')
+
+        env = {
+            **os.environ,
+            'DB_ENGINE': 'postgresql',
+            'DB_NAME': 'postgres',
+            'DB_USER': 'postgres',
+            'DB_PASSWORD': '',
+            'DB_HOST': workdir,
+            'DB_PORT': str(port),
+            'DB_SSLMODE': 'disable',
+        }
+        self.stdout.write(f'PostgreSQL running on {workdir} port {port}')
+        try:
+            result = subprocess.run(
+                [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'test', *kwargs['test_labels']],
+                env=env,
+            )
+        finally:
+            subprocess.run([pg_ctl, '-D', datadir, '-m', 'immediate', 'stop'], stdout=subprocess.DEVNULL)
+            if kwargs['keep']:
+                self.stdout.write(f'Data directory kept at {datadir}')
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        if result.returncode:
+            raise CommandError('Tests failed on PostgreSQL')
+        self.stdout.write(self.style.SUCCESS('Tests passed on PostgreSQL'))
+
+    def free_port(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
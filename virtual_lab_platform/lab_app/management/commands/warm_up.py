@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from lab_app.warmup import STATUS, warm_up
+
+
+class Command(BaseCommand):
+    help = ('Run the worker warm-up steps (imports, templates, caches) and report how long each took; '
+            'useful to check what a cold worker pays for')
+
+    def handle(self, *args, **kwargs):
+        steps = warm_up()
+        for name, seconds in steps.items():
+            self.stdout.write(f'{name:<14} {seconds * 1000:>9.1f} ms')
+        for name, error in STATUS['errors'].items():
+            self.stderr.write(f'{name:<14} failed: {error}')
+        self.stdout.write(self.style.SUCCESS(f'Warm-up finished in {sum(steps.values()):.2f}s'))
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.20 on 2026-10-19 08:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab_app', '0009_alter_testattempt_unique_together'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch', models.CharField(choices=[('CSE', 'Computer Science Engineering'), ('ECE', 'Electronics and Communication Engineering'), ('EEE', 'Electrical and Electronics Engineering'), ('ME', 'Mechanical Engineering'), ('CE', 'Civil Engineering'), ('IT', 'Information Technology'), ('AI', 'Artificial Intelligence'), ('DS', 'Data Science'), ('Other', 'Other')], max_length=10)),
+                ('semester', models.IntegerField(choices=[(1, '1st Semester'), (2, '2nd Semester'), (3, '3rd Semester'), (4, '4th Semester'), (5, '5th Semester'), (6, '6th Semester'), (7, '7th Semester'), (8, '8th Semester')])),
+                ('division', models.CharField(blank=True, default='', max_length=1)),
+                ('student_count', models.IntegerField(default=0)),
+                ('result_count', models.IntegerField(default=0, help_text='Best attempt per student and test')),
+                ('avg_score', models.FloatField(blank=True, null=True)),
+                ('pass_rate', models.FloatField(blank=True, null=True)),
+                ('completion_rate', models.FloatField(blank=True, null=True)),
+                ('p10', models.FloatField(blank=True, null=True)),
+                ('p25', models.FloatField(blank=True, null=True)),
+                ('p50', models.FloatField(blank=True, null=True)),
+                ('p75', models.FloatField(blank=True, null=True)),
+                ('p90', models.FloatField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+                ('subject', models.ForeignKey(blank=True, help_text='Empty for the cohort-wide row covering all of its subjects', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cohort_rollups', to='lab_app.subject')),
+            ],
+            options={
+                'ordering': ['branch', 'semester', 'division', 'subject'],
+                'unique_together': {('branch', 'semester', 'division', 'subject')},
+            },
+        ),
+    ]
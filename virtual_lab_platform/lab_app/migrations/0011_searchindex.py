@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS lab_app_searchindex USING fts5("
+            "kind UNINDEXED, object_id UNINDEXED, parent_id UNINDEXED, "
+            "branch UNINDEXED, semester UNINDEXED, is_active UNINDEXED, "
+            "title, body, tokenize='porter unicode61')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS lab_app_searchindex ("
+            "id bigint PRIMARY KEY, kind varchar(20) NOT NULL, object_id bigint NOT NULL, "
+            "parent_id bigint, branch varchar(10) NOT NULL, semester integer NOT NULL, "
+            "is_active boolean NOT NULL, title text NOT NULL, body text NOT NULL, "
+            "document tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('english', title), 'A') || "
+            "setweight(to_tsvector('english', body), 'B')) STORED)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS lab_app_searchindex_document_idx "
+            "ON lab_app_searchindex USING GIN (document)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS lab_app_searchindex_scope_idx "
+            "ON lab_app_searchindex (branch, semester)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS lab_app_searchindex")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab_app', '0010_cohortrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
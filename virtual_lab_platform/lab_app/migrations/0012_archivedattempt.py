@@ -0,0 +1,37 @@
+# Generated by Django 4.2.20 on 2026-10-19 09:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lab_app', '0011_searchindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempt_id', models.BigIntegerField(help_text='id of the original TestAttempt', unique=True)),
+                ('score', models.IntegerField(default=0)),
+                ('total_marks', models.IntegerField(default=0)),
+                ('percentage', models.FloatField(default=0.0)),
+                ('time_taken', models.DurationField(blank=True, null=True)),
+                ('started_at', models.DateTimeField()),
+                ('completed_at', models.DateTimeField()),
+                ('response_count', models.IntegerField(default=0)),
+                ('responses', models.BinaryField(help_text='zlib-compressed, column-oriented JSON of the responses')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attempts', to=settings.AUTH_USER_MODEL)),
+                ('test', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attempts', to='lab_app.test')),
+            ],
+            options={
+                'ordering': ['-completed_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-19 09:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab_app', '0012_archivedattempt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='thumbnail_key',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Name of the processed picture and its thumbnails; empty until processed', max_length=40),
+        ),
+    ]
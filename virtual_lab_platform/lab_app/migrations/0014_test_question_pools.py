@@ -0,0 +1,33 @@
+# Generated by Django 4.2.20 on 2026-10-19 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lab_app', '0013_userprofile_thumbnail_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='test',
+            name='questions_per_attempt',
+            field=models.PositiveIntegerField(blank=True, help_text='Draw this many questions from the question bank for each attempt; empty asks every question. Passing marks are scaled to the marks of the drawn questions.', null=True),
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='shuffle_options',
+            field=models.BooleanField(default=False, help_text='Show the options of each question in a random order per attempt'),
+        ),
+        migrations.AddField(
+            model_name='testattempt',
+            name='draw',
+            field=models.BinaryField(blank=True, help_text='Drawn question ids as varints (see question_pool.py)', null=True),
+        ),
+        migrations.AddField(
+            model_name='testattempt',
+            name='draw_seed',
+            field=models.BigIntegerField(blank=True, editable=False, help_text='Seed of the option order', null=True),
+        ),
+    ]
@@ -1,10 +1,73 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
+from django.db.models.fields.files import FieldFile
 
 # Create your models here.
 
-class UserProfile(models.Model):
+class DirtyFieldsMixin:
+    """
+    Track which concrete fields changed since the instance was loaded or
+    saved, so ``save()`` writes only those columns (plus ``auto_now``
+    fields) and skips the write, and its signals, when nothing changed.
+
+    ``post_save`` receivers get the written fields as ``update_fields``
+    and can ignore saves that did not touch what they care about. An
+    explicit ``update_fields`` or ``force_insert`` is passed through as is.
+    """
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+    
+    def _tracked_value(self, field):
+        value = getattr(self, field.attname)
+        if isinstance(value, FieldFile):
+            # A newly assigned file is uncommitted until save() stores it
+            return value.name, value._committed
+        return value
+    
+    def _snapshot(self, fields=None):
+        loaded = self.__dict__
+        if fields is None or not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+        for field in self._meta.concrete_fields:
+            if field.attname in loaded and (fields is None or field.attname in fields or field.name in fields):
+                self._loaded_values[field.attname] = self._tracked_value(field)
+    
+    def get_dirty_fields(self):
+        """Names of the fields changed since the last load or save (all of them for a new instance)"""
+        fields = [f for f in self._meta.concrete_fields if not f.primary_key]
+        if self._state.adding or not hasattr(self, '_loaded_values'):
+            return [f.name for f in fields]
+        return [
+            f.name for f in fields
+            if f.attname in self.__dict__ and (
+                f.attname not in self._loaded_values
+                or self._loaded_values[f.attname] != self._tracked_value(f)
+            )
+        ]
+    
+    def save(self, *args, **kwargs):
+        if (not args and not self._state.adding and hasattr(self, '_loaded_values')
+                and kwargs.get('update_fields') is None and not kwargs.get('force_insert')):
+            dirty = self.get_dirty_fields()
+            if not dirty:
+                return
+            kwargs['update_fields'] = dirty + [
+                f.name for f in self._meta.concrete_fields
+                if getattr(f, 'auto_now', False) and f.name not in dirty
+            ]
+        super().save(*args, **kwargs)
+        self._snapshot(kwargs.get('update_fields'))
+    
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        self._snapshot(fields)
+
+class UserProfile(DirtyFieldsMixin, models.Model):
     """Extended user profile for students and admins"""
     ROLE_CHOICES = [
         ('student', 'Student'),
@@ -59,6 +122,10 @@ class UserProfile(models.Model):
         null=True
     )
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    thumbnail_key = models.CharField(
+        max_length=40, blank=True, default='', editable=False,
+        help_text="Name of the processed picture and its thumbnails; empty until processed"
+    )
     is_profile_complete = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -70,6 +137,9 @@ class UserProfile(models.Model):
         # Mark profile as complete if all required fields are filled
         if self.full_name and self.roll_no and self.branch and self.current_semester and self.contact_number:
             self.is_profile_complete = True
+        # A new upload needs new thumbnails
+        if 'profile_picture' in self.get_dirty_fields():
+            self.thumbnail_key = ''
         super().save(*args, **kwargs)
 
 class Subject(models.Model):
@@ -116,7 +186,7 @@ class Question(models.Model):
     def __str__(self):
         return self.question_text[:50] + "..." if len(self.question_text) > 50 else self.question_text
 
-class LabProgress(models.Model):
+class LabProgress(DirtyFieldsMixin, models.Model):
     """Track student progress in lab experiments"""
     STATUS_CHOICES = [
         ('not_started', 'Not Started'),
@@ -170,6 +240,12 @@ class Test(models.Model):
     duration = models.IntegerField(help_text="Duration in minutes")
     total_marks = models.IntegerField(default=0)
     passing_marks = models.IntegerField(default=0)
+    questions_per_attempt = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Draw this many questions from the question bank for each attempt; empty asks every question. "
+                  "Passing marks are scaled to the marks of the drawn questions."
+    )
+    shuffle_options = models.BooleanField(default=False, help_text="Show the options of each question in a random order per attempt")
     is_active = models.BooleanField(default=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_tests')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -184,6 +260,11 @@ class Test(models.Model):
     @property
     def question_count(self):
         return self.mcq_questions.count()
+    
+    @property
+    def draws_questions(self):
+        """Whether attempts get their own draw of questions or option order"""
+        return bool(self.questions_per_attempt) or self.shuffle_options
 
 class MCQQuestion(models.Model):
     """Multiple Choice Questions for tests"""
@@ -207,6 +288,16 @@ class MCQQuestion(models.Model):
     def __str__(self):
         return f"Q{self.order}: {self.question_text[:50]}..."
 
+def passing_marks_for(total_marks, test):
+    """
+    Marks an attempt worth ``total_marks`` needs to pass the test. An
+    attempt drawn from a question bank covers fewer marks than the whole
+    bank, so the passing marks are scaled to it (rounded up).
+    """
+    if total_marks and test.total_marks and total_marks != test.total_marks:
+        return -(-test.passing_marks * total_marks // test.total_marks)
+    return test.passing_marks
+
 class TestAttempt(models.Model):
     """Track student test attempts"""
     STATUS_CHOICES = [
@@ -224,6 +315,10 @@ class TestAttempt(models.Model):
     time_taken = models.DurationField(null=True, blank=True)
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    draw_seed = models.BigIntegerField(null=True, blank=True, editable=False, help_text="Seed of the option order")
+    draw = models.BinaryField(
+        null=True, blank=True, editable=False, help_text="Drawn question ids as varints (see question_pool.py)"
+    )
     
     class Meta:
         ordering = ['-started_at']
@@ -234,7 +329,7 @@ class TestAttempt(models.Model):
     
     @property
     def is_passed(self):
-        return self.score >= self.test.passing_marks
+        return self.score >= passing_marks_for(self.total_marks, self.test)
     
     @property
     def passed(self):
@@ -259,3 +354,65 @@ class TestResponse(models.Model):
     
     def __str__(self):
         return f"{self.attempt.student.profile.full_name} - Q{self.question.order} - {self.selected_option or 'No Answer'}"
+
+class ArchivedAttempt(models.Model):
+    """Summary of a completed attempt moved out of the live tables by ``archive.py``"""
+    attempt_id = models.BigIntegerField(unique=True, help_text="id of the original TestAttempt")
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_attempts')
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='archived_attempts')
+    score = models.IntegerField(default=0)
+    total_marks = models.IntegerField(default=0)
+    percentage = models.FloatField(default=0.0)
+    time_taken = models.DurationField(null=True, blank=True)
+    started_at = models.DateTimeField()
+    completed_at = models.DateTimeField()
+    response_count = models.IntegerField(default=0)
+    responses = models.BinaryField(help_text="zlib-compressed, column-oriented JSON of the responses")
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    # Only completed attempts are archived
+    status = 'completed'
+    
+    class Meta:
+        ordering = ['-completed_at']
+    
+    def __str__(self):
+        return f"{self.student.profile.full_name} - {self.test.title} ({self.percentage:.1f}%, archived)"
+    
+    @property
+    def is_passed(self):
+        return self.score >= passing_marks_for(self.total_marks, self.test)
+    
+    @property
+    def passed(self):
+        """Alias for is_passed for template compatibility"""
+        return self.is_passed
+
+class CohortRollup(models.Model):
+    """Pre-computed test and progress aggregates per student cohort and subject"""
+    branch = models.CharField(max_length=10, choices=UserProfile.BRANCH_CHOICES)
+    semester = models.IntegerField(choices=UserProfile.SEMESTER_CHOICES)
+    division = models.CharField(max_length=1, blank=True, default='')
+    subject = models.ForeignKey(
+        Subject, on_delete=models.CASCADE, related_name='cohort_rollups', null=True, blank=True,
+        help_text="Empty for the cohort-wide row covering all of its subjects"
+    )
+    student_count = models.IntegerField(default=0)
+    result_count = models.IntegerField(default=0, help_text="Best attempt per student and test")
+    avg_score = models.FloatField(null=True, blank=True)
+    pass_rate = models.FloatField(null=True, blank=True)
+    completion_rate = models.FloatField(null=True, blank=True)
+    p10 = models.FloatField(null=True, blank=True)
+    p25 = models.FloatField(null=True, blank=True)
+    p50 = models.FloatField(null=True, blank=True)
+    p75 = models.FloatField(null=True, blank=True)
+    p90 = models.FloatField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['branch', 'semester', 'division', 'subject']
+        unique_together = ['branch', 'semester', 'division', 'subject']
+    
+    def __str__(self):
+        scope = self.subject.name if self.subject_id else 'All subjects'
+        return f"{self.branch} Sem {self.semester} {self.division or '-'} - {scope}"
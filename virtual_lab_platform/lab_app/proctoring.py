@@ -0,0 +1,126 @@
+"""
+Answer-pattern similarity detection for proctoring.
+
+Each completed attempt of a test is encoded as a one-hot row of
+(question, option) selections. Pairwise counts of identical answers and
+of identical wrong answers are then matrix products of those rows. Only
+attempts in the same division that started within a time window of each
+other are compared, so large cohorts are split into small blocks.
+"""
+import numpy as np
+
+from .analytics import OPTION_LABELS, load_response_matrix
+from .models import TestAttempt
+
+DEFAULT_WINDOW_MINUTES = 60
+DEFAULT_MIN_SHARED_WRONG = 3
+# Rows compared per matrix product; bounds memory for very large blocks
+CHUNK_SIZE = 512
+
+
+def _one_hot(choices, mask):
+    """Encode selected options as an (attempts x questions*4) uint8 matrix"""
+    n_attempts, n_questions = choices.shape
+    n_options = len(OPTION_LABELS) - 1
+    encoded = np.zeros((n_attempts, n_questions * n_options), dtype=np.uint8)
+    rows, cols = np.nonzero(mask)
+    encoded[rows, cols * n_options + choices[rows, cols] - 1] = 1
+    return encoded
+
+
+def _longest_identical_run(first, second):
+    """Longest run of consecutive questions answered identically by both"""
+    same = np.concatenate(([0], ((first == second) & (first != 0)).astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(same))
+    if not len(edges):
+        return 0
+    return int((edges[1::2] - edges[::2]).max())
+
+
+def _compare_block(indices, starts, window, answered, wrong, wrong_any, min_shared_wrong):
+    """Yield candidate pairs (i, j, identical, shared_wrong, both_wrong) in one block"""
+    order = indices[np.argsort(starts[indices], kind='stable')]
+    block_starts = starts[order]
+    for lo in range(0, len(order), CHUNK_SIZE):
+        hi = min(lo + CHUNK_SIZE, len(order))
+        reach = int(np.searchsorted(block_starts, block_starts[hi - 1] + window, side='right'))
+        rows, cols = order[lo:hi], order[lo:reach]
+
+        shared_wrong = wrong[rows] @ wrong[cols].T
+        # Only pairs (row, col) with col after row and inside the time window
+        position = np.arange(lo, hi)[:, np.newaxis]
+        col_position = np.arange(lo, reach)[np.newaxis, :]
+        in_window = (col_position > position) & (
+            block_starts[lo:reach][np.newaxis, :] - block_starts[lo:hi][:, np.newaxis] <= window
+        )
+        candidates = in_window & (shared_wrong >= min_shared_wrong)
+        if not candidates.any():
+            continue
+
+        r_idx, c_idx = np.nonzero(candidates)
+        first, second = rows[r_idx], cols[c_idx]
+        identical = (answered[first] & answered[second]).sum(axis=1)
+        both_wrong = (wrong_any[first] & wrong_any[second]).sum(axis=1)
+        for k in range(len(first)):
+            yield (
+                int(first[k]), int(second[k]), int(identical[k]),
+                int(shared_wrong[r_idx[k], c_idx[k]]), int(both_wrong[k]),
+            )
+
+
+def find_similar_attempts(test, window_minutes=DEFAULT_WINDOW_MINUTES,
+                          min_shared_wrong=DEFAULT_MIN_SHARED_WRONG, limit=50):
+    """
+    Rank pairs of completed attempts of a test by answer-sheet similarity.
+
+    Pairs are scored by the share of their common wrong answers on which
+    both picked the same option. Returns a list of dicts, most suspicious
+    first.
+    """
+    # Questions an attempt was not shown are unanswered, so never match
+    attempt_ids, question_ids, keys, choices, _ = load_response_matrix(test)
+    if len(attempt_ids) < 2 or not len(question_ids):
+        return []
+
+    meta = {
+        row[0]: row[1:]
+        for row in TestAttempt.objects.filter(id__in=attempt_ids.tolist()).values_list(
+            'id', 'student_id', 'student__profile__full_name', 'student__profile__roll_no',
+            'student__profile__division', 'started_at',
+        )
+    }
+    divisions = np.array([meta[a][3] or '' for a in attempt_ids.tolist()])
+    starts = np.array([meta[a][4].timestamp() for a in attempt_ids.tolist()], dtype=np.float64)
+    window = window_minutes * 60
+
+    is_answered = choices != 0
+    is_wrong = is_answered & (choices != keys[np.newaxis, :])
+    answered = _one_hot(choices, is_answered).astype(bool)
+    wrong = _one_hot(choices, is_wrong).astype(np.float32)
+
+    pairs = []
+    for division in np.unique(divisions):
+        indices = np.flatnonzero(divisions == division)
+        if len(indices) < 2:
+            continue
+        for i, j, identical, shared_wrong, both_wrong in _compare_block(
+            indices, starts, window, answered, wrong, is_wrong, min_shared_wrong
+        ):
+            first, second = meta[int(attempt_ids[i])], meta[int(attempt_ids[j])]
+            if first[0] == second[0]:
+                # Retakes by the same student are expected to look alike
+                continue
+            pairs.append({
+                'attempts': (int(attempt_ids[i]), int(attempt_ids[j])),
+                'students': ((first[1], first[2]), (second[1], second[2])),
+                'division': division or '-',
+                'identical': identical,
+                'shared_wrong': shared_wrong,
+                'both_wrong': both_wrong,
+                'wrong_match_ratio': round(shared_wrong / both_wrong, 3) if both_wrong else 0.0,
+                'longest_run': _longest_identical_run(choices[i], choices[j]),
+                'start_gap_minutes': round(abs(starts[i] - starts[j]) / 60, 1),
+            })
+
+    pairs.sort(key=lambda p: (p['wrong_match_ratio'] * p['shared_wrong'], p['identical']), reverse=True)
+    return pairs[:limit]
@@ -0,0 +1,101 @@
+"""
+Per-attempt question draws.
+
+A test with ``questions_per_attempt`` set asks each attempt a random
+sample of its question bank; with ``shuffle_options`` every question shows
+its options in a random order. Nothing is stored per question: the
+attempt keeps the drawn question ids, in the order they are asked, as a
+varint-encoded byte string in ``TestAttempt.draw`` (one or two bytes per
+question for most ids), and a random ``draw_seed`` from which each
+question's option order is derived.
+
+Drawing reads only the ids of the bank. Rendering and grading read the K
+drawn questions by primary key and rebuild the draw from the attempt row,
+so their cost does not grow with the size of the bank. Answers are
+submitted and stored with the question's own option letters, so grading
+and results work as for any other attempt; archiving keeps the draw with
+the responses. Item analysis decodes the draws and counts each question
+only over the attempts that were shown it.
+"""
+import random
+import secrets
+
+from django.db.models import Sum
+
+from .models import MCQQuestion
+
+OPTIONS = ('A', 'B', 'C', 'D')
+
+
+def encode_ids(ids):
+    """Unsigned LEB128 varints, seven bits per byte"""
+    out = bytearray()
+    for value in ids:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_ids(data):
+    ids, value, shift = [], 0, 0
+    for byte in bytes(data):
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            ids.append(value)
+            value, shift = 0, 0
+    return ids
+
+
+def option_order(seed, question_id):
+    """The option letters of a question in the order the attempt shows them"""
+    order = list(OPTIONS)
+    random.Random(f'{seed}:{question_id}').shuffle(order)
+    return order
+
+
+def draw_attempt(attempt, test):
+    """
+    Draw the questions and option seed of a new attempt, and set its
+    ``total_marks`` to the marks of the drawn questions. Does nothing for
+    tests that ask every question in order. The caller saves the attempt.
+    """
+    if not test.draws_questions:
+        return
+    seed = secrets.randbits(62)
+    ids = list(test.mcq_questions.values_list('id', flat=True))
+    rnd = random.Random(seed)
+    if test.questions_per_attempt and test.questions_per_attempt < len(ids):
+        ids = rnd.sample(ids, test.questions_per_attempt)
+    elif test.questions_per_attempt:
+        rnd.shuffle(ids)
+    attempt.draw_seed = seed
+    attempt.draw = encode_ids(ids)
+    attempt.total_marks = MCQQuestion.objects.filter(id__in=ids).aggregate(total=Sum('marks'))['total'] or 0
+
+
+def attempt_questions(attempt, test):
+    """
+    The attempt's questions in the order they are asked, each with
+    ``options``: ``(letter, label, text)`` in display order, where
+    ``letter`` is the question's own option letter and ``label`` the one
+    shown. Questions
+    deleted from the bank since the draw are left out.
+    """
+    if attempt.draw is None:
+        questions = list(test.mcq_questions.all())
+    else:
+        ids = decode_ids(attempt.draw)
+        by_id = MCQQuestion.objects.filter(test=test).in_bulk(ids)
+        questions = [by_id[question_id] for question_id in ids if question_id in by_id]
+    for question in questions:
+        letters = OPTIONS if attempt.draw_seed is None or not test.shuffle_options else option_order(
+            attempt.draw_seed, question.id
+        )
+        question.options = [
+            (letter, label, getattr(question, f'option_{letter.lower()}')) for letter, label in zip(letters, OPTIONS)
+        ]
+    return questions
@@ -0,0 +1,50 @@
+"""
+Semester rollover.
+
+At semester change every student of a cohort moves up a semester. Doing
+that through the profile admin saves one profile at a time, running
+``UserProfile.save()`` and the staff-status signal for each, although
+neither depends on the semester. ``promote`` moves a whole cohort with
+one UPDATE inside a transaction instead, then rebuilds the cohort
+rollups, the only cached data keyed by a student's semester.
+"""
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .analytics import build_cohort_rollups
+from .models import UserProfile
+
+FINAL_SEMESTER = max(value for value, _ in UserProfile.SEMESTER_CHOICES)
+
+
+def student_cohort(branch=None, semester=None, division=None):
+    """Student profiles, optionally narrowed to a branch, semester and division"""
+    profiles = UserProfile.objects.filter(role='student')
+    if branch:
+        profiles = profiles.filter(branch=branch)
+    if semester:
+        profiles = profiles.filter(current_semester=semester)
+    if division:
+        profiles = profiles.filter(division=division)
+    return profiles
+
+
+def promote(profiles, step=1, refresh_rollups=True):
+    """
+    Move the student profiles ``step`` semesters on (back, if negative).
+
+    Profiles that would leave the semester range, such as final-semester
+    students, are held where they are. Returns the counts as a dict with
+    ``promoted``, ``held`` and ``rollups`` (rows rebuilt, or None).
+    """
+    in_range = Q(current_semester__gte=1 - step, current_semester__lte=FINAL_SEMESTER - step)
+    profiles = profiles.filter(role='student')
+    with transaction.atomic():
+        # Count first: promoted profiles would match a semester filter differently
+        held = profiles.exclude(in_range).count()
+        promoted = profiles.filter(in_range).update(
+            current_semester=F('current_semester') + step, updated_at=timezone.now(),
+        )
+    rollups = build_cohort_rollups() if refresh_rollups and promoted else None
+    return {'promoted': promoted, 'held': held, 'rollups': rollups}
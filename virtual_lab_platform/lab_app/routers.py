@@ -0,0 +1,95 @@
+"""
+Primary/replica database routing.
+
+Reads go to the ``replica`` alias only inside ``read_replica()`` (or a view
+decorated with ``@read_from_replica``); everything else, and every write,
+uses ``default``. After a user writes something, ``pin_to_primary`` stores
+a deadline in their session so their next pages keep reading from the
+primary until the replica has caught up (read-your-writes).
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = 'replica'
+PRIMARY_PIN_SESSION_KEY = '_primary_until_'
+
+_use_replica = ContextVar('lab_app_use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in connections.settings
+
+
+class PrimaryReplicaRouter:
+    """Send reads to the replica while ``read_replica()`` is active"""
+
+    def db_for_read(self, model, **hints):
+        if (_use_replica.get() and replica_configured()
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema through replication
+        return db != REPLICA_ALIAS
+
+
+@contextmanager
+def read_replica(enabled=True):
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def pin_to_primary(request, seconds=None):
+    """Keep this user's reads on the primary for the replication-lag window"""
+    if seconds is None:
+        seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+    if hasattr(request, 'session'):
+        request.session[PRIMARY_PIN_SESSION_KEY] = time.time() + seconds
+
+
+def is_pinned_to_primary(request):
+    session = getattr(request, 'session', None)
+    return session is not None and session.get(PRIMARY_PIN_SESSION_KEY, 0) > time.time()
+
+
+def read_from_replica(view_func):
+    """
+    Run a read-only view's queries against the replica.
+
+    Unsafe methods and users inside their sticky-primary window stay on
+    the primary. Works for both sync and ``async def`` views; worker
+    threads started by the view inherit the setting.
+    """
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            enabled = (request.method in ('GET', 'HEAD')
+                       and not await sync_to_async(is_pinned_to_primary)(request))
+            with read_replica(enabled):
+                return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        enabled = request.method in ('GET', 'HEAD') and not is_pinned_to_primary(request)
+        with read_replica(enabled):
+            return view_func(request, *args, **kwargs)
+    return wrapper
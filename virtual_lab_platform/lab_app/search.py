@@ -0,0 +1,286 @@
+"""
+Full-text search over experiments, self-evaluation questions and MCQs.
+
+Documents live in a single ``lab_app_searchindex`` table (created by
+migration 0011): an FTS5 virtual table on SQLite, or a table with a
+generated ``tsvector`` column and a GIN index on PostgreSQL. Rows are
+keyed by ``object_id * 4 + kind`` so a document can be replaced by
+primary key. The index is kept in sync by the signal handlers in
+``signals.py`` and can be rebuilt with the ``rebuild_search_index``
+command.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Experiment, MCQQuestion, Question
+
+TABLE = 'lab_app_searchindex'
+
+KIND_EXPERIMENT = 'experiment'
+KIND_QUESTION = 'question'
+KIND_MCQ = 'mcq'
+KIND_CODES = {KIND_EXPERIMENT: 1, KIND_QUESTION: 2, KIND_MCQ: 3}
+STUDENT_KINDS = (KIND_EXPERIMENT, KIND_QUESTION)
+
+# Control characters used as highlight markers, escaped before rendering
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+SNIPPET_WORDS = 16
+
+
+def is_supported(conn=None):
+    return (conn or connection).vendor in ('sqlite', 'postgresql')
+
+
+def _row_id(kind, object_id):
+    return object_id * 4 + KIND_CODES[kind]
+
+
+def _experiment_document(experiment):
+    subject = experiment.subject
+    return {
+        'kind': KIND_EXPERIMENT,
+        'object_id': experiment.id,
+        'parent_id': subject.id,
+        'branch': subject.branch,
+        'semester': subject.semester,
+        'is_active': experiment.is_active and subject.is_active,
+        'title': experiment.title,
+        'body': '\n'.join([
+            subject.name, experiment.objective, experiment.theory,
+            experiment.procedure, experiment.additional_resources,
+        ]),
+    }
+
+
+def _question_document(question):
+    experiment = question.experiment
+    subject = experiment.subject
+    return {
+        'kind': KIND_QUESTION,
+        'object_id': question.id,
+        'parent_id': experiment.id,
+        'branch': subject.branch,
+        'semester': subject.semester,
+        'is_active': experiment.is_active and subject.is_active,
+        'title': experiment.title,
+        'body': question.question_text,
+    }
+
+
+def _mcq_document(question):
+    test = question.test
+    subject = test.subject
+    return {
+        'kind': KIND_MCQ,
+        'object_id': question.id,
+        'parent_id': test.id,
+        'branch': subject.branch,
+        'semester': subject.semester,
+        'is_active': test.is_active,
+        'title': test.title,
+        'body': '\n'.join([
+            question.question_text, question.option_a, question.option_b,
+            question.option_c, question.option_d, question.explanation,
+        ]),
+    }
+
+
+def _write_documents(documents):
+    if not is_supported() or not documents:
+        return
+    with connection.cursor() as cursor:
+        for doc in documents:
+            row_id = _row_id(doc['kind'], doc['object_id'])
+            params = [
+                row_id, doc['kind'], doc['object_id'], doc['parent_id'], doc['branch'],
+                doc['semester'], doc['is_active'], doc['title'], doc['body'],
+            ]
+            if connection.vendor == 'sqlite':
+                cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [row_id])
+                cursor.execute(
+                    f"INSERT INTO {TABLE} (rowid, kind, object_id, parent_id, branch, semester, "
+                    "is_active, title, body) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)",
+                    params,
+                )
+            else:
+                cursor.execute(
+                    f"INSERT INTO {TABLE} (id, kind, object_id, parent_id, branch, semester, "
+                    "is_active, title, body) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) "
+                    "ON CONFLICT (id) DO UPDATE SET kind = EXCLUDED.kind, "
+                    "object_id = EXCLUDED.object_id, parent_id = EXCLUDED.parent_id, "
+                    "branch = EXCLUDED.branch, semester = EXCLUDED.semester, "
+                    "is_active = EXCLUDED.is_active, title = EXCLUDED.title, body = EXCLUDED.body",
+                    params,
+                )
+
+
+def index_question(question):
+    _write_documents([_question_document(question)])
+
+
+def index_mcq(question):
+    _write_documents([_mcq_document(question)])
+
+
+def index_experiments(experiments):
+    """Reindex experiments together with their self-evaluation questions"""
+    experiments = list(experiments.select_related('subject').prefetch_related('questions'))
+    documents = []
+    for experiment in experiments:
+        documents.append(_experiment_document(experiment))
+        for question in experiment.questions.all():
+            question.experiment = experiment
+            documents.append(_question_document(question))
+    _write_documents(documents)
+
+
+def index_mcqs(questions):
+    _write_documents([_mcq_document(q) for q in questions.select_related('test__subject')])
+
+
+def remove_document(kind, object_id):
+    if not is_supported():
+        return
+    column = 'rowid' if connection.vendor == 'sqlite' else 'id'
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {column} = %s", [_row_id(kind, object_id)])
+
+
+def rebuild_index():
+    """Drop every document and index all experiments, questions and MCQs"""
+    if not is_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+    index_experiments(Experiment.objects.all())
+    index_mcqs(MCQQuestion.objects.all())
+    return Experiment.objects.count() + Question.objects.count() + MCQQuestion.objects.count()
+
+
+def _fts5_query(term):
+    """Quote every word so user input cannot inject FTS5 syntax; prefix-match the last"""
+    words = [w.replace('"', '""') for w in term.split()]
+    if not words:
+        return None
+    quoted = [f'"{w}"' for w in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _tsquery(term):
+    """Same semantics for PostgreSQL: all words required, last one as a prefix"""
+    words = re.findall(r'\w+', term)
+    if not words:
+        return None
+    return ' & '.join(words) + ':*'
+
+
+def _render_snippet(raw):
+    return mark_safe(
+        escape(raw).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+    )
+
+
+def _match(term, kinds, branch=None, semester=None, active_only=True):
+    """
+    The FROM and WHERE clauses selecting documents that match ``term``,
+    with their params in order, or None when the term has no words.
+    """
+    filters = [f"kind IN ({', '.join(['%s'] * len(kinds))})"]
+    params = list(kinds)
+    if branch is not None:
+        filters.append('branch = %s')
+        params.append(branch)
+    if semester is not None:
+        filters.append('semester = %s')
+        params.append(semester)
+    if active_only:
+        filters.append('is_active = %s')
+        params.append(True)
+
+    if connection.vendor == 'sqlite':
+        match = _fts5_query(term)
+        if match is None:
+            return None
+        return TABLE, f"{TABLE} MATCH %s AND {' AND '.join(filters)}", [match] + params
+    match = _tsquery(term)
+    if match is None:
+        return None
+    return (
+        f"{TABLE}, to_tsquery('english', %s) query",
+        f"document @@ query AND {' AND '.join(filters)}",
+        [match] + params,
+    )
+
+
+def search(term, kinds=STUDENT_KINDS, branch=None, semester=None, active_only=True, limit=20):
+    """
+    Return ranked matches for ``term`` as dicts with ``kind``,
+    ``object_id``, ``parent_id``, ``title`` and a highlighted ``snippet``.
+
+    ``branch``/``semester`` restrict results to one catalog and
+    ``active_only`` hides inactive content.
+    """
+    term = (term or '').strip()
+    if not term or not is_supported():
+        return []
+    clause = _match(term, kinds, branch, semester, active_only)
+    if clause is None:
+        return []
+    tables, where, params = clause
+
+    if connection.vendor == 'sqlite':
+        sql = (
+            f"SELECT kind, object_id, parent_id, title, "
+            f"snippet({TABLE}, 7, %s, %s, '...', {SNIPPET_WORDS}) "
+            f"FROM {tables} WHERE {where} "
+            f"ORDER BY bm25({TABLE}, 0, 0, 0, 0, 0, 0, 10.0, 1.0) LIMIT %s"
+        )
+        params = [_MARK_START, _MARK_END] + params + [limit]
+    else:
+        sql = (
+            f"SELECT kind, object_id, parent_id, title, "
+            f"ts_headline('english', body, query, %s) "
+            f"FROM {tables} WHERE {where} "
+            f"ORDER BY ts_rank(document, query) DESC LIMIT %s"
+        )
+        options = (
+            f"StartSel={_MARK_START}, StopSel={_MARK_END}, "
+            f"MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}"
+        )
+        params = [options] + params + [limit]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return [
+        {
+            'kind': kind,
+            'object_id': int(object_id),
+            'parent_id': int(parent_id) if parent_id is not None else None,
+            'title': title,
+            'snippet': _render_snippet(snippet or ''),
+        }
+        for kind, object_id, parent_id, title, snippet in rows
+    ]
+
+
+def search_ids(term, kind):
+    """
+    Every matching object of one kind, inactive ones included, as a
+    subquery for ``pk__in`` (for admin search). Neither ranked nor capped,
+    so the changelist counts and pages all matches. None when the term
+    has no words to match.
+    """
+    term = (term or '').strip()
+    clause = _match(term, (kind,), active_only=False) if term and is_supported() else None
+    if clause is None:
+        return None
+    tables, where, params = clause
+    return RawSQL(f"SELECT object_id FROM {tables} WHERE {where}", params)
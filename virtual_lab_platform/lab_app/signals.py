@@ -1,9 +1,14 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.utils import timezone
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from allauth.account.signals import user_signed_up
 from allauth.socialaccount.signals import social_account_updated, social_account_added
-from .models import UserProfile
+from .models import (
+    UserProfile, TestAttempt, Subject, Experiment, Question, Test, MCQQuestion
+)
+from . import leaderboard, search, thumbnails
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -16,8 +21,11 @@ def create_user_profile(sender, instance, created, **kwargs):
         )
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
+def save_user_profile(sender, instance, update_fields=None, **kwargs):
     """Save the UserProfile when the User is saved"""
+    if update_fields is not None and update_fields <= {'last_login'}:
+        # Logins only stamp last_login; nothing for the profile to do
+        return
     try:
         instance.profile.save()
     except UserProfile.DoesNotExist:
@@ -88,8 +96,10 @@ def update_profile_from_social_account(user, sociallogin):
         profile.save()
 
 @receiver(post_save, sender=UserProfile)
-def update_user_staff_status(sender, instance, **kwargs):
+def update_user_staff_status(sender, instance, update_fields=None, **kwargs):
     """Update user's is_staff status based on their role in the profile."""
+    if update_fields is not None and 'role' not in update_fields:
+        return
     user = instance.user
     
     # If profile role is admin, make sure user has staff status
@@ -101,3 +111,74 @@ def update_user_staff_status(sender, instance, **kwargs):
     elif instance.role != 'admin' and user.is_staff and not user.is_superuser:
         user.is_staff = False
         user.save(update_fields=['is_staff'])
+
+
+@receiver(post_save, sender=TestAttempt)
+def update_leaderboards(sender, instance, **kwargs):
+    """Fold completed attempts into the cached test and subject leaderboards."""
+    if instance.status == 'completed':
+        transaction.on_commit(lambda: leaderboard.record_attempt(instance))
+
+@receiver(post_delete, sender=TestAttempt)
+def invalidate_leaderboards(sender, instance, **kwargs):
+    """Deleting an attempt may lower a best score, so rebuild the boards."""
+    test_id, subject_id = instance.test_id, leaderboard.subject_of(instance.test_id)
+    transaction.on_commit(lambda: leaderboard.invalidate(test_id, subject_id))
+
+@receiver(post_save, sender=Test)
+@receiver(post_delete, sender=Test)
+def forget_test_subject(sender, instance, **kwargs):
+    """A test may move to another subject; drop its cached subject id."""
+    leaderboard.forget_test(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def process_profile_picture(sender, instance, update_fields=None, **kwargs):
+    """Clean up new uploads and cut their thumbnails in the background."""
+    if update_fields is not None and 'profile_picture' not in update_fields:
+        return
+    if instance.profile_picture and not instance.thumbnail_key:
+        thumbnails.schedule(instance.pk)
+
+
+# Full-text search index maintenance
+@receiver(post_save, sender=Subject)
+def reindex_subject(sender, instance, **kwargs):
+    """Branch, semester and active flags are copied into every document."""
+    search.index_experiments(Experiment.objects.filter(subject=instance))
+    search.index_mcqs(MCQQuestion.objects.filter(test__subject=instance))
+
+@receiver(post_save, sender=Experiment)
+def reindex_experiment(sender, instance, **kwargs):
+    search.index_experiments(Experiment.objects.filter(pk=instance.pk))
+
+@receiver(post_save, sender=Question)
+def reindex_question(sender, instance, **kwargs):
+    search.index_question(instance)
+
+@receiver(post_save, sender=Test)
+def reindex_test(sender, instance, **kwargs):
+    search.index_mcqs(instance.mcq_questions.all())
+
+@receiver(post_save, sender=MCQQuestion)
+def reindex_mcq(sender, instance, **kwargs):
+    search.index_mcq(instance)
+
+@receiver(post_delete, sender=Experiment)
+def unindex_experiment(sender, instance, **kwargs):
+    search.remove_document(search.KIND_EXPERIMENT, instance.pk)
+
+@receiver(post_delete, sender=Question)
+def unindex_question(sender, instance, **kwargs):
+    search.remove_document(search.KIND_QUESTION, instance.pk)
+
+@receiver(post_delete, sender=MCQQuestion)
+def unindex_mcq(sender, instance, **kwargs):
+    search.remove_document(search.KIND_MCQ, instance.pk)
+
+# Self-evaluation questions are part of the experiment page
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def touch_experiment(sender, instance, **kwargs):
+    """Bump the experiment's updated_at, which page ETags and the static export key on."""
+    Experiment.objects.filter(pk=instance.experiment_id).update(updated_at=timezone.now())
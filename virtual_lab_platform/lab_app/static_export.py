@@ -0,0 +1,283 @@
+"""
+Static export of the lab content.
+
+``export_site`` renders the public part of every active subject and
+experiment into plain HTML files, for offline labs and for serving the
+content from a CDN:
+
+    index.html                              branches and semesters
+    <branch>/semester-<n>/index.html        subjects of a semester
+    <branch>/semester-<n>/<subject>/index.html
+    <branch>/semester-<n>/<subject>/experiment-<id>.html
+    assets/site.<hash>.css                  fingerprinted stylesheets
+    manifest.json
+
+Markdown is converted once, when a page is rendered, with the same
+extensions as the ``markdown`` template filter. ``manifest.json`` records
+the version each page was built from (the experiment's and its subject's
+``updated_at``), so a rebuild only renders pages whose version changed,
+deletes pages of removed content, and leaves the rest untouched. Asset
+names carry a hash of their content; changing an asset or an export
+template rebuilds every page. Files are replaced atomically, the manifest
+last, so an interrupted build leaves a usable bundle.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import markdown
+from django.db.models import Prefetch
+from django.template.loader import get_template, render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .models import Experiment, Question, Subject, UserProfile
+from .templatetags.markdown_extras import EXTENSION_CONFIGS, EXTENSIONS
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_FORMAT = 1
+TEMPLATES = (
+    'static_export/base.html', 'static_export/index.html', 'static_export/semester.html',
+    'static_export/subject.html', 'static_export/experiment.html', 'static_export/site.css',
+)
+MARKDOWN_FIELDS = ('objective', 'theory', 'procedure', 'additional_resources')
+# Experiments loaded (with their questions) per query
+CHUNK_SIZE = 200
+
+BRANCH_NAMES = dict(UserProfile.BRANCH_CHOICES)
+
+
+def _digest(data, length=64):
+    return hashlib.sha256(data).hexdigest()[:length]
+
+
+def semester_path(branch, semester):
+    return f'{branch.lower()}/semester-{semester}/index.html'
+
+
+def subject_path(subject):
+    return f"{subject['branch'].lower()}/semester-{subject['semester']}/{subject['id']}/index.html"
+
+
+def experiment_path(subject, experiment_id):
+    return f"{subject['branch'].lower()}/semester-{subject['semester']}/{subject['id']}/experiment-{experiment_id}.html"
+
+
+class _Markdown:
+    """One converter for the whole build instead of one per field"""
+
+    def __init__(self):
+        self.converter = markdown.Markdown(extensions=EXTENSIONS, extension_configs=EXTENSION_CONFIGS)
+
+    def __call__(self, text):
+        return mark_safe(self.converter.reset().convert(text)) if text else ''
+
+
+def _assets():
+    """{logical name: (bundle path, content)} for the stylesheets"""
+    sources = {'site.css': render_to_string('static_export/site.css').encode()}
+    try:
+        from pygments.formatters import HtmlFormatter
+    except ImportError:
+        pass  # codehilite falls back to plain <pre> blocks without Pygments
+    else:
+        sources['highlight.css'] = HtmlFormatter().get_style_defs('.highlight').encode()
+    assets = {}
+    for name, content in sources.items():
+        stem, extension = name.rsplit('.', 1)
+        assets[name] = (f'assets/{stem}.{_digest(content, 12)}.{extension}', content)
+    return assets
+
+
+def _renderer_version(assets):
+    """Changes whenever an export template or asset does"""
+    sources = [get_template(name).template.source for name in TEMPLATES]
+    return _digest(json.dumps([sources, sorted(path for path, _ in assets.values())]).encode(), 16)
+
+
+def _write(root, path, content):
+    target = os.path.join(root, path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.export-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(temp, 0o644)
+        os.replace(temp, target)
+    except BaseException:
+        os.unlink(temp)
+        raise
+
+
+def _remove(root, path):
+    target = os.path.join(root, path)
+    if os.path.exists(target):
+        os.unlink(target)
+    # Drop directories left empty, up to the bundle root
+    directory = os.path.dirname(target)
+    while os.path.abspath(directory) != os.path.abspath(root):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+
+def load_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format') == MANIFEST_FORMAT else None
+
+
+def export_site(root, full=False, stdout=None):
+    """
+    Build or update the bundle in ``root``. ``full`` renders every page
+    even if the manifest says it is current. Returns counts as a dict
+    with ``written``, ``unchanged`` and ``removed`` pages.
+    """
+    assets = _assets()
+    renderer = _renderer_version(assets)
+    previous = load_manifest(root)
+    # Pages of an older manifest are still deleted when everything is rebuilt
+    rebuild = full or previous is None or previous['renderer'] != renderer
+    old_pages = previous['pages'] if previous else {}
+    pages = {}
+    counts = {'written': 0, 'unchanged': 0, 'removed': 0}
+    stylesheets = [path for path, _ in assets.values()]
+
+    for path, content in assets.values():
+        if not os.path.exists(os.path.join(root, path)):
+            _write(root, path, content)
+
+    def is_current(key, path, version):
+        old = old_pages.get(key)
+        return (not rebuild and old is not None and old['path'] == path and old['version'] == version
+                and os.path.exists(os.path.join(root, path)))
+
+    def keep(key):
+        pages[key] = old_pages[key]
+        counts['unchanged'] += 1
+
+    def publish(key, path, version, template, context):
+        """Render a page; the file is only rewritten if its content changed"""
+        context = {**context, 'root': '../' * path.count('/'), 'stylesheets': stylesheets}
+        content = render_to_string(template, context).encode()
+        pages[key] = {'path': path, 'version': version, 'sha256': _digest(content)}
+        old = old_pages.get(key)
+        if (old is not None and old['path'] == path and old['sha256'] == pages[key]['sha256']
+                and os.path.exists(os.path.join(root, path))):
+            counts['unchanged'] += 1
+        else:
+            _write(root, path, content)
+            counts['written'] += 1
+
+    subjects = list(
+        Subject.objects.filter(is_active=True).order_by('branch', 'semester', 'name')
+        .values('id', 'name', 'description', 'semester', 'branch', 'updated_at')
+    )
+    subjects_by_id = {subject['id']: subject for subject in subjects}
+    experiments = list(
+        Experiment.objects.filter(subject__is_active=True, is_active=True)
+        .order_by('title', 'id').values('id', 'subject_id', 'updated_at')
+    )
+    subject_versions = {subject['id']: [subject['updated_at'].isoformat()] for subject in subjects}
+    for e in experiments:
+        subject_versions[e['subject_id']].append([e['id'], e['updated_at'].isoformat()])
+
+    # Experiment pages: content is only loaded for the ones that changed
+    stale = []
+    for e in experiments:
+        subject = subjects_by_id[e['subject_id']]
+        version = f"{e['updated_at'].isoformat()}|{subject['updated_at'].isoformat()}"
+        if is_current(f"experiment:{e['id']}", experiment_path(subject, e['id']), version):
+            keep(f"experiment:{e['id']}")
+        else:
+            stale.append((e['id'], version))
+    render_markdown = _Markdown()
+    for start in range(0, len(stale), CHUNK_SIZE):
+        chunk_versions = dict(stale[start:start + CHUNK_SIZE])
+        chunk = Experiment.objects.filter(id__in=chunk_versions).prefetch_related(
+            Prefetch('questions', queryset=Question.objects.order_by('id'))
+        )
+        for experiment in chunk:
+            subject = subjects_by_id[experiment.subject_id]
+            publish(
+                f'experiment:{experiment.id}', experiment_path(subject, experiment.id),
+                chunk_versions[experiment.id], 'static_export/experiment.html', {
+                    'experiment': experiment,
+                    'subject': subject,
+                    'html': {field: render_markdown(getattr(experiment, field)) for field in MARKDOWN_FIELDS},
+                    'questions': [
+                        {'question_text': render_markdown(q.question_text), 'answer': render_markdown(q.answer)}
+                        for q in experiment.questions.all()
+                    ],
+                },
+            )
+        if stdout:
+            stdout.write(f'Rendered {min(start + CHUNK_SIZE, len(stale))}/{len(stale)} changed experiments')
+
+    # Subject pages list titles and objectives, so they follow their experiments
+    stale_subjects = {}
+    for subject in subjects:
+        version = _digest(json.dumps(subject_versions[subject['id']]).encode(), 16)
+        if is_current(f"subject:{subject['id']}", subject_path(subject), version):
+            keep(f"subject:{subject['id']}")
+        else:
+            stale_subjects[subject['id']] = version
+    listed = {}
+    listed_experiments = Experiment.objects.filter(subject__in=stale_subjects, is_active=True).order_by('title', 'id')
+    for experiment in listed_experiments.only('id', 'subject_id', 'title', 'objective'):
+        listed.setdefault(experiment.subject_id, []).append({
+            'title': experiment.title, 'objective': experiment.objective,
+            'path': f'experiment-{experiment.id}.html',
+        })
+    for subject_id, version in stale_subjects.items():
+        subject = subjects_by_id[subject_id]
+        publish(
+            f'subject:{subject_id}', subject_path(subject), version, 'static_export/subject.html',
+            {'subject': subject, 'experiments': listed.get(subject_id, [])},
+        )
+
+    # Semester and index pages are small; they are rendered every time
+    # and only written when their content changed
+    semesters = {}
+    for subject in subjects:
+        semesters.setdefault((subject['branch'], subject['semester']), []).append(
+            {**subject, 'path': f"{subject['id']}/index.html"}
+        )
+    for (branch, semester), listed_subjects in semesters.items():
+        publish(
+            f'semester:{branch}:{semester}', semester_path(branch, semester), None, 'static_export/semester.html',
+            {'branch_name': BRANCH_NAMES.get(branch, branch), 'semester': semester, 'subjects': listed_subjects},
+        )
+    catalog = {}
+    for (branch, semester), listed_subjects in semesters.items():
+        catalog.setdefault(branch, []).append({
+            'number': semester, 'path': semester_path(branch, semester), 'subject_count': len(listed_subjects),
+        })
+    publish('index', 'index.html', None, 'static_export/index.html', {
+        'catalog': [(BRANCH_NAMES.get(branch, branch), entries) for branch, entries in catalog.items()],
+    })
+
+    # Pages of deleted, deactivated or moved content
+    live_paths = {page['path'] for page in pages.values()}
+    for old in old_pages.values():
+        if old['path'] not in live_paths:
+            _remove(root, old['path'])
+            counts['removed'] += 1
+    if previous is not None:
+        for path in set(previous['assets'].values()) - set(stylesheets):
+            _remove(root, path)
+
+    _write(root, MANIFEST_NAME, json.dumps({
+        'format': MANIFEST_FORMAT,
+        'renderer': renderer,
+        'built_at': timezone.now().isoformat(),
+        'assets': {name: path for name, (path, _) in assets.items()},
+        'pages': pages,
+    }, indent=1, sort_keys=True).encode())
+    return counts
@@ -0,0 +1,399 @@
+"""
+Synthetic dataset generator for benchmarks and load tests.
+
+Everything is written inside one transaction, in chunks: with
+``bulk_create``, and with ``executemany`` for the responses, the largest
+table. Neither sends ``post_save`` signals, so profile creation,
+leaderboard updates and search indexing are skipped while the data is
+generated; profiles are created here directly and the search index is
+rebuilt once at the end.
+
+Scores follow a two-parameter logistic (item response theory) model:
+each student has an ability, each question a difficulty and a
+discrimination, and the chance of a correct answer is
+``1 / (1 + exp(-a * (ability - difficulty)))``. Wrong answers favour one
+"attractive" distractor per question. Item analysis, cohort rollups and
+leaderboards therefore see plausible distributions.
+
+The same seed always produces the same content (primary keys aside).
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.utils import timezone
+
+from allauth.account.models import EmailAddress
+
+from .models import (
+    Experiment, LabProgress, MCQQuestion, Question, Subject, Test, TestAttempt,
+    TestResponse, UserProfile
+)
+
+BRANCHES = [code for code, _ in UserProfile.BRANCH_CHOICES if code != 'Other']
+SEMESTERS = [value for value, _ in UserProfile.SEMESTER_CHOICES]
+DIVISIONS = ['A', 'B', 'C', 'D']
+OPTIONS = np.array(['A', 'B', 'C', 'D'], dtype=object)
+RESPONSE_FIELDS = ['attempt', 'question', 'selected_option', 'is_correct', 'answered_at']
+
+TOPICS = [
+    'Ohm\'s Law', 'Kirchhoff\'s Laws', 'Binary Search Trees', 'Fourier Series', 'Beam Deflection',
+    'Heat Exchangers', 'Op-Amp Amplifiers', 'Sorting Algorithms', 'Logic Gates', 'Projectile Motion',
+    'RC Circuits', 'Hash Tables', 'Gradient Descent', 'Fluid Viscosity', 'Transistor Biasing',
+    'Graph Traversal', 'Signal Sampling', 'Concrete Curing', 'Linear Regression', 'Thermodynamic Cycles',
+    'Finite Automata', 'Modulation Techniques', 'Torsion Testing', 'Neural Networks', 'Power Factor',
+]
+WORDS = (
+    'measure voltage current resistance signal sample output input circuit value error '
+    'observe record calculate compare verify apparatus reading table graph slope constant '
+    'theory model result accuracy precision method step parameter response frequency load'
+).split()
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Kavya', 'Rohan', 'Ananya', 'Vihaan', 'Meera', 'Arjun', 'Saanvi',
+               'Kabir', 'Riya', 'Aditya', 'Nisha', 'Dev', 'Pooja', 'Karan', 'Sneha', 'Yash', 'Tara']
+LAST_NAMES = ['Sharma', 'Patel', 'Iyer', 'Reddy', 'Nair', 'Gupta', 'Singh', 'Desai', 'Kulkarni', 'Menon']
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let generated rows keep their own auto_now/auto_now_add values"""
+    fields = [
+        f for model in models for f in model._meta.concrete_fields
+        if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+    ]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _sentence(rnd, words=12):
+    text = ' '.join(rnd.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def _markdown(rnd, topic, section):
+    """A few hundred bytes to a few KB of Markdown shaped like real lab content"""
+    parts = [f'## {section}: {topic}', '', _sentence(rnd, 20), '']
+    if section == 'Procedure':
+        parts += [f'{i}. {_sentence(rnd, 10)}' for i in range(1, rnd.randint(5, 10))]
+    else:
+        parts += [f'- **{rnd.choice(WORDS).title()}**: {_sentence(rnd, 8)}' for _ in range(rnd.randint(3, 6))]
+        parts += ['', '```python', f'{rnd.choice(WORDS)} = {rnd.randint(1, 99)} * {rnd.choice(WORDS)}', '```']
+    parts += ['', ' '.join(_sentence(rnd) for _ in range(rnd.randint(3, 12)))]
+    if section == 'Theory':
+        parts += ['', '| Quantity | Unit |', '|---|---|'] + [
+            f'| {rnd.choice(WORDS)} | {rnd.choice(["V", "A", "Ohm", "s", "Hz", "N"])} |' for _ in range(3)
+        ]
+    return '\n'.join(parts)
+
+
+class DatasetGenerator:
+    """
+    Generate students, catalog content and history. Call ``run()``;
+    ``counts`` and ``timings`` describe what was written.
+    """
+
+    def __init__(self, students=3000, subjects=200, experiments_per_subject=5,
+                 questions_per_test=20, days=120, seed=1, prefix='synth',
+                 password='password', batch_size=5000, stdout=None):
+        self.students = students
+        self.subjects = subjects
+        self.experiments_per_subject = experiments_per_subject
+        self.questions_per_test = questions_per_test
+        self.days = days
+        self.seed = seed
+        self.prefix = prefix
+        self.password = password
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.rnd = random.Random(seed)
+        self.rng = np.random.default_rng(seed)
+        self.now = timezone.now().replace(microsecond=0)
+        self.counts = {}
+        self.timings = {}
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    @contextmanager
+    def step(self, name):
+        started = time.perf_counter()
+        yield
+        self.timings[name] = time.perf_counter() - started
+        self.log(f'{name}: {self.counts.get(name, 0)} rows in {self.timings[name]:.1f}s')
+
+    def run(self):
+        if User.objects.filter(username__startswith=f'{self.prefix}-').exists():
+            raise ValueError(f'Data with prefix "{self.prefix}" already exists; use another prefix')
+        with transaction.atomic(), explicit_timestamps(LabProgress, TestAttempt, TestResponse):
+            creator = self.create_creator()
+            catalogs = self.create_students()
+            tests = self.create_catalog(creator)
+            self.create_history(catalogs, tests)
+        return self.counts
+
+    def create_creator(self):
+        user = User.objects.create_user(f'{self.prefix}-staff', f'{self.prefix}-staff@example.com', None)
+        profile = user.profile
+        profile.role = 'admin'
+        profile.full_name = 'Synthetic Staff'
+        profile.save()
+        return user
+
+    def create_students(self):
+        """Users, verified emails and complete profiles; returns {(branch, semester): [(user_id, ability, division)]}"""
+        with self.step('students'):
+            password = make_password(self.password)
+            users = [
+                User(
+                    username=f'{self.prefix}-{i}', email=f'{self.prefix}-{i}@example.com',
+                    password=password, first_name=self.rnd.choice(FIRST_NAMES),
+                    last_name=self.rnd.choice(LAST_NAMES), date_joined=self.now - timedelta(days=self.days),
+                )
+                for i in range(self.students)
+            ]
+            User.objects.bulk_create(users, batch_size=self.batch_size)
+            EmailAddress.objects.bulk_create([
+                EmailAddress(user_id=u.id, email=u.email, primary=True, verified=True) for u in users
+            ], batch_size=self.batch_size)
+
+            branches = self.rng.choice(len(BRANCHES), size=self.students)
+            semesters = self.rng.choice(len(SEMESTERS), size=self.students)
+            divisions = self.rng.choice(len(DIVISIONS), size=self.students)
+            abilities = self.rng.normal(0.3, 1.0, size=self.students)
+            profiles = []
+            catalogs = {}
+            for i, user in enumerate(users):
+                branch, semester, division = BRANCHES[branches[i]], SEMESTERS[semesters[i]], DIVISIONS[divisions[i]]
+                profiles.append(UserProfile(
+                    user_id=user.id, role='student', full_name=f'{user.first_name} {user.last_name}',
+                    roll_no=f'{self.prefix}{i:06d}'.upper(), branch=branch, current_semester=semester,
+                    division=division, contact_number=f'9{self.rnd.randint(100000000, 999999999)}',
+                    is_profile_complete=True,
+                ))
+                catalogs.setdefault((branch, semester), []).append((user.id, abilities[i], division))
+            UserProfile.objects.bulk_create(profiles, batch_size=self.batch_size)
+            self.counts['students'] = len(users)
+        return catalogs
+
+    def create_catalog(self, creator):
+        """Subjects, experiments with Markdown content, self-evaluation questions, tests and MCQ banks"""
+        with self.step('catalog'):
+            catalog_keys = [(b, s) for b in BRANCHES for s in SEMESTERS]
+            subjects = []
+            for i in range(self.subjects):
+                branch, semester = catalog_keys[i % len(catalog_keys)]
+                subjects.append(Subject(
+                    name=f'{self.rnd.choice(TOPICS).split()[0]} Lab {i}', description=_sentence(self.rnd, 25),
+                    semester=semester, branch=branch,
+                ))
+            Subject.objects.bulk_create(subjects, batch_size=self.batch_size)
+
+            experiments = []
+            for subject in subjects:
+                for j in range(self.experiments_per_subject):
+                    topic = self.rnd.choice(TOPICS)
+                    experiments.append(Experiment(
+                        subject_id=subject.id, title=f'{topic} ({j + 1})',
+                        objective=_markdown(self.rnd, topic, 'Objective'),
+                        theory=_markdown(self.rnd, topic, 'Theory'),
+                        procedure=_markdown(self.rnd, topic, 'Procedure'),
+                        additional_resources=f'- [{topic} notes](https://example.com/{self.rnd.randint(1, 9999)})',
+                    ))
+            Experiment.objects.bulk_create(experiments, batch_size=self.batch_size)
+            Question.objects.bulk_create([
+                Question(experiment_id=e.id, question_text=_sentence(self.rnd), answer=_sentence(self.rnd))
+                for e in experiments for _ in range(3)
+            ], batch_size=self.batch_size)
+
+            tests = []
+            subject_by_id = {s.id: s for s in subjects}
+            for e in experiments:
+                tests.append(Test(
+                    title=f'{e.title} quiz', description=_sentence(self.rnd), experiment_id=e.id,
+                    subject_id=e.subject_id, difficulty=self.rnd.choice(['easy', 'medium', 'hard']),
+                    duration=self.rnd.choice([10, 15, 20, 30]), total_marks=self.questions_per_test,
+                    passing_marks=int(self.questions_per_test * 0.4), created_by_id=creator.id,
+                ))
+            Test.objects.bulk_create(tests, batch_size=self.batch_size)
+
+            questions = []
+            for test in tests:
+                test.subject = subject_by_id[test.subject_id]
+                keys = self.rng.choice(4, size=self.questions_per_test)
+                test.item_params = {
+                    'difficulty': self.rng.normal(0.0, 1.0, size=self.questions_per_test),
+                    'discrimination': self.rng.uniform(0.4, 2.0, size=self.questions_per_test),
+                    'keys': keys,
+                    # The distractor weaker students fall for most often
+                    'lure': (keys + self.rng.integers(1, 4, size=self.questions_per_test)) % 4,
+                }
+                for k in range(self.questions_per_test):
+                    questions.append(MCQQuestion(
+                        test_id=test.id, question_text=_sentence(self.rnd, 14),
+                        option_a=_sentence(self.rnd, 4), option_b=_sentence(self.rnd, 4),
+                        option_c=_sentence(self.rnd, 4), option_d=_sentence(self.rnd, 4),
+                        correct_option=OPTIONS[keys[k]], explanation=_sentence(self.rnd), order=k + 1,
+                    ))
+            MCQQuestion.objects.bulk_create(questions, batch_size=self.batch_size)
+            by_test = {}
+            for q in questions:
+                by_test.setdefault(q.test_id, []).append(q.id)
+            for test in tests:
+                test.question_ids = np.array(by_test[test.id])
+
+            self.counts['catalog'] = len(subjects) + len(experiments) + len(tests) + len(questions)
+        return tests
+
+    def create_history(self, catalogs, tests):
+        """Attempts, responses and lab progress, one test at a time to bound memory"""
+        tests_by_catalog = {}
+        for test in tests:
+            tests_by_catalog.setdefault((test.subject.branch, test.subject.semester), []).append(test)
+
+        self.counts.update({'attempts': 0, 'responses': 0, 'progress': 0})
+        pending_attempts, pending_progress = [], []
+        attempt_seconds = response_seconds = progress_seconds = 0.0
+
+        for key in sorted(tests_by_catalog):
+            students = catalogs.get(key)
+            if not students:
+                continue
+            student_ids = np.array([s[0] for s in students])
+            abilities = np.array([s[1] for s in students])
+            for test in tests_by_catalog[key]:
+                attempts, progress = self.simulate_test(test, student_ids, abilities)
+                pending_attempts.extend(attempts)
+                pending_progress.extend(progress)
+                if len(pending_attempts) * self.questions_per_test >= self.batch_size * 4:
+                    attempt_seconds, response_seconds = self.flush_attempts(
+                        pending_attempts, attempt_seconds, response_seconds)
+                    pending_attempts = []
+                if len(pending_progress) >= self.batch_size:
+                    progress_seconds += self.flush_progress(pending_progress)
+                    pending_progress = []
+        attempt_seconds, response_seconds = self.flush_attempts(pending_attempts, attempt_seconds, response_seconds)
+        progress_seconds += self.flush_progress(pending_progress)
+
+        self.timings.update({'attempts': attempt_seconds, 'responses': response_seconds, 'progress': progress_seconds})
+        for name in ('attempts', 'responses', 'progress'):
+            self.log(f'{name}: {self.counts[name]} rows in {self.timings[name]:.1f}s')
+
+    def simulate_test(self, test, student_ids, abilities):
+        """
+        Decide who takes the test, when, and what they answer. Returns
+        (attempts, progress) where each attempt carries its response
+        arrays until it is written.
+        """
+        params = test.item_params
+        n = len(student_ids)
+        takes = self.rng.random(n) < 0.8
+        attempts, progress = [], []
+        opened = self.now - timedelta(days=float(self.rng.uniform(1, self.days)))
+        for idx in np.flatnonzero(takes):
+            ability = abilities[idx]
+            started = opened + timedelta(hours=float(self.rng.exponential(48)))
+            passed = False
+            for retake in range(3):
+                if retake and (passed or self.rng.random() > 0.5):
+                    break
+                # Practice helps a little on each retake
+                logits = params['discrimination'] * (ability + 0.3 * retake - params['difficulty'])
+                correct = self.rng.random(len(logits)) < 1.0 / (1.0 + np.exp(-logits))
+                wrong = np.where(
+                    self.rng.random(len(logits)) < 0.5,
+                    params['lure'],
+                    (params['keys'] + self.rng.integers(1, 4, size=len(logits))) % 4,
+                )
+                chosen = np.where(correct, params['keys'], wrong)
+                blank = self.rng.random(len(logits)) < 0.02
+                score = int((correct & ~blank).sum())
+                passed = score >= test.passing_marks
+                took = timedelta(seconds=float(self.rng.uniform(0.3, 1.0) * test.duration * 60))
+                started = min(started, self.now - took)
+                attempt = TestAttempt(
+                    student_id=int(student_ids[idx]), test_id=test.id, status='completed', score=score,
+                    total_marks=test.total_marks, percentage=score * 100.0 / test.total_marks,
+                    time_taken=took, started_at=started, completed_at=started + took,
+                )
+                attempt.answers = (test.question_ids, chosen, correct & ~blank, blank)
+                attempts.append(attempt)
+                started += timedelta(days=float(self.rng.uniform(1, 7)))
+            progress.append(LabProgress(
+                student_id=int(student_ids[idx]), experiment_id=test.experiment_id,
+                status='completed' if passed else 'in_progress',
+                started_at=opened, last_accessed=started, completed_at=started if passed else None,
+                time_spent=timedelta(minutes=float(self.rng.uniform(20, 120))),
+            ))
+        # Some students open the experiment without taking the test
+        for idx in np.flatnonzero(~takes & (self.rng.random(n) < 0.5)):
+            progress.append(LabProgress(
+                student_id=int(student_ids[idx]), experiment_id=test.experiment_id,
+                status='in_progress', started_at=opened, last_accessed=opened,
+            ))
+        return attempts, progress
+
+    def flush_attempts(self, attempts, attempt_seconds, response_seconds):
+        if not attempts:
+            return attempt_seconds, response_seconds
+        started = time.perf_counter()
+        TestAttempt.objects.bulk_create(attempts, batch_size=self.batch_size)
+        attempt_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        rows = []
+        for attempt in attempts:
+            question_ids, chosen, correct, blank = attempt.answers
+            answered_at = connection.ops.adapt_datetimefield_value(attempt.completed_at)
+            options = np.where(blank, None, OPTIONS[chosen]).tolist()
+            rows.extend(zip(
+                [attempt.id] * len(options), question_ids.tolist(), options, correct.tolist(),
+                [answered_at] * len(options),
+            ))
+        for i in range(0, len(rows), self.batch_size):
+            self.insert_responses(rows[i:i + self.batch_size])
+        response_seconds += time.perf_counter() - started
+
+        self.counts['attempts'] += len(attempts)
+        self.counts['responses'] += len(rows)
+        return attempt_seconds, response_seconds
+
+    def insert_responses(self, rows):
+        """
+        Responses are the one table where ``bulk_create`` itself is the
+        bottleneck: compiling each model instance into SQL parameters
+        costs ~50us per row, about a minute per million. The rows are
+        already database-ready tuples, so hand them to ``executemany``.
+        """
+        opts = TestResponse._meta
+        table = connection.ops.quote_name(opts.db_table)
+        columns = ', '.join(
+            connection.ops.quote_name(opts.get_field(name).column) for name in RESPONSE_FIELDS
+        )
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # executemany is one round trip per row with psycopg; COPY streams
+                with cursor.cursor.copy(f'COPY {table} ({columns}) FROM STDIN') as copy:
+                    for row in rows:
+                        copy.write_row(row)
+            else:
+                placeholders = ', '.join(['%s'] * len(RESPONSE_FIELDS))
+                cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', rows)
+
+    def flush_progress(self, progress):
+        if not progress:
+            return 0.0
+        started = time.perf_counter()
+        LabProgress.objects.bulk_create(progress, batch_size=self.batch_size)
+        self.counts['progress'] += len(progress)
+        return time.perf_counter() - started
@@ -1,34 +1,37 @@
 from django import template
 from django.utils.safestring import mark_safe
-import markdown
-from markdown.extensions import extra, codehilite, tables, fenced_code
 
 register = template.Library()
 
+EXTENSIONS = [
+    'markdown.extensions.extra',
+    'markdown.extensions.codehilite',
+    'markdown.extensions.tables',
+    'markdown.extensions.fenced_code',
+    'markdown.extensions.nl2br',
+    'markdown.extensions.sane_lists',
+    'markdown.extensions.smarty'
+]
+
+EXTENSION_CONFIGS = {
+    'markdown.extensions.codehilite': {
+        'css_class': 'highlight',
+        'use_pygments': True,
+    }
+}
+
 @register.filter(name='markdown')
 def markdown_format(text):
     if not text:
         return ""
-    
-    extensions = [
-        'markdown.extensions.extra',
-        'markdown.extensions.codehilite',
-        'markdown.extensions.tables',
-        'markdown.extensions.fenced_code',
-        'markdown.extensions.nl2br',
-        'markdown.extensions.sane_lists',
-        'markdown.extensions.smarty'
-    ]
-    
+    # Imported here: the tag library is loaded with the template engine,
+    # and most management commands never render markdown
+    import markdown
+
     html = markdown.markdown(
         text,
-        extensions=extensions,
-        extension_configs={
-            'markdown.extensions.codehilite': {
-                'css_class': 'highlight',
-                'use_pygments': True,
-            }
-        }
+        extensions=EXTENSIONS,
+        extension_configs=EXTENSION_CONFIGS
     )
     
-    return mark_safe(html) 
\ No newline at end of file
+    return mark_safe(html) 
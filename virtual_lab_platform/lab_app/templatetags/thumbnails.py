@@ -0,0 +1,13 @@
+from django import template
+
+from lab_app.thumbnails import thumbnail_url
+
+register = template.Library()
+
+@register.simple_tag
+def profile_picture_url(profile, size):
+    """
+    URL of the profile picture for an image shown ``size`` CSS pixels wide,
+    using the thumbnail that stays sharp on 2x (high-density) screens.
+    """
+    return thumbnail_url(profile, int(size) * 2)
@@ -1,3 +1,1765 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+from django.db.utils import ConnectionHandler
+from django.db.models import Count, Q
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    Subject, Experiment, Question, LabProgress, QuestionAttempt,
+    Test, MCQQuestion, TestAttempt, TestResponse, UserProfile, ArchivedAttempt, CohortRollup
+)
+from . import admission, leaderboard, search, warmup
+from .analytics import build_cohort_rollups, compute_item_statistics, get_item_analysis
+from .archive import archive_attempts, restore_attempt, unpack_responses
+from .benchmarks import BENCHMARKS, compare_with_baseline, over_budget, run_benchmarks
+from .importtime import BUDGETS, TARGETS, parse_importtime, profile_imports
+from .proctoring import find_similar_attempts
+from .question_pool import attempt_questions, decode_ids, encode_ids, option_order
+from .rollover import promote, student_cohort
+from .static_export import export_site, load_manifest
+from .routers import PRIMARY_PIN_SESSION_KEY, REPLICA_ALIAS, read_replica
+from .synthetic import DatasetGenerator
+from .thumbnails import PLACEHOLDER_URL, process_profile_picture, thumbnail_url
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AdminChangelistQueryCountTests(TestCase):
+    """Admin pages must cost the same number of queries however many rows they list"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.subject = Subject.objects.create(name='Physics', description='Basics', semester=1, branch='CSE')
+        cls.rows = 0
+
+    def setUp(self):
+        self.client.force_login(self.admin_user)
+
+    def add_rows(self, count):
+        for _ in range(count):
+            n = type(self).rows = type(self).rows + 1
+            student = User.objects.create_user(f'student{n}', f'student{n}@example.com', 'password')
+            student.profile.full_name = f'Student {n}'
+            student.profile.save()
+            experiment = Experiment.objects.create(
+                subject=self.subject, title=f'Experiment {n}', objective='o', theory='t', procedure='p'
+            )
+            question = Question.objects.create(experiment=experiment, question_text='Why?', answer='Because')
+            test = Test.objects.create(
+                title=f'Test {n}', description='d', experiment=experiment, subject=self.subject,
+                duration=10, created_by=self.admin_user, total_marks=2, passing_marks=1,
+            )
+            mcqs = [
+                MCQQuestion.objects.create(
+                    test=test, question_text=f'Q{i}', option_a='a', option_b='b',
+                    option_c='c', option_d='d', correct_option='A', order=i,
+                )
+                for i in range(2)
+            ]
+            LabProgress.objects.create(student=student, experiment=experiment, status='completed')
+            QuestionAttempt.objects.create(student=student, question=question, answer_submitted='x')
+            attempt = TestAttempt.objects.create(
+                student=student, test=test, status='completed', score=1, total_marks=2, percentage=50,
+            )
+            for mcq in mcqs:
+                TestResponse.objects.create(attempt=attempt, question=mcq, selected_option='A', is_correct=True)
+        return attempt
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, url_name, args=None):
+        self.add_rows(2)
+        url = reverse(url_name, args=args)
+        self.count_queries(url)  # warm per-process caches such as content types
+        few = self.count_queries(url)
+        self.add_rows(5)
+        many = self.count_queries(url)
+        self.assertEqual(few, many, f'{url_name} runs more queries as rows are added')
+
+    def test_experiment_changelist(self):
+        self.assertConstantQueries('admin:lab_app_experiment_changelist')
+
+    def test_test_changelist(self):
+        self.assertConstantQueries('admin:lab_app_test_changelist')
+
+    def test_mcqquestion_changelist(self):
+        self.assertConstantQueries('admin:lab_app_mcqquestion_changelist')
+
+    def test_testattempt_changelist(self):
+        self.assertConstantQueries('admin:lab_app_testattempt_changelist')
+
+    def test_testresponse_changelist(self):
+        self.assertConstantQueries('admin:lab_app_testresponse_changelist')
+
+    def test_labprogress_changelist(self):
+        self.assertConstantQueries('admin:lab_app_labprogress_changelist')
+
+    def test_questionattempt_changelist(self):
+        self.assertConstantQueries('admin:lab_app_questionattempt_changelist')
+
+    def test_testattempt_change_form_with_responses(self):
+        attempt = self.add_rows(1)
+        url = reverse('admin:lab_app_testattempt_change', args=[attempt.pk])
+        self.count_queries(url)  # warm per-process caches such as content types
+        few = self.count_queries(url)
+        test = attempt.test
+        for i in range(2, 8):
+            mcq = MCQQuestion.objects.create(
+                test=test, question_text=f'Q{i}', option_a='a', option_b='b',
+                option_c='c', option_d='d', correct_option='A', order=i,
+            )
+            TestResponse.objects.create(attempt=attempt, question=mcq, selected_option='B')
+        self.assertEqual(few, self.count_queries(url))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TestSubmissionTests(TestCase):
+    """Grading path: upserted responses, locked attempt, single grading per attempt"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        subject = Subject.objects.create(name='Physics', description='Basics', semester=1, branch='CSE')
+        cls.experiment = Experiment.objects.create(
+            subject=subject, title='Ohm', objective='o', theory='t', procedure='p'
+        )
+        cls.test = Test.objects.create(
+            title='Ohm test', description='d', experiment=cls.experiment, subject=subject,
+            duration=10, created_by=admin_user, total_marks=3, passing_marks=2,
+        )
+        cls.questions = [
+            MCQQuestion.objects.create(
+                test=cls.test, question_text=f'Q{i}', option_a='a', option_b='b',
+                option_c='c', option_d='d', correct_option='A', order=i,
+            )
+            for i in range(3)
+        ]
+        cls.student = User.objects.create_user('student', 'student@example.com', 'password')
+        profile = cls.student.profile
+        profile.full_name = 'Student'
+        profile.roll_no = 'CS001'
+        profile.contact_number = '9876543210'
+        profile.save()
+
+    def setUp(self):
+        self.client.force_login(self.student)
+        self.url = reverse('lab_app:experiment_test', args=[self.experiment.id])
+
+    def test_submission_is_graded_once(self):
+        self.client.get(self.url)
+        answers = {f'question_{q.id}': 'A' for q in self.questions[:2]}
+        answers[f'question_{self.questions[2].id}'] = 'B'
+        self.client.post(self.url, answers)
+
+        attempt = TestAttempt.objects.get(student=self.student, status='completed')
+        self.assertEqual(attempt.score, 2)
+        self.assertEqual(attempt.responses.count(), 3)
+        self.assertEqual(attempt.responses.filter(is_correct=True).count(), 2)
+        self.assertTrue(
+            LabProgress.objects.filter(student=self.student, experiment=self.experiment, status='completed').exists()
+        )
+
+    def test_double_submit_is_graded_once(self):
+        self.client.get(self.url)
+        answers = {f'question_{q.id}': 'A' for q in self.questions}
+        self.client.post(self.url, answers)
+        response = self.client.post(self.url, {f'question_{q.id}': 'B' for q in self.questions})
+
+        self.assertRedirects(
+            response, reverse('lab_app:experiment_test_result', args=[self.experiment.id]),
+            fetch_redirect_response=False,
+        )
+        attempt = TestAttempt.objects.get(student=self.student)
+        self.assertEqual(attempt.status, 'completed')
+        self.assertEqual(attempt.score, 3)
+        self.assertEqual(TestResponse.objects.filter(attempt__student=self.student).count(), 3)
+        self.assertEqual(attempt.responses.filter(selected_option='A').count(), 3)
+
+    def test_partial_answers_are_upserted(self):
+        self.client.get(self.url)
+        attempt = TestAttempt.objects.get(student=self.student, status='started')
+        TestResponse.objects.create(attempt=attempt, question=self.questions[0], selected_option='C')
+
+        self.client.post(self.url, {f'question_{self.questions[0].id}': 'A'})
+
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.status, 'completed')
+        self.assertEqual(attempt.score, 1)
+        response = attempt.responses.get()
+        self.assertEqual(response.selected_option, 'A')
+        self.assertTrue(response.is_correct)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Reads are routed to a second SQLite file holding a snapshot of the
+    primary, so anything written after the snapshot is only visible when
+    the router picks the primary.
+    """
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Replica routing is exercised with two SQLite files')
+        self.student = User.objects.create_user('student', 'student@example.com', 'password')
+        profile = self.student.profile
+        profile.full_name = 'Student'
+        profile.roll_no = 'CS001'
+        profile.contact_number = '9876543210'
+        profile.branch = 'CSE'
+        profile.current_semester = 1
+        profile.save()
+        Subject.objects.create(name='Physics', description='Basics', semester=1, branch='CSE')
+
+        fd, self.replica_path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        connection.ensure_connection()
+        target = sqlite3.connect(self.replica_path)
+        connection.connection.backup(target)
+        target.close()
+        connections.settings[REPLICA_ALIAS] = {
+            **connections.settings['default'], 'NAME': self.replica_path, 'TEST': {},
+        }
+
+        # Only on the primary from here on
+        Subject.objects.create(name='Chemistry', description='Basics', semester=1, branch='CSE')
+        self.client.force_login(self.student)
+
+    def tearDown(self):
+        if REPLICA_ALIAS in connections.settings:
+            connections[REPLICA_ALIAS].close()
+            del connections[REPLICA_ALIAS]
+            del connections.settings[REPLICA_ALIAS]
+            os.remove(self.replica_path)
+
+    def dashboard_subjects(self):
+        response = self.client.get(reverse('lab_app:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return {subject.name for subject in response.context['subjects']}
+
+    def test_reads_use_replica_only_when_enabled(self):
+        self.assertTrue(Subject.objects.filter(name='Chemistry').exists())
+        with read_replica():
+            self.assertFalse(Subject.objects.filter(name='Chemistry').exists())
+            with transaction.atomic():
+                self.assertTrue(Subject.objects.filter(name='Chemistry').exists())
+
+    def test_read_only_view_reads_replica(self):
+        self.assertEqual(self.dashboard_subjects(), {'Physics'})
+
+    def test_experiment_visit_pins_to_primary(self):
+        experiment = Experiment.objects.create(
+            subject=Subject.objects.get(name='Physics'), title='Ohm', objective='o', theory='t', procedure='p',
+        )
+        url = reverse('lab_app:experiment_detail', args=[experiment.id])
+        response = self.client.get(url)
+        self.assertIn(PRIMARY_PIN_SESSION_KEY, self.client.session)
+        self.assertEqual(self.dashboard_subjects(), {'Physics', 'Chemistry'})
+
+        # A 304 revisit bumps last_accessed too; the first revisit still
+        # renders, as the visit created the progress row
+        response = self.client.get(url)
+        session = self.client.session
+        del session[PRIMARY_PIN_SESSION_KEY]
+        session.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertIn(PRIMARY_PIN_SESSION_KEY, self.client.session)
+
+    def test_pinned_session_reads_primary(self):
+        session = self.client.session
+        session[PRIMARY_PIN_SESSION_KEY] = time.time() + 60
+        session.save()
+        self.assertEqual(self.dashboard_subjects(), {'Physics', 'Chemistry'})
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncStudentViewTests(TransactionTestCase):
+    """
+    Outside a test transaction the async views fan their queries out to
+    worker threads; the pages must come out the same as before.
+    """
+
+    def setUp(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.subject = Subject.objects.create(name='Physics', description='Basics', semester=1, branch='CSE')
+        self.experiments = [
+            Experiment.objects.create(
+                subject=self.subject, title=f'Experiment {i}', objective='o', theory='t', procedure='p'
+            )
+            for i in range(3)
+        ]
+        self.test = Test.objects.create(
+            title='Test', description='d', experiment=self.experiments[0], subject=self.subject,
+            duration=10, created_by=admin_user, total_marks=2, passing_marks=1,
+        )
+        self.student = User.objects.create_user('student', 'student@example.com', 'password')
+        profile = self.student.profile
+        profile.full_name = 'Student'
+        profile.roll_no = 'CS001'
+        profile.contact_number = '9876543210'
+        profile.branch = 'CSE'
+        profile.current_semester = 1
+        profile.save()
+        LabProgress.objects.create(student=self.student, experiment=self.experiments[0], status='completed')
+        LabProgress.objects.create(student=self.student, experiment=self.experiments[1], status='in_progress')
+        self.attempt = TestAttempt.objects.create(
+            student=self.student, test=self.test, status='completed', score=2, total_marks=2,
+            percentage=100, completed_at=timezone.now(),
+        )
+        self.async_client.force_login(self.student)
+        # Worker threads keep persistent connections, which would block
+        # dropping the test database on PostgreSQL
+        self.addCleanup(
+            connections.settings['default'].__setitem__, 'CONN_MAX_AGE',
+            connections.settings['default']['CONN_MAX_AGE'],
+        )
+        connections.settings['default']['CONN_MAX_AGE'] = 0
+
+    async def test_dashboard(self):
+        response = await self.async_client.get(reverse('lab_app:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        context = response.context
+        self.assertEqual([s.name for s in context['subjects']], ['Physics'])
+        self.assertEqual(context['subjects'][0].experiment_count, 3)
+        self.assertEqual(context['total_experiments'], 3)
+        self.assertEqual(context['completed_experiments'], 1)
+        self.assertEqual(context['in_progress_experiments'], 1)
+        self.assertEqual(context['available_tests'], 1)
+        self.assertEqual(context['completed_tests'], 1)
+        self.assertEqual(context['avg_test_score'], 100)
+        self.assertEqual(context['recent_tests'], [self.attempt])
+
+    async def test_subject_list(self):
+        response = await self.async_client.get(reverse('lab_app:subject_list', args=[self.subject.id]))
+        self.assertEqual(response.status_code, 200)
+        statuses = [e.progress_status for e in response.context['experiments']]
+        self.assertEqual(statuses, ['completed', 'in_progress', 'not_started'])
+
+    async def test_experiment_detail_records_progress(self):
+        experiment = self.experiments[2]
+        response = await self.async_client.get(reverse('lab_app:experiment_detail', args=[experiment.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['has_test'])
+        self.assertEqual(response.context['progress'].status, 'in_progress')
+        self.assertTrue(await LabProgress.objects.filter(
+            student=self.student, experiment=experiment, status='in_progress'
+        ).aexists())
+
+        response = await self.async_client.get(
+            reverse('lab_app:experiment_detail', args=[self.experiments[0].id])
+        )
+        self.assertTrue(response.context['has_test'])
+        self.assertEqual(response.context['test_attempt'], self.attempt)
+
+    async def test_anonymous_user_is_redirected_to_login(self):
+        await sync_to_async(self.async_client.logout)()
+        response = await self.async_client.get(reverse('lab_app:dashboard'))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(str(settings.LOGIN_URL)))
+
+
+class SyntheticDatasetTests(TestCase):
+    """The generated history must be internally consistent"""
+
+    def test_small_dataset_is_consistent(self):
+        counts = DatasetGenerator(students=40, subjects=4, experiments_per_subject=2,
+                                  questions_per_test=5, seed=7).run()
+
+        self.assertEqual(UserProfile.objects.filter(role='student', is_profile_complete=True).count(), 40)
+        self.assertEqual(TestResponse.objects.count(), counts['responses'])
+        self.assertEqual(counts['responses'], counts['attempts'] * 5)
+        scores = TestAttempt.objects.annotate(
+            correct=Count('responses', filter=Q(responses__is_correct=True))
+        ).values_list('score', 'correct')
+        self.assertTrue(all(score == correct for score, correct in scores))
+        # Progress rows cannot be duplicated per student and experiment
+        self.assertEqual(
+            LabProgress.objects.count(),
+            LabProgress.objects.values('student', 'experiment').distinct().count(),
+        )
+        self.assertFalse(TestAttempt.objects.filter(completed_at__gt=timezone.now()).exists())
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BenchmarkBudgetTests(TransactionTestCase):
+    """Query budgets of the benchmark suite, without the timing rounds"""
+
+    def setUp(self):
+        # The dashboard's query workers must not keep connections open
+        self.addCleanup(
+            connections.settings['default'].__setitem__, 'CONN_MAX_AGE',
+            connections.settings['default']['CONN_MAX_AGE'],
+        )
+        connections.settings['default']['CONN_MAX_AGE'] = 0
+
+    def test_hot_paths_stay_within_query_budgets(self):
+        report = run_benchmarks(scale=0.05, max_rounds=1)
+        self.assertEqual(len(report['results']), len(BENCHMARKS))
+        self.assertEqual(over_budget(report), [])
+
+    @override_settings(ADMISSION_CONTROL={'experiment_test': {'rate': 1, 'burst': 1, 'concurrency': 1}})
+    def test_submissions_bypass_admission_control(self):
+        # Each round must get the 302 the case asserts, not a queued 503
+        report = run_benchmarks(['submission.10_questions'], scale=0.05, max_rounds=12)
+        self.assertGreaterEqual(report['results']['submission.10_questions']['rounds'], 10)
+
+    def test_baseline_comparison(self):
+        baseline = {'results': {'a': {'median_ms': 10.0, 'queries': 5}, 'b': {'median_ms': 10.0, 'queries': 5}}}
+        report = {'results': {
+            'a': {'median_ms': 12.0, 'queries': 5},
+            'b': {'median_ms': 13.0, 'queries': 6},
+            'new': {'median_ms': 99.0, 'queries': 1},
+        }}
+        self.assertEqual(compare_with_baseline(report, baseline, tolerance=0.25), [
+            ('b', 'median_ms', 10.0, 13.0), ('b', 'queries', 5, 6),
+        ])
+
+
+class ArchivalTests(TestCase):
+    """Old attempts move to compressed archive rows and can be read back"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        subject = Subject.objects.create(name='Physics', description='Basics', semester=1, branch='CSE')
+        cls.experiment = Experiment.objects.create(
+            subject=subject, title='Ohm', objective='o', theory='t', procedure='p'
+        )
+        cls.test = Test.objects.create(
+            title='Ohm test', description='d', experiment=cls.experiment, subject=subject,
+            duration=10, created_by=admin_user, total_marks=3, passing_marks=2,
+        )
+        cls.questions = [
+            MCQQuestion.objects.create(
+                test=cls.test, question_text=f'Q{i}', option_a='a', option_b='b',
+                option_c='c', option_d='d', correct_option='A', order=i,
+            )
+            for i in range(3)
+        ]
+        cls.student = User.objects.create_user('student', 'student@example.com', 'password')
+        profile = cls.student.profile
+        profile.full_name = 'Student'
+        profile.roll_no = 'CS001'
+        profile.contact_number = '9876543210'
+        profile.save()
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now()
+        self.old = self._attempt(score=3, days_ago=400, answers='AAA')
+        self.recent = self._attempt(score=2, days_ago=10, answers='AAB')
+
+    def _attempt(self, score, days_ago, answers):
+        completed_at = self.now - timedelta(days=days_ago)
+        attempt = TestAttempt.objects.create(
+            student=self.student, test=self.test, status='completed', score=score, total_marks=3,
+            percentage=score / 3 * 100, completed_at=completed_at, time_taken=timedelta(minutes=5),
+        )
+        TestAttempt.objects.filter(pk=attempt.pk).update(started_at=completed_at - timedelta(minutes=5))
+        for question, option in zip(self.questions, answers):
+            TestResponse.objects.create(attempt=attempt, question=question, selected_option=option,
+                                        is_correct=option == 'A')
+        return attempt
+
+    def test_archive_moves_old_attempts_in_chunks(self):
+        board = leaderboard._build_test_board(self.test.id)
+        self.assertEqual(archive_attempts(self.now - timedelta(days=365), chunk_size=1), 1)
+
+        self.assertEqual(list(TestAttempt.objects.all()), [self.recent])
+        self.assertFalse(TestResponse.objects.filter(attempt_id=self.old.id).exists())
+        archived = ArchivedAttempt.objects.get()
+        self.assertEqual((archived.attempt_id, archived.score, archived.response_count), (self.old.id, 3, 3))
+        rows = unpack_responses(archived.responses)
+        self.assertEqual([r['selected_option'] for r in rows], ['A', 'A', 'A'])
+        self.assertEqual(leaderboard._build_test_board(self.test.id), board)
+
+        # Nothing left to archive: a second run is a no-op
+        self.assertEqual(archive_attempts(self.now - timedelta(days=365)), 0)
+
+    def test_result_page_reads_archived_responses(self):
+        archive_attempts(self.now)
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('lab_app:experiment_test_result', args=[self.experiment.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['test_attempt'].attempt_id, self.recent.id)
+        self.assertEqual(response.context['correct_answers'], 2)
+        self.assertEqual(
+            [r.question for r in response.context['test_responses']], self.questions
+        )
+
+    def test_restore_keeps_ids_and_timestamps(self):
+        answered_at = list(self.old.responses.order_by('question_id').values_list('answered_at', flat=True))
+        archive_attempts(self.now - timedelta(days=365))
+        restored = restore_attempt(ArchivedAttempt.objects.get())
+
+        self.assertFalse(ArchivedAttempt.objects.exists())
+        fresh = TestAttempt.objects.get(pk=self.old.pk)
+        self.assertEqual(fresh.pk, restored.pk)
+        self.assertEqual(fresh.started_at, self.old.completed_at - timedelta(minutes=5))
+        self.assertEqual(fresh.completed_at, self.old.completed_at)
+        self.assertEqual(
+            list(fresh.responses.order_by('question_id').values_list('answered_at', flat=True)), answered_at
+        )
+        self.assertIsNone(fresh.draw)
+
+    def test_restore_keeps_question_draw(self):
+        Test.objects.filter(pk=self.test.pk).update(questions_per_attempt=2, shuffle_options=True)
+        drawn = [self.questions[2], self.questions[0]]
+        TestAttempt.objects.filter(pk=self.old.pk).update(draw=encode_ids([q.id for q in drawn]), draw_seed=42)
+        archive_attempts(self.now - timedelta(days=365))
+        restore_attempt(ArchivedAttempt.objects.get())
+
+        fresh = TestAttempt.objects.get(pk=self.old.pk)
+        self.assertEqual((decode_ids(fresh.draw), fresh.draw_seed), ([q.id for q in drawn], 42))
+        test = Test.objects.get(pk=self.test.pk)
+        questions = attempt_questions(fresh, test)
+        self.assertEqual(questions, drawn)
+        self.assertEqual([letter for letter, _, _ in questions[0].options], option_order(42, drawn[0].id))
+
+
+class SemesterRolloverTests(TestCase):
+    """Cohorts move with set-based updates; final-semester students stay put"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.profiles = {}
+        for name, branch, semester, division in [
+            ('cse3a', 'CSE', 3, 'A'), ('cse3b', 'CSE', 3, 'B'), ('cse8', 'CSE', 8, 'A'), ('ece3', 'ECE', 3, 'A'),
+        ]:
+            user = User.objects.create_user(name, f'{name}@example.com', 'password')
+            UserProfile.objects.filter(user=user).update(branch=branch, current_semester=semester, division=division)
+            cls.profiles[name] = user.profile
+        cls.staff = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        UserProfile.objects.filter(user=cls.staff).update(role='admin', current_semester=3)
+
+    def semesters(self):
+        return dict(UserProfile.objects.values_list('user__username', 'current_semester'))
+
+    def test_promote_branch(self):
+        counts = promote(student_cohort(branch='CSE'), refresh_rollups=False)
+        self.assertEqual(counts, {'promoted': 2, 'held': 1, 'rollups': None})
+        self.assertEqual(self.semesters(), {'cse3a': 4, 'cse3b': 4, 'cse8': 8, 'ece3': 3, 'admin': 3})
+
+    def test_promote_division_and_step_back(self):
+        promote(student_cohort(branch='CSE', semester=3, division='A'), refresh_rollups=False)
+        self.assertEqual(self.semesters()['cse3a'], 4)
+        self.assertEqual(self.semesters()['cse3b'], 3)
+        promote(student_cohort(semester=4), step=-1, refresh_rollups=False)
+        self.assertEqual(self.semesters()['cse3a'], 3)
+
+    def test_admin_action_skips_staff(self):
+        # A fresh user: logging in re-saves the cached profile through the post_save signal
+        self.client.force_login(User.objects.get(pk=self.staff.pk))
+        response = self.client.post(reverse('admin:lab_app_userprofile_changelist'), {
+            'action': 'promote_to_next_semester',
+            '_selected_action': [p.pk for p in UserProfile.objects.all()],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.semesters(), {'cse3a': 4, 'cse3b': 4, 'cse8': 8, 'ece3': 4, 'admin': 3})
+        self.assertTrue(User.objects.get(pk=self.staff.pk).is_staff)
+
+
+class DirtyFieldTrackingTests(TestCase):
+    """Profile and progress saves write only changed columns; logins write once"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', 'student@example.com', 'password')
+        UserProfile.objects.filter(user=cls.student).update(
+            full_name='Student', roll_no='CS001', contact_number='9876543210', is_profile_complete=True,
+        )
+
+    def writes(self, context):
+        return [
+            q['sql'] for q in context.captured_queries
+            if q['sql'].split(' ', 1)[0] in ('INSERT', 'UPDATE', 'DELETE') and 'django_session' not in q['sql']
+        ]
+
+    def test_login_costs_one_write(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.force_login(User.objects.get(pk=self.student.pk))
+        writes = self.writes(context)
+        self.assertEqual(len(writes), 1, writes)
+        self.assertIn('"last_login"', writes[0])
+
+    def test_save_writes_changed_columns_only(self):
+        profile = UserProfile.objects.get(user=self.student)
+        profile.division = 'B'
+        with CaptureQueriesContext(connection) as context:
+            profile.save()
+        (update,) = self.writes(context)
+        self.assertIn('"division"', update)
+        self.assertIn('"updated_at"', update)
+        self.assertNotIn('"full_name"', update)
+
+        with self.assertNumQueries(0):
+            profile.save()
+        self.assertEqual(profile.get_dirty_fields(), [])
+
+    def test_role_change_still_updates_staff_status(self):
+        profile = UserProfile.objects.get(user=self.student)
+        profile.role = 'admin'
+        profile.save()
+        self.assertTrue(User.objects.get(pk=self.student.pk).is_staff)
+
+
+class ProfilePictureTests(TestCase):
+    """Uploads are cleaned and thumbnailed off the request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user('student', 'student@example.com', 'password')
+        UserProfile.objects.filter(user=cls.student).update(
+            full_name='Student', roll_no='CS001', contact_number='9876543210', is_profile_complete=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.client.force_login(User.objects.get(pk=self.student.pk))
+
+    def photo(self, size=(1200, 800)):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+        exif[0x010F] = 'PhoneMaker'
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif.tobytes())
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def upload(self, photo):
+        return self.client.post(reverse('lab_app:edit_profile'), {
+            'full_name': 'Student', 'contact_number': '9876543210', 'profile_picture': photo,
+        })
+
+    def test_upload_is_processed_in_the_background(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.upload(self.photo(size=(2400, 1600)))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(callbacks), 1)
+        profile = UserProfile.objects.get(user=self.student)
+        self.assertEqual(profile.thumbnail_key, '')
+        uploaded = profile.profile_picture.name
+
+        key = process_profile_picture(profile.pk)
+        profile.refresh_from_db()
+        self.assertEqual(profile.thumbnail_key, key)
+        self.assertEqual(profile.profile_picture.name, f'profile_pics/{key}.jpg')
+        self.assertFalse(default_storage.exists(uploaded))
+        with default_storage.open(profile.profile_picture.name) as f:
+            original = Image.open(f)
+            # Rotated upright, scaled to 1024 on the long side, no EXIF left
+            self.assertEqual(original.size, (683, 1024))
+            self.assertEqual(dict(original.getexif()), {})
+        for size in (40, 80, 160):
+            with default_storage.open(f'profile_pics/thumbs/{size}/{key}.webp') as f:
+                self.assertEqual(Image.open(f).size, (size, size))
+
+        self.assertTrue(thumbnail_url(profile, 64).endswith(f'/thumbs/80/{key}.webp'))
+        self.assertTrue(thumbnail_url(profile, 500).endswith(f'/thumbs/160/{key}.webp'))
+
+    def test_unprocessed_picture_is_not_served(self):
+        self.upload(self.photo())
+        profile = UserProfile.objects.get(user=self.student)
+        # The upload still has its EXIF data; pages show a placeholder instead
+        self.assertEqual(thumbnail_url(profile, 40), PLACEHOLDER_URL)
+        response = self.client.get(reverse('lab_app:dashboard'))
+        self.assertNotContains(response, profile.profile_picture.url)
+        self.assertContains(response, 'data:image/svg+xml')
+
+    @override_settings(PROFILE_PICTURE_MAX_UPLOAD_BYTES=1024)
+    def test_oversized_upload_is_rejected(self):
+        response = self.upload(self.photo())
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('profile_picture', response.context['form'].errors)
+        self.assertFalse(UserProfile.objects.get(user=self.student).profile_picture)
+
+
+class ConditionalGetTests(TestCase):
+    """Unchanged content and result pages are answered with 304"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.subject = Subject.objects.create(name='Physics', description='Basics', semester=1, branch='CSE')
+        cls.experiment = Experiment.objects.create(
+            subject=cls.subject, title='Ohm', objective='o', theory='t', procedure='p'
+        )
+        cls.test = Test.objects.create(
+            title='Ohm test', description='d', experiment=cls.experiment, subject=cls.subject,
+            duration=10, created_by=admin_user, total_marks=2, passing_marks=1,
+        )
+        cls.student, cls.rival = [
+            User.objects.create_user(name, f'{name}@example.com', 'password') for name in ('student', 'rival')
+        ]
+        for i, user in enumerate((cls.student, cls.rival)):
+            UserProfile.objects.filter(user=user).update(
+                full_name=user.username, roll_no=f'CS00{i}', contact_number='9876543210', is_profile_complete=True,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.get(pk=self.student.pk))
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_experiment_detail(self):
+        url = reverse('lab_app:experiment_detail', args=[self.experiment.id])
+        self.client.get(url)  # creates the progress row
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('Last-Modified', first)
+        self.assertIn('private', first['Cache-Control'])
+        self.assertIn('no-cache', first['Cache-Control'])
+        self.assertIn('Cookie', first['Vary'])
+
+        progress = LabProgress.objects.get(student=self.student, experiment=self.experiment)
+        response = self.revalidate(url, first)
+        self.assertEqual(response.status_code, 304)
+        self.assertGreater(LabProgress.objects.get(pk=progress.pk).last_accessed, progress.last_accessed)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        self.experiment.title = 'Ohm, revised'
+        self.experiment.save()
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+    def test_subject_list_follows_progress(self):
+        url = reverse('lab_app:subject_list', args=[self.subject.id])
+        first = self.client.get(url)
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
+        LabProgress.objects.create(student=self.student, experiment=self.experiment, status='in_progress')
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+    def test_result_page_follows_standings(self):
+        url = reverse('lab_app:experiment_test_result', args=[self.experiment.id])
+        TestAttempt.objects.create(
+            student=self.student, test=self.test, status='completed', score=1, total_marks=2,
+            percentage=50, completed_at=timezone.now(),
+        )
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertNotIn('Last-Modified', first)
+        self.assertEqual(self.revalidate(url, first).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TestAttempt.objects.create(
+                student=self.rival, test=self.test, status='completed', score=2, total_marks=2,
+                percentage=100, completed_at=timezone.now(),
+            )
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+    def test_pending_messages_get_the_full_page(self):
+        url = reverse('lab_app:subject_list', args=[self.subject.id])
+        first = self.client.get(url)
+        other = Subject.objects.create(name='Machines', description='d', semester=2, branch='CSE')
+        # Access denied: the error message waits for the next page
+        self.client.get(reverse('lab_app:subject_list', args=[other.id]))
+        response = self.revalidate(url, first)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'You do not have access to this subject.')
+
+
+class ApiTests(TestCase):
+    """JSON endpoints: field selection, access and cursor pagination"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.subject = Subject.objects.create(name='Physics', description='Basics', semester=1, branch='CSE')
+        cls.other_subject = Subject.objects.create(name='Machines', description='d', semester=2, branch='CSE')
+        cls.experiment = Experiment.objects.create(
+            subject=cls.subject, title='Ohm', objective='o', theory='t', procedure='p'
+        )
+        cls.test = Test.objects.create(
+            title='Ohm test', description='d', experiment=cls.experiment, subject=cls.subject,
+            duration=10, created_by=admin_user, total_marks=2, passing_marks=1,
+        )
+        cls.student = User.objects.create_user('student', 'student@example.com', 'password')
+        UserProfile.objects.filter(user=cls.student).update(
+            full_name='Student', roll_no='CS001', contact_number='9876543210', is_profile_complete=True,
+        )
+        LabProgress.objects.create(student=cls.student, experiment=cls.experiment, status='completed')
+        now = timezone.now()
+        # Pairs of attempts share a completion time, so the id breaks ties
+        cls.attempts = [
+            TestAttempt.objects.create(
+                student=cls.student, test=cls.test, status='completed', score=i % 3, total_marks=2,
+                percentage=50, completed_at=now - timedelta(hours=i // 2),
+            )
+            for i in range(7)
+        ]
+
+    def setUp(self):
+        self.client.force_login(User.objects.get(pk=self.student.pk))
+
+    def test_requires_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('lab_app:api_subjects'))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('error', response.json())
+
+    def test_subjects_and_field_selection(self):
+        rows = self.client.get(reverse('lab_app:api_subjects')).json()['results']
+        self.assertEqual(rows, [{'id': self.subject.id, 'name': 'Physics', 'experiment_count': 1}])
+
+        rows = self.client.get(reverse('lab_app:api_subjects'), {'fields': 'name,branch'}).json()['results']
+        self.assertEqual(rows, [{'name': 'Physics', 'branch': 'CSE'}])
+        response = self.client.get(reverse('lab_app:api_subjects'), {'fields': 'name,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_experiments_of_another_semester_are_hidden(self):
+        url = reverse('lab_app:api_subject_experiments', args=[self.subject.id])
+        self.assertEqual(self.client.get(url).json()['results'], [
+            {'id': self.experiment.id, 'title': 'Ohm', 'has_test': True},
+        ])
+        url = reverse('lab_app:api_subject_experiments', args=[self.other_subject.id])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_progress_filter(self):
+        url = reverse('lab_app:api_progress')
+        rows = self.client.get(url, {'fields': 'experiment_title,status'}).json()['results']
+        self.assertEqual(rows, [{'experiment_title': 'Ohm', 'status': 'completed'}])
+        self.assertEqual(self.client.get(url, {'status': 'in_progress'}).json()['results'], [])
+
+    def test_attempt_pages_cover_live_and_archived_attempts_once(self):
+        archive_attempts(timezone.now() - timedelta(minutes=90))
+        self.assertTrue(ArchivedAttempt.objects.exists())
+        seen, params = [], {'limit': 2, 'fields': 'score'}
+        for _ in range(4):
+            with CaptureQueriesContext(connection) as queries:
+                page = self.client.get(reverse('lab_app:api_attempts'), params).json()
+            # One bounded keyset query per table, whatever the page
+            attempt_queries = [q['sql'] for q in queries if 'attempt"' in q['sql']]
+            self.assertEqual(len(attempt_queries), 2)
+            self.assertTrue(all('LIMIT 3' in sql for sql in attempt_queries))
+            seen += page['results']
+            if not page['next']:
+                break
+            params['cursor'] = page['next']
+        self.assertIsNone(page['next'])
+        expected = sorted(self.attempts, key=lambda a: (a.completed_at, a.id), reverse=True)
+        self.assertEqual([row['id'] for row in seen], [a.id for a in expected])
+        self.assertEqual(seen[0].keys(), {'id', 'completed_at', 'score', 'archived'})
+        self.assertTrue(seen[-1]['archived'])
+
+    def test_bad_cursor(self):
+        response = self.client.get(reverse('lab_app:api_attempts'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_dashboard(self):
+        data = self.client.get(reverse('lab_app:api_dashboard')).json()
+        self.assertEqual(data['stats']['total_experiments'], 1)
+        self.assertEqual(data['stats']['completed_experiments'], 1)
+        self.assertEqual(data['stats']['completed_tests'], 7)
+        self.assertEqual(len(data['recent_tests']), 3)
+        self.assertEqual(data['subjects'][0]['name'], 'Physics')
+
+
+class StaticExportTests(TestCase):
+    """The static bundle is complete and rebuilt incrementally"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.subject = Subject.objects.create(name='Physics', description='Basics', semester=1, branch='CSE')
+        cls.ohm, cls.hooke = [
+            Experiment.objects.create(
+                subject=cls.subject, title=title, objective=f'Verify **{title}** law', theory='t', procedure='1. a\n2. b'
+            )
+            for title in ('Ohm', 'Hooke')
+        ]
+        Question.objects.create(experiment=cls.ohm, question_text='What is *R*?', answer='Resistance')
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def read(self, path):
+        with open(os.path.join(self.root, path)) as f:
+            return f.read()
+
+    def test_bundle(self):
+        counts = export_site(self.root)
+        self.assertEqual(counts['written'], 5)  # two experiments, subject, semester, index
+        page = self.read(f'cse/semester-1/{self.subject.id}/experiment-{self.ohm.id}.html')
+        self.assertIn('<strong>Ohm</strong>', page)
+        self.assertIn('<em>R</em>', page)
+        manifest = load_manifest(self.root)
+        for path in manifest['assets'].values():
+            self.assertIn(f'../../../{path}', page)
+            self.assertTrue(os.path.exists(os.path.join(self.root, path)))
+        self.assertIn(f'{self.subject.id}/index.html', self.read('cse/semester-1/index.html'))
+        self.assertIn('cse/semester-1/index.html', self.read('index.html'))
+
+    def test_rebuild_renders_only_changed_experiments(self):
+        export_site(self.root)
+        with self.assertNumQueries(2):  # subjects and experiment versions only
+            self.assertEqual(export_site(self.root)['written'], 0)
+
+        Question.objects.create(experiment=self.hooke, question_text='Units of k?', answer='N/m')
+        counts = export_site(self.root)
+        # The subject page is re-rendered too, but its listing did not change
+        self.assertEqual(counts['written'], 1)
+        self.assertIn('Units of k?', self.read(f'cse/semester-1/{self.subject.id}/experiment-{self.hooke.id}.html'))
+
+        Experiment.objects.filter(pk=self.ohm.pk).update(is_active=False)
+        counts = export_site(self.root)
+        self.assertEqual(counts['removed'], 1)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.root, f'cse/semester-1/{self.subject.id}/experiment-{self.ohm.id}.html')
+        ))
+        # A full build renders every page again, but rewrites none of them
+        self.assertEqual(export_site(self.root, full=True), {'written': 0, 'unchanged': 4, 'removed': 0})
+
+
+class StudentProgressTests(TestCase):
+    """The progress page groups in the database and pages its history"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.tests = []
+        for name in ('Physics', 'Chemistry'):
+            subject = Subject.objects.create(name=name, description='d', semester=1, branch='CSE')
+            experiment = Experiment.objects.create(subject=subject, title=name, objective='o', theory='t', procedure='p')
+            cls.tests.append(Test.objects.create(
+                title=f'{name} test', description='d', experiment=experiment, subject=subject,
+                duration=10, created_by=admin_user, total_marks=4, passing_marks=2,
+            ))
+        cls.student = User.objects.create_user('student', 'student@example.com', 'password')
+        UserProfile.objects.filter(user=cls.student).update(
+            full_name='Student', roll_no='CS001', contact_number='9876543210', is_profile_complete=True,
+        )
+
+    def setUp(self):
+        self.client.force_login(User.objects.get(pk=self.student.pk))
+
+    def add_attempts(self, count, days_ago=0):
+        now = timezone.now() - timedelta(days=days_ago)
+        TestAttempt.objects.bulk_create([
+            TestAttempt(
+                student=self.student, test=self.tests[i % 2], status='completed', score=i % 5, total_marks=4,
+                percentage=(i % 5) * 25, completed_at=now - timedelta(minutes=i),
+            )
+            for i in range(count)
+        ])
+
+    def query_count(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('lab_app:student_progress'), params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_fixed_query_count(self):
+        self.add_attempts(3)
+        few, _ = self.query_count()
+        self.add_attempts(60, days_ago=1)
+        many, response = self.query_count()
+        self.assertEqual(few, many)
+        self.assertEqual(response.context['total_test_attempts'], 63)
+        self.assertEqual(len(response.context['attempts']), 10)
+
+    def test_stats_and_history_include_archived_attempts(self):
+        self.add_attempts(15, days_ago=30)
+        self.add_attempts(10)
+        archive_attempts(timezone.now() - timedelta(days=7))
+        _, response = self.query_count()
+        stats = {row['name']: row for row in response.context['subject_stats']}
+        self.assertEqual(stats['Physics']['attempts'], 13)
+        self.assertEqual(stats['Chemistry']['attempts'], 12)
+        self.assertEqual(stats['Physics']['best_score'], 100)
+        self.assertEqual(response.context['total_test_attempts'], 25)
+
+        seen = list(response.context['attempts'])
+        while response.context['next_cursor']:
+            _, response = self.query_count(cursor=response.context['next_cursor'])
+            seen += response.context['attempts']
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len({(row['archived'], row['id']) for row in seen}), 25)
+        self.assertEqual(sum(row['archived'] for row in seen), 15)
+        self.assertEqual([row['completed_at'] for row in seen], sorted((row['completed_at'] for row in seen), reverse=True))
+
+    def test_bad_cursor_starts_over(self):
+        response = self.client.get(reverse('lab_app:student_progress'), {'cursor': 'bogus'})
+        self.assertRedirects(response, reverse('lab_app:student_progress'))
+
+    def test_test_without_experiment_is_listed(self):
+        subject_test = Test.objects.create(
+            title='Subject test', description='d', subject=self.tests[0].subject, duration=10,
+            created_by=self.tests[0].created_by, total_marks=4, passing_marks=2,
+        )
+        TestAttempt.objects.create(
+            student=self.student, test=subject_test, status='completed', score=3, total_marks=4,
+            percentage=75, completed_at=timezone.now(),
+        )
+        _, response = self.query_count()
+        # Listed without a link, as there is no experiment result page for it
+        self.assertContains(response, '<span class="font-medium text-gray-900">Subject test</span>', html=True)
+
+
+class QuestionPoolTests(TestCase):
+    """Attempts draw K questions from the bank and rebuild the draw from the attempt row"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        subject = Subject.objects.create(name='Physics', description='Basics', semester=1, branch='CSE')
+        cls.experiment = Experiment.objects.create(subject=subject, title='Ohm', objective='o', theory='t', procedure='p')
+        cls.test = Test.objects.create(
+            title='Ohm test', description='d', experiment=cls.experiment, subject=subject, duration=10,
+            created_by=admin_user, total_marks=40, passing_marks=20, questions_per_attempt=5, shuffle_options=True,
+        )
+        MCQQuestion.objects.bulk_create([
+            MCQQuestion(
+                test=cls.test, question_text=f'Q{i}', option_a=f'{i}a', option_b=f'{i}b', option_c=f'{i}c',
+                option_d=f'{i}d', correct_option='ABCD'[i % 4], order=i,
+            )
+            for i in range(40)
+        ])
+        cls.student = User.objects.create_user('student', 'student@example.com', 'password')
+        UserProfile.objects.filter(user=cls.student).update(
+            full_name='Student', roll_no='CS001', contact_number='9876543210', is_profile_complete=True,
+        )
+
+    def setUp(self):
+        self.client.force_login(User.objects.get(pk=self.student.pk))
+        self.url = reverse('lab_app:experiment_test', args=[self.experiment.id])
+
+    def test_id_encoding(self):
+        ids = [1, 127, 128, 300, 16384, 2 ** 40]
+        self.assertEqual(decode_ids(encode_ids(ids)), ids)
+        self.assertEqual(len(encode_ids(range(1, 128))), 127)
+
+    def test_draw_is_stable_and_graded(self):
+        response = self.client.get(self.url)
+        attempt = TestAttempt.objects.get(student=self.student, status='started')
+        drawn = decode_ids(attempt.draw)
+        self.assertEqual(len(drawn), 5)
+        self.assertEqual(len(set(drawn)), 5)
+        self.assertEqual(attempt.total_marks, 5)
+        self.assertEqual([q.id for q in response.context['questions']], drawn)
+
+        # Reloading shows the same questions with the same option order
+        first = [(q.id, q.options) for q in response.context['questions']]
+        again = [(q.id, q.options) for q in self.client.get(self.url).context['questions']]
+        self.assertEqual(first, again)
+        for question_id, options in first:
+            self.assertEqual(sorted(letter for letter, _, _ in options), ['A', 'B', 'C', 'D'])
+            self.assertEqual([label for _, label, _ in options], ['A', 'B', 'C', 'D'])
+
+        # Three of five right passes the 50% mark scaled from the bank (20/40)
+        correct = dict(MCQQuestion.objects.filter(id__in=drawn).values_list('id', 'correct_option'))
+        answers = {f'question_{qid}': correct[qid] for qid in drawn[:3]}
+        answers.update({f'question_{qid}': 'B' if correct[qid] != 'B' else 'C' for qid in drawn[3:]})
+        self.client.post(self.url, answers)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.status, 'completed')
+        self.assertEqual(attempt.score, 3)
+        self.assertEqual(attempt.percentage, 60)
+        self.assertTrue(attempt.is_passed)
+        self.assertEqual(attempt.responses.count(), 5)
+
+    def test_rendering_reads_only_the_drawn_questions(self):
+        self.client.get(self.url)
+        MCQQuestion.objects.bulk_create([
+            MCQQuestion(test=self.test, question_text='extra', option_a='a', option_b='b', option_c='c',
+                        option_d='d', correct_option='A', order=100 + i)
+            for i in range(200)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        question_queries = [q['sql'] for q in queries if 'FROM "lab_app_mcqquestion"' in q['sql']]
+        self.assertEqual(len(question_queries), 1)
+        self.assertIn('IN (', question_queries[0])
+
+    def test_tests_without_pool_ask_every_question(self):
+        Test.objects.filter(pk=self.test.pk).update(questions_per_attempt=None, shuffle_options=False)
+        response = self.client.get(self.url)
+        attempt = TestAttempt.objects.get(student=self.student, status='started')
+        self.assertIsNone(attempt.draw)
+        self.assertEqual(len(response.context['questions']), 40)
+        self.assertEqual(response.context['questions'][0].options[1], ('B', 'B', '0b'))
+
+
+@override_settings(ADMISSION_CONTROL={'experiment_test': {'rate': 0.001, 'burst': 2, 'concurrency': 5}})
+class AdmissionControlTests(TestCase):
+    """Requests over a view's limits get the queue page instead of reaching the database"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        subject = Subject.objects.create(name='Physics', description='Basics', semester=1, branch='CSE')
+        cls.experiment = Experiment.objects.create(subject=subject, title='Ohm', objective='o', theory='t', procedure='p')
+        cls.test = Test.objects.create(
+            title='Ohm test', description='d', experiment=cls.experiment, subject=subject, duration=10,
+            created_by=admin_user, total_marks=1, passing_marks=1,
+        )
+        MCQQuestion.objects.create(
+            test=cls.test, question_text='Q', option_a='a', option_b='b', option_c='c', option_d='d',
+            correct_option='A', order=1,
+        )
+        cls.admin_user = admin_user
+        cls.student = User.objects.create_user('student', 'student@example.com', 'password')
+        UserProfile.objects.filter(user=cls.student).update(
+            full_name='Student', roll_no='CS001', contact_number='9876543210', is_profile_complete=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.get(pk=self.student.pk))
+        self.url = reverse('lab_app:experiment_test', args=[self.experiment.id])
+
+    def test_queued_over_rate(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertTemplateUsed(response, 'admission_queue.html')
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertFalse([q for q in queries if 'lab_app_test' in q['sql']])
+
+        # Other tests have their own bucket
+        other = Experiment.objects.create(subject=self.experiment.subject, title='Other', objective='o', theory='t', procedure='p')
+        self.assertNotEqual(self.client.get(reverse('lab_app:experiment_test', args=[other.id])).status_code, 503)
+
+    def test_queued_submission_is_reposted(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        response = self.client.post(self.url, {'question_1': 'A', 'csrfmiddlewaretoken': 'token'})
+        self.assertEqual(response.status_code, 503)
+        self.assertContains(response, 'method="post"', status_code=503)
+        self.assertContains(response, '<input type="hidden" name="question_1" value="A">', status_code=503)
+        self.assertFalse(TestAttempt.objects.filter(status='completed').exists())
+
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'queued': True, 'retry_after': int(response['Retry-After'])})
+
+    @override_settings(ADMISSION_CONTROL={'experiment_test': {'rate': 0, 'concurrency': 1}})
+    def test_concurrency_slots(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.get(self.url).status_code, 200)  # the slot was released
+        # Another request holding the only slot
+        cache.set(admission._key('active', 'experiment_test', self.experiment.id), 1)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], str(admission.CONCURRENCY_RETRY_AFTER))
+
+    @override_settings(ADMISSION_CONTROL={})
+    def test_unconfigured_view_is_not_limited(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(admission.metrics(), {})
+
+    def test_metrics(self):
+        for _ in range(3):
+            self.client.get(self.url)
+        url = reverse('lab_app:admission_metrics')
+        self.assertRedirects(self.client.get(url), f"{reverse('account_login')}?next={url}", fetch_redirect_response=False)  # staff only
+        self.client.force_login(self.admin_user)
+        limiter = self.client.get(url).json()['limiters']['experiment_test']
+        self.assertEqual(limiter['admitted'], 2)
+        self.assertEqual(limiter['rate_limited'], 1)
+        self.assertEqual(limiter['concurrency_limited'], 0)
+        self.assertEqual(limiter['limits'], {'rate': 0.001, 'burst': 2, 'concurrency': 5})
+
+
+class HealthCheckTests(TransactionTestCase):
+    """Liveness needs nothing but the process; readiness checks the backends and warm-up"""
+
+    def setUp(self):
+        saved = {key: value.copy() if isinstance(value, dict) else value for key, value in warmup.STATUS.items()}
+        self.addCleanup(warmup.STATUS.update, saved)
+        warmup.STATUS.update(finished=False, steps={}, errors={})
+
+    def test_healthz(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-store', response['Cache-Control'])
+
+    def test_ready_after_warm_up(self):
+        with self.assertLogs('lab_app.health', 'WARNING') as logs:
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        # Reasons are logged, not published
+        self.assertEqual(response.json(), {
+            'status': 'unavailable',
+            'checks': {'database': 'ok', 'cache': 'ok', 'migrations': 'ok', 'warm_up': 'failed'},
+        })
+        self.assertIn('warm-up has not finished', logs.output[0])
+
+        steps = warmup.warm_up()
+        self.assertEqual(set(steps), {name for name, _ in warmup.STEPS})
+        self.assertEqual(warmup.STATUS['errors'], {})
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'ready')
+
+    def test_not_ready_until_failed_step_succeeds(self):
+        database_up = False
+
+        def prime():
+            if not database_up:
+                raise RuntimeError('database unavailable')
+
+        with mock.patch.object(warmup, 'STEPS', (('database', prime),)), \
+                self.assertLogs('lab_app', 'WARNING'):
+            warmup.warm_up()
+            self.assertTrue(warmup.STATUS['finished'])
+            response = self.client.get('/readyz')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()['checks']['warm_up'], 'failed')
+
+            # Retried by the next check once it can succeed
+            database_up = True
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(warmup.STATUS['errors'], {})
+
+    @override_settings(WARM_UP_WORKERS=False, CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    })
+    def test_not_ready_without_cache(self):
+        with self.assertLogs('lab_app.health', 'WARNING'):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        checks = response.json()['checks']
+        self.assertEqual(checks['cache'], 'failed')
+        self.assertEqual(checks['warm_up'], 'ok')
+
+
+class StartupImportTests(TestCase):
+    """Cold start-ups stay within budget and leave the heavy libraries for later"""
+
+    STARTUP_BUDGET_SLACK = 3
+
+    def test_parse_importtime(self):
+        output = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   json.decoder\n'
+            'import time:       300 |        420 | json\n'
+        )
+        self.assertEqual(parse_importtime(output), [('json.decoder', 120, 120, 1), ('json', 300, 420, 0)])
+
+    def test_startup_budget(self):
+        # Wall-clock time depends on the machine, so the suite allows a few
+        # times the budget; CHECK_STARTUP_BUDGET=1 holds it to the budget
+        # itself, as manage.py profile_imports does
+        slack = 1 if os.environ.get('CHECK_STARTUP_BUDGET') == '1' else self.STARTUP_BUDGET_SLACK
+        for target in TARGETS:
+            with self.subTest(target=target):
+                profile = profile_imports(target)
+                self.assertEqual(profile['deferred'], [])
+                self.assertLessEqual(profile['seconds'], BUDGETS[target] * slack)
+                self.assertIn('django', {name for name, _, _, _ in profile['imports']})
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    """The loadtest command drives the real routes and cleans up after itself"""
+
+    def setUp(self):
+        # The dashboard's query workers must not keep connections open
+        self.addCleanup(
+            connections.settings['default'].__setitem__, 'CONN_MAX_AGE',
+            connections.settings['default']['CONN_MAX_AGE'],
+        )
+        connections.settings['default']['CONN_MAX_AGE'] = 0
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        subject = Subject.objects.create(name='Physics', description='Basics', semester=1, branch='CSE')
+        experiment = Experiment.objects.create(subject=subject, title='Ohm', objective='o', theory='t', procedure='p')
+        test = Test.objects.create(
+            title='Ohm test', description='d', experiment=experiment, subject=subject, duration=10,
+            created_by=admin_user, total_marks=2, passing_marks=1,
+        )
+        for i in range(2):
+            MCQQuestion.objects.create(
+                test=test, question_text=f'Q{i}', option_a='a', option_b='b', option_c='c', option_d='d',
+                correct_option='A', order=i,
+            )
+
+    # Limits the run would exceed; the command measures without them
+    @override_settings(ADMISSION_CONTROL={'experiment_test': {'rate': 1, 'burst': 1, 'concurrency': 1}})
+    def test_session_without_errors(self):
+        out = io.StringIO()
+        # The in-memory SQLite test database locks whole tables, so its
+        # students take turns; a file database runs them concurrently
+        # with the tuned backend (see SQLITE_TUNED)
+        concurrency = 1 if connection.vendor == 'sqlite' else None
+        call_command('loadtest', students=7, concurrency=concurrency, scratch=True, stdout=out)
+        self.assertIn('0 errors', out.getvalue())
+        self.assertIn(f"{'experiment_test (POST)':<24} {7:>8} {0:>7}", out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='loadtest-').exists())
+        self.assertEqual(TestAttempt.objects.count(), 0)
+
+    def test_needs_a_scratch_database(self):
+        with self.assertRaisesMessage(CommandError, '--scratch'):
+            call_command('loadtest', students=1, stdout=io.StringIO())
+        self.assertFalse(User.objects.filter(username__startswith='loadtest-').exists())
+
+
+class LeaderboardTests(TestCase):
+    """Boards rank best attempts by score, then time, and follow new attempts"""
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.subject = Subject.objects.create(name='Physics', description='Basics', semester=1, branch='CSE')
+        cls.tests = [
+            Test.objects.create(
+                title=f'Test {i}', description='d', subject=cls.subject, duration=10,
+                created_by=admin_user, total_marks=3, passing_marks=2,
+            )
+            for i in range(2)
+        ]
+        cls.students = [User.objects.create_user(f's{i}', f's{i}@example.com', 'password') for i in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        # Start from cached boards, so attempts are folded in incrementally
+        for test in self.tests:
+            leaderboard.get_test_board(test.id)
+        leaderboard.get_subject_board(self.subject.id)
+
+    def _attempt(self, student, score, minutes, test=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return TestAttempt.objects.create(
+                student=student, test=test or self.tests[0], status='completed', score=score, total_marks=3,
+                percentage=score / 3 * 100, completed_at=timezone.now(), time_taken=timedelta(minutes=minutes),
+            )
+
+    def assertBoardsMatchDatabase(self):
+        for test in self.tests:
+            self.assertEqual(leaderboard.get_test_board(test.id), leaderboard._build_test_board(test.id))
+        self.assertEqual(
+            leaderboard.get_subject_board(self.subject.id), leaderboard._build_subject_board(self.subject.id),
+        )
+
+    def test_ties_are_broken_by_time(self):
+        a, b, c = self.students
+        self._attempt(a, 2, minutes=5)
+        self._attempt(b, 2, minutes=3)
+        self._attempt(c, 2, minutes=3)
+        board = leaderboard.get_test_board(self.tests[0].id)
+        self.assertEqual(leaderboard.get_rank(board, b.id), (1, 3))
+        self.assertEqual(leaderboard.get_rank(board, c.id), (1, 3))
+        self.assertEqual(leaderboard.get_rank(board, a.id), (3, 3))
+        self.assertEqual([e['rank'] for e in leaderboard.top_entries(board)], [1, 1, 3])
+        self.assertBoardsMatchDatabase()
+
+    def test_lower_retake_is_ignored(self):
+        a, b, _ = self.students
+        self._attempt(a, 3, minutes=5)
+        self._attempt(b, 2, minutes=1)
+        self._attempt(a, 1, minutes=1)
+        board = leaderboard.get_test_board(self.tests[0].id)
+        self.assertEqual(board['best'][a.id], (-3, 300))
+        self.assertEqual(leaderboard.get_rank(board, a.id), (1, 2))
+        self.assertEqual(leaderboard.get_subject_board(self.subject.id)['best'][a.id], (-3, 300))
+        self.assertBoardsMatchDatabase()
+
+    def test_better_retake_replaces_entry(self):
+        a, b, _ = self.students
+        self._attempt(a, 1, minutes=5)
+        self._attempt(b, 2, minutes=5)
+        self._attempt(a, 3, minutes=4)
+        board = leaderboard.get_test_board(self.tests[0].id)
+        self.assertEqual(board['ranking'], [(-3, 240, a.id), (-2, 300, b.id)])
+        self.assertEqual(leaderboard.get_rank(board, a.id), (1, 2))
+        self.assertBoardsMatchDatabase()
+
+    def test_subject_totals(self):
+        a, b, c = self.students
+        self._attempt(a, 2, minutes=5, test=self.tests[0])
+        self._attempt(a, 3, minutes=2, test=self.tests[1])
+        self._attempt(b, 3, minutes=1, test=self.tests[0])
+        self._attempt(a, 3, minutes=6, test=self.tests[0])  # replaces a's 2 on the first test
+        board = leaderboard.get_subject_board(self.subject.id)
+        self.assertEqual(board['best'][a.id], (-6, 480))
+        self.assertEqual(board['best'][b.id], (-3, 60))
+        self.assertEqual(leaderboard.get_rank(board, a.id), (1, 2))
+        self.assertEqual(leaderboard.get_rank(board, c.id), (None, 2))
+        self.assertBoardsMatchDatabase()
+
+    def test_deleting_a_test_reads_its_subject_once(self):
+        a, b, c = self.students
+        for student in (a, b, c):
+            self._attempt(student, 2, minutes=5, test=self.tests[0])
+        self._attempt(a, 3, minutes=5, test=self.tests[1])
+
+        def delete_queries(test):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                Test.objects.get(pk=test.pk).delete()
+            return len(queries)
+
+        # One attempt or three: the same queries
+        self.assertEqual(delete_queries(self.tests[0]), delete_queries(self.tests[1]))
+        self.assertEqual(leaderboard.get_subject_board(self.subject.id)['ranking'], [])
+
+    def test_attempt_recorded_during_rebuild_is_not_lost(self):
+        cache.clear()
+        build = leaderboard._build_test_board
+
+        def build_then_record(test_id):
+            board = build(test_id)
+            # Completes after the rebuild read the database
+            self._attempt(self.students[0], 3, minutes=2)
+            return board
+
+        with mock.patch.object(leaderboard, '_build_test_board', build_then_record):
+            leaderboard.get_test_board(self.tests[0].id)
+        board = leaderboard.get_test_board(self.tests[0].id)
+        self.assertEqual(leaderboard.get_rank(board, self.students[0].id), (1, 1))
+
+
+class ItemAnalysisTests(TestCase):
+    """Item statistics of a small response matrix, checked by hand"""
+
+    def test_compute_item_statistics(self):
+        import numpy as np
+
+        # Keys A and B; rows score 2, 1, 0 and 0
+        keys = np.array([1, 2], dtype=np.int8)
+        choices = np.array([[1, 2], [1, 0], [2, 0], [3, 1]], dtype=np.int8)
+        stats = compute_item_statistics(keys, choices)
+
+        first, second = stats['items']
+        self.assertEqual((first['difficulty'], second['difficulty']), (0.5, 0.25))
+        # Each item against the other: 0.5 / sqrt(1 * 0.75)
+        self.assertEqual((first['discrimination'], second['discrimination']), (0.577, 0.577))
+        self.assertEqual((first['group_index'], second['group_index']), (1.0, 1.0))
+        self.assertEqual(first['frequencies'], {'Blank': 0, 'A': 2, 'B': 1, 'C': 1, 'D': 0})
+        self.assertEqual(second['frequencies'], {'Blank': 2, 'A': 1, 'B': 1, 'C': 0, 'D': 0})
+        # 2 * (1 - 0.4375 / 0.6875)
+        self.assertEqual(stats['kr20'], 0.727)
+        self.assertEqual(stats['mean_score'], 0.75)
+        self.assertEqual(stats['attempt_count'], 4)
+
+    def test_cache_follows_answer_key(self):
+        cache.clear()
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        subject = Subject.objects.create(name='Physics', description='d', semester=1, branch='CSE')
+        test = Test.objects.create(
+            title='T', description='d', subject=subject, duration=10, created_by=admin_user,
+            total_marks=1, passing_marks=1,
+        )
+        question = MCQQuestion.objects.create(
+            test=test, question_text='Q', option_a='a', option_b='b', option_c='c', option_d='d', correct_option='A',
+        )
+        student = User.objects.create_user('student', 'student@example.com', 'password')
+        attempt = TestAttempt.objects.create(student=student, test=test, status='completed', score=0, total_marks=1)
+        TestResponse.objects.create(attempt=attempt, question=question, selected_option='B', is_correct=False)
+        self.assertEqual(get_item_analysis(test)['items'][question.pk]['difficulty'], 0.0)
+
+        # Re-keyed with a bulk update, which sends no signal
+        MCQQuestion.objects.filter(pk=question.pk).update(correct_option='B')
+        self.assertEqual(get_item_analysis(test)['items'][question.pk]['difficulty'], 1.0)
+
+        added = MCQQuestion.objects.create(
+            test=test, question_text='Q2', option_a='a', option_b='b', option_c='c', option_d='d', correct_option='A',
+        )
+        self.assertEqual(set(get_item_analysis(test)['items']), {question.pk, added.pk})
+        added.delete()
+        self.assertEqual(set(get_item_analysis(test)['items']), {question.pk})
+
+
+    def test_pooled_questions_count_only_where_shown(self):
+        cache.clear()
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        subject = Subject.objects.create(name='Physics', description='d', semester=1, branch='CSE')
+        test = Test.objects.create(
+            title='T', description='d', subject=subject, duration=10, created_by=admin_user,
+            total_marks=3, passing_marks=1, questions_per_attempt=2,
+        )
+        bank = [
+            MCQQuestion.objects.create(
+                test=test, question_text=f'Q{i}', option_a='a', option_b='b', option_c='c', option_d='d',
+                correct_option='A', order=i,
+            )
+            for i in range(3)
+        ]
+        # Each bank question is drawn by two of the three attempts
+        sheets = ({0: 'A', 1: 'A'}, {1: 'B', 2: 'A'}, {0: 'A', 2: None})
+        for i, sheet in enumerate(sheets):
+            student = User.objects.create_user(f's{i}', f's{i}@example.com', 'password')
+            attempt = TestAttempt.objects.create(
+                student=student, test=test, status='completed', score=0, total_marks=2,
+                draw=encode_ids([bank[q].id for q in sheet]), draw_seed=i,
+            )
+            TestResponse.objects.bulk_create([
+                TestResponse(attempt=attempt, question=bank[q], selected_option=option, is_correct=option == 'A')
+                for q, option in sheet.items() if option
+            ])
+
+        analysis = get_item_analysis(test)
+        items = [analysis['items'][question.id] for question in bank]
+        self.assertEqual([item['attempts'] for item in items], [2, 2, 2])
+        self.assertEqual([item['difficulty'] for item in items], [1.0, 0.5, 0.5])
+        self.assertEqual(items[0]['frequencies'], {'Blank': 0, 'A': 2, 'B': 0, 'C': 0, 'D': 0})
+        self.assertEqual(items[1]['frequencies'], {'Blank': 0, 'A': 1, 'B': 1, 'C': 0, 'D': 0})
+        # Drawn but left blank
+        self.assertEqual(items[2]['frequencies'], {'Blank': 1, 'A': 1, 'B': 0, 'C': 0, 'D': 0})
+        # The attempts answered different forms
+        self.assertIsNone(analysis['kr20'])
+
+
+class CohortRollupTests(TestCase):
+    """Rollups of a small fixed cohort, and who may see them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.subject = Subject.objects.create(name='Physics', description='d', semester=1, branch='CSE')
+        experiments = [
+            Experiment.objects.create(subject=cls.subject, title=f'E{i}', objective='o', theory='t', procedure='p')
+            for i in range(2)
+        ]
+        test = Test.objects.create(
+            title='T', description='d', subject=cls.subject, duration=10, created_by=cls.admin,
+            total_marks=10, passing_marks=5,
+        )
+        students = []
+        for i, division in enumerate('AAAAB'):
+            student = User.objects.create_user(f's{i}', f's{i}@example.com', 'password')
+            UserProfile.objects.filter(user=student).update(
+                full_name=f'Student {i}', roll_no=f'CS00{i}', contact_number='9876543210',
+                is_profile_complete=True, division=division,
+            )
+            students.append(student)
+        cls.student = students[0]
+        # Best attempts of division A: 80 (over an earlier 40), 60, 20 and none
+        for student, score in ((students[0], 4), (students[0], 8), (students[1], 6), (students[2], 2), (students[4], 10)):
+            TestAttempt.objects.create(
+                student=student, test=test, status='completed', score=score, total_marks=10,
+                percentage=score * 10, completed_at=timezone.now(),
+            )
+        for student, experiment in ((students[0], experiments[0]), (students[0], experiments[1]), (students[1], experiments[0])):
+            LabProgress.objects.create(student=student, experiment=experiment, status='completed')
+
+    def test_rollup_values(self):
+        # A subject row and a cohort-wide row per division
+        self.assertEqual(build_cohort_rollups(), 4)
+        for subject in (self.subject, None):
+            rollup = CohortRollup.objects.get(branch='CSE', semester=1, division='A', subject=subject)
+            self.assertEqual((rollup.student_count, rollup.result_count), (4, 3))
+            self.assertEqual(rollup.avg_score, 53.33)
+            self.assertEqual(rollup.pass_rate, 66.67)
+            # Linear interpolation between 20, 60 and 80
+            self.assertEqual(
+                [rollup.p10, rollup.p25, rollup.p50, rollup.p75, rollup.p90], [28.0, 40.0, 60.0, 70.0, 76.0],
+            )
+            # 3 of 4 students x 2 experiments
+            self.assertEqual(rollup.completion_rate, 37.5)
+
+        other = CohortRollup.objects.get(division='B', subject=None)
+        self.assertEqual((other.student_count, other.avg_score, other.pass_rate), (1, 100.0, 100.0))
+        self.assertEqual(other.completion_rate, 0.0)
+
+    def test_staff_only(self):
+        url = reverse('lab_app:cohort_analytics')
+        self.client.force_login(self.student)
+        self.assertRedirects(self.client.get(url), f"{reverse('account_login')}?next={url}", fetch_redirect_response=False)
+        self.client.post(url)
+        self.assertFalse(CohortRollup.objects.exists())
+
+        self.client.force_login(self.admin)
+        self.client.post(url)
+        response = self.client.get(url, {'division': 'A'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([rollup.avg_score for rollup in response.context['rollups']], [53.33])
+
+
+class SearchIndexTests(TestCase):
+    """The full-text index (FTS5 on SQLite) follows content changes through the signals"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.subject = Subject.objects.create(name='Physics', description='d', semester=1, branch='CSE')
+        cls.experiment = Experiment.objects.create(
+            subject=cls.subject, title="Hooke's law", objective='o',
+            theory='Extension of a spring is proportional to the load.', procedure='p',
+        )
+        cls.question = Question.objects.create(experiment=cls.experiment, question_text='Define the spring constant.')
+        cls.test = Test.objects.create(
+            title='Springs quiz', description='d', subject=cls.subject, duration=10, created_by=cls.admin,
+            total_marks=1, passing_marks=1,
+        )
+        cls.mcq = MCQQuestion.objects.create(
+            test=cls.test, question_text='Unit of the spring constant?', option_a='N/m', option_b='N',
+            option_c='m', option_d='kg', correct_option='A',
+        )
+
+    def found(self, term, **kwargs):
+        return {(r['kind'], r['object_id']) for r in search.search(term, **kwargs)}
+
+    def test_documents_are_indexed(self):
+        self.assertEqual(
+            self.found('spring', kinds=(search.KIND_EXPERIMENT, search.KIND_QUESTION, search.KIND_MCQ)),
+            {('experiment', self.experiment.pk), ('question', self.question.pk), ('mcq', self.mcq.pk)},
+        )
+        # The last word matches as a prefix
+        self.assertEqual(self.found('proportion'), {('experiment', self.experiment.pk)})
+        result, = search.search('load')
+        self.assertIn('<mark>load</mark>', result['snippet'])
+        self.assertEqual(self.found('spring', branch='ECE'), set())
+
+    def test_saves_reindex(self):
+        self.experiment.theory = 'Stress is proportional to strain.'
+        self.experiment.save()
+        self.assertEqual(self.found('load'), set())
+        self.assertEqual(self.found('strain'), {('experiment', self.experiment.pk)})
+
+        # Copied from the subject into its documents
+        self.subject.is_active = False
+        self.subject.save()
+        self.assertEqual(self.found('strain'), set())
+        self.assertEqual(self.found('strain', active_only=False), {('experiment', self.experiment.pk)})
+
+    def test_deletes_remove_documents(self):
+        self.mcq.delete()
+        self.question.delete()
+        self.assertEqual(self.found('constant', kinds=(search.KIND_QUESTION, search.KIND_MCQ)), set())
+        self.experiment.delete()
+        self.assertEqual(self.found('spring'), set())
+
+    def test_admin_search(self):
+        self.client.force_login(self.admin)
+        Experiment.objects.bulk_create([
+            Experiment(subject=self.subject, title=f'Pendulum {i}', objective='o', theory='t', procedure='p')
+            for i in range(3)
+        ])
+        search.rebuild_index()
+        response = self.client.get(reverse('admin:lab_app_experiment_changelist'), {'q': 'pendulum'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+        response = self.client.get(reverse('admin:lab_app_mcqquestion_changelist'), {'q': 'unit'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.mcq])
+        response = self.client.get(reverse('admin:lab_app_mcqquestion_changelist'), {'q': '!!'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+
+class AnswerSimilarityTests(TestCase):
+    """Identical answer sheets are flagged, within a division and a time window only"""
+
+    # Every key is A; the copied sheet shares four wrong answers
+    COPIED = 'ABCBC'
+
+    @classmethod
+    def setUpTestData(cls):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        subject = Subject.objects.create(name='Physics', description='d', semester=1, branch='CSE')
+        cls.test = Test.objects.create(
+            title='T', description='d', subject=subject, duration=10, created_by=admin_user,
+            total_marks=5, passing_marks=3,
+        )
+        questions = [
+            MCQQuestion.objects.create(
+                test=cls.test, question_text=f'Q{i}', option_a='a', option_b='b', option_c='c', option_d='d',
+                correct_option='A', order=i,
+            )
+            for i in range(5)
+        ]
+        start = timezone.now() - timedelta(days=1)
+        cls.attempts = {}
+        for name, division, answers, minutes in (
+            ('source', 'A', cls.COPIED, 0),
+            ('copier', 'A', cls.COPIED, 10),
+            ('neighbour', 'A', 'ACBDD', 5),  # wrong too, but never the same way
+            ('other_division', 'B', cls.COPIED, 0),
+            ('later', 'A', cls.COPIED, 180),
+        ):
+            student = User.objects.create_user(name, f'{name}@example.com', 'password')
+            UserProfile.objects.filter(user=student).update(full_name=name, roll_no=name, division=division)
+            attempt = TestAttempt.objects.create(
+                student=student, test=cls.test, status='completed', total_marks=5,
+                score=answers.count('A'), completed_at=start + timedelta(minutes=minutes + 10),
+            )
+            TestAttempt.objects.filter(pk=attempt.pk).update(started_at=start + timedelta(minutes=minutes))
+            TestResponse.objects.bulk_create([
+                TestResponse(attempt=attempt, question=question, selected_option=option, is_correct=option == 'A')
+                for question, option in zip(questions, answers)
+            ])
+            cls.attempts[name] = attempt.pk
+
+    def flagged(self, **kwargs):
+        names = {pk: name for name, pk in self.attempts.items()}
+        return {tuple(sorted(names[pk] for pk in pair['attempts'])) for pair in find_similar_attempts(self.test, **kwargs)}
+
+    def test_identical_sheets_are_flagged(self):
+        pair, = find_similar_attempts(self.test)
+        self.assertEqual(set(pair['attempts']), {self.attempts['source'], self.attempts['copier']})
+        self.assertEqual(pair['division'], 'A')
+        self.assertEqual((pair['identical'], pair['shared_wrong'], pair['both_wrong']), (5, 4, 4))
+        self.assertEqual((pair['wrong_match_ratio'], pair['longest_run']), (1.0, 5))
+        self.assertEqual(pair['start_gap_minutes'], 10.0)
+
+    def test_blocks_keep_divisions_and_sittings_apart(self):
+        self.assertEqual(self.flagged(), {('copier', 'source')})
+        # A wide enough window brings the later sitting in, but never division B
+        self.assertEqual(
+            self.flagged(window_minutes=240), {('copier', 'source'), ('later', 'source'), ('copier', 'later')},
+        )
+        self.assertEqual(self.flagged(min_shared_wrong=5), set())
+
+
+class TunedSQLiteBackendTests(SimpleTestCase):
+    """lab_app.backends.sqlite3 applies its PRAGMAs and takes the write lock up front"""
+
+    def connect(self, name, **options):
+        # A handler of its own, whatever backend the suite runs on
+        handler = ConnectionHandler({'default': {'ENGINE': 'lab_app.backends.sqlite3', 'NAME': name, 'OPTIONS': options}})
+        conn = handler['default']
+        self.addCleanup(conn.close)
+        return conn
+
+    def pragmas(self, conn, *names):
+        with conn.cursor() as cursor:
+            return [cursor.execute(f'PRAGMA {name}').fetchone()[0] for name in names]
+
+    def test_pragmas(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        conn = self.connect(os.path.join(directory, 'db.sqlite3'), pragmas={'cache_size': -2000})
+        self.assertEqual(
+            self.pragmas(conn, 'journal_mode', 'busy_timeout', 'synchronous', 'cache_size'),
+            ['wal', 20000, 1, -2000],  # synchronous NORMAL is 1
+        )
+        # In-memory databases keep their journal
+        self.assertEqual(self.pragmas(self.connect(':memory:'), 'journal_mode', 'busy_timeout'), ['memory', 20000])
+
+    def test_atomic_begins_immediate(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        conn = self.connect(os.path.join(directory, 'db.sqlite3'))
+        with CaptureQueriesContext(conn) as queries, mock.patch.object(transaction, 'get_connection', return_value=conn):
+            with transaction.atomic():
+                conn.cursor().execute('CREATE TABLE t (id integer)')
+        self.assertEqual(queries[0]['sql'], 'BEGIN IMMEDIATE')
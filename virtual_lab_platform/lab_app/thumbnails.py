@@ -0,0 +1,155 @@
+"""
+Profile picture processing.
+
+Uploads are stored as they arrive and processed off the request on a
+small background thread pool, scheduled when the transaction that saved
+the upload commits:
+
+* the original is re-encoded without its EXIF data (camera, GPS...),
+  rotated upright and scaled down to ``PROFILE_PICTURE_MAX_SIDE``;
+* square thumbnails are cut for every ``PROFILE_THUMBNAIL_SIZES`` size,
+  as WebP (JPEG where Pillow lacks WebP support).
+
+Files are named after a hash of the processed image, so their URLs never
+change content and identical uploads share files. The profile stores the
+name in ``thumbnail_key``; until it is set templates show a placeholder,
+never the upload itself, which still carries its EXIF data (GPS
+position included).
+A profile seen without thumbnails (an upload from before this existed,
+or a lost job) is queued again on first access, once per
+``LOCK_TIMEOUT`` thanks to a cache lock. Pillow is imported on first use,
+not when the signals load this module at start-up.
+"""
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+MAX_SIDE = getattr(settings, 'PROFILE_PICTURE_MAX_SIDE', 1024)
+SIZES = tuple(sorted(getattr(settings, 'PROFILE_THUMBNAIL_SIZES', (40, 80, 160))))
+LOCK_TIMEOUT = 5 * 60
+
+# Grey silhouette shown until the thumbnails are built; inline, so it costs no request
+PLACEHOLDER_URL = (
+    "data:image/svg+xml,%3Csvg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 40 40'%3E"
+    "%3Crect width='40' height='40' fill='%23e5e7eb'/%3E"
+    "%3Ccircle cx='20' cy='15' r='7' fill='%239ca3af'/%3E"
+    "%3Cpath d='M6 38c1-9 7-13 14-13s13 4 14 13z' fill='%239ca3af'/%3E%3C/svg%3E"
+)
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='lab_app-thumbnails')
+
+
+@lru_cache(maxsize=None)
+def output_format():
+    """(Pillow format, file extension) of the thumbnails"""
+    from PIL import features
+
+    return ('WEBP', 'webp') if features.check('webp') else ('JPEG', 'jpg')
+
+
+def original_name(key):
+    return f'profile_pics/{key}.jpg'
+
+
+def thumbnail_name(key, size):
+    return f'profile_pics/thumbs/{size}/{key}.{output_format()[1]}'
+
+
+def _encode(image, format, **options):
+    buffer = io.BytesIO()
+    # No exif= argument: Pillow writes no metadata unless asked to
+    image.save(buffer, format, **options)
+    return buffer.getvalue()
+
+
+def _square(image, size):
+    from PIL import Image, ImageOps
+
+    return ImageOps.fit(image, (size, size), Image.LANCZOS)
+
+
+def process_profile_picture(profile_id):
+    """
+    Replace a profile's uploaded picture with a cleaned copy and write its
+    thumbnails. Does nothing if the picture changed or was processed
+    meanwhile. Returns the new ``thumbnail_key`` or None.
+    """
+    from PIL import Image, ImageOps
+
+    profile = UserProfile.objects.filter(pk=profile_id).only('profile_picture', 'thumbnail_key').first()
+    if profile is None or not profile.profile_picture or profile.thumbnail_key:
+        return None
+    uploaded = profile.profile_picture.name
+
+    with default_storage.open(uploaded, 'rb') as f:
+        image = Image.open(f)
+        # Let the JPEG decoder downscale big phone photos while decoding
+        image.draft('RGB', (MAX_SIDE, MAX_SIDE))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+    image.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+    original = _encode(image, 'JPEG', quality=88, optimize=True)
+    key = hashlib.sha256(original).hexdigest()[:20]
+
+    if not default_storage.exists(original_name(key)):
+        default_storage.save(original_name(key), ContentFile(original))
+    for size in SIZES:
+        name = thumbnail_name(key, size)
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(_encode(_square(image, size), output_format()[0], quality=82)))
+
+    # Only if nobody uploaded another picture in the meantime
+    updated = UserProfile.objects.filter(pk=profile_id, profile_picture=uploaded).update(
+        profile_picture=original_name(key), thumbnail_key=key,
+    )
+    if updated and uploaded != original_name(key):
+        default_storage.delete(uploaded)
+    return key if updated else None
+
+
+def _run(profile_id):
+    close_old_connections()
+    try:
+        process_profile_picture(profile_id)
+        cache.delete(_lock_key(profile_id))
+    except Exception:
+        # The lock stays, so a broken upload is retried after LOCK_TIMEOUT
+        logger.exception('Could not process the profile picture of profile %s', profile_id)
+    finally:
+        close_old_connections()
+
+
+def _lock_key(profile_id):
+    return f'lab_app:thumbnails:lock:{profile_id}'
+
+
+def schedule(profile_id):
+    """Queue processing for after the current transaction commits, unless already queued"""
+    if cache.add(_lock_key(profile_id), 1, LOCK_TIMEOUT):
+        transaction.on_commit(lambda: _executor.submit(_run, profile_id))
+
+
+def thumbnail_url(profile, size):
+    """
+    URL of the smallest thumbnail at least ``size`` pixels wide, or of the
+    placeholder while the thumbnails are not built yet. Empty without
+    picture.
+    """
+    if not profile or not profile.profile_picture:
+        return ''
+    if not profile.thumbnail_key:
+        schedule(profile.pk)
+        return PLACEHOLDER_URL
+    fitting = next((s for s in SIZES if s >= size), SIZES[-1])
+    return default_storage.url(thumbnail_name(profile.thumbnail_key, fitting))
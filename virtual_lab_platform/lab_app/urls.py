@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, health, views
 
 app_name = 'lab_app'
 
@@ -21,9 +21,27 @@ urlpatterns = [
     path('experiment/<int:experiment_id>/test/', views.experiment_test, name='experiment_test'),
     path('experiment/<int:experiment_id>/test/result/', views.experiment_test_result, name='experiment_test_result'),
     
+    # Search
+    path('search/', views.search_content, name='search'),
+    
     # Student Progress
     path('progress/', views.student_progress, name='student_progress'),
     
+    # Staff analytics
+    path('analytics/cohorts/', views.cohort_analytics, name='cohort_analytics'),
+    path('analytics/admission/', views.admission_metrics, name='admission_metrics'),
+    
     # Authentication status
     path('auth/status/', views.auth_status, name='auth_status'),
+
+    # Load balancer health checks (no trailing slash, so probes are not redirected)
+    path('healthz', health.healthz, name='healthz'),
+    path('readyz', health.readyz, name='readyz'),
+
+    # JSON API
+    path('api/subjects/', api.subjects, name='api_subjects'),
+    path('api/subjects/<int:subject_id>/experiments/', api.subject_experiments, name='api_subject_experiments'),
+    path('api/progress/', api.progress, name='api_progress'),
+    path('api/attempts/', api.attempts, name='api_attempts'),
+    path('api/dashboard/', api.dashboard, name='api_dashboard'),
 ]
\ No newline at end of file
@@ -3,16 +3,28 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, Avg
+from django.db import transaction
+from django.db.models import Q, F, Count, Avg, Max, Exists, OuterRef, Subquery
 from django.utils import timezone
 from django.http import JsonResponse
 from django.conf import settings
-from datetime import timedelta
+from datetime import datetime, timedelta
+from asgiref.sync import sync_to_async
+import asyncio
 from .models import (
     Subject, Experiment, UserProfile, LabProgress, QuestionAttempt,
-    Test, MCQQuestion, TestAttempt, TestResponse
+    Test, MCQQuestion, TestAttempt, TestResponse, CohortRollup, ArchivedAttempt, passing_marks_for
 )
 from .forms import UserProfileForm, EditProfileForm
+from .analytics import build_cohort_rollups
+from . import leaderboard, search
+from .archive import archived_responses, attempt_history, subject_attempt_stats
+from .routers import read_from_replica, pin_to_primary
+from .async_utils import async_login_required, gather_queries
+from .conditional import conditional_page
+from .pagination import decode_cursor, encode_cursor
+from .question_pool import attempt_questions, draw_attempt
+from . import admission
 
 # Define locally to avoid import issues
 def get_session_settings():
@@ -27,6 +39,13 @@ def is_admin(user):
     """Check if user is admin"""
     return user.is_authenticated and user.is_staff
 
+async def _get_profile(user):
+    """Load the profile without the lazy (sync-only) ``user.profile`` lookup"""
+    profile = await UserProfile.objects.filter(user=user).afirst()
+    if profile is not None:
+        user.profile = profile
+    return profile
+
 def index(request):
     """Homepage view - shows different content based on authentication status"""
     if request.user.is_authenticated:
@@ -42,8 +61,9 @@ def index(request):
     }
     return render(request, 'index.html', context)
 
-@login_required
-def dashboard(request):
+@async_login_required
+@read_from_replica
+async def dashboard(request):
     """Dashboard view for authenticated users"""
     user = request.user
     
@@ -52,11 +72,10 @@ def dashboard(request):
         return redirect('/admin/')
     
     # Student dashboard
-    if not hasattr(user, 'profile') or not user.profile.is_profile_complete:
+    profile = await _get_profile(user)
+    if profile is None or not profile.is_profile_complete:
         return redirect('lab_app:complete_profile')
     
-    profile = user.profile
-    
     # Get subjects for student's semester and branch
     subjects = Subject.objects.filter(
         semester=profile.current_semester,
@@ -65,64 +84,49 @@ def dashboard(request):
     ).annotate(
         experiment_count=Count('experiments', filter=Q(experiments__is_active=True))
     )
-    
-    # Get student's progress
     progress_data = LabProgress.objects.filter(student=user).select_related('experiment__subject')
+    completed_attempts = TestAttempt.objects.filter(student=user, status='completed')
+    
+    # The queries are independent of each other, so run them concurrently
+    (subjects, total_experiments, progress_counts, available_tests,
+     test_stats, recent_progress, recent_tests) = await gather_queries(
+        lambda: list(subjects),
+        lambda: Experiment.objects.filter(subject__in=subjects, is_active=True).count(),
+        lambda: progress_data.aggregate(
+            completed=Count('id', filter=Q(status='completed')),
+            in_progress=Count('id', filter=Q(status='in_progress')),
+        ),
+        lambda: Test.objects.filter(
+            subject__semester=profile.current_semester,
+            subject__branch=profile.branch,
+            is_active=True
+        ).count(),
+        lambda: completed_attempts.aggregate(count=Count('id'), avg=Avg('percentage')),
+        # Recent activity
+        lambda: list(progress_data.order_by('-last_accessed')[:5]),
+        # Recent test attempts
+        lambda: list(completed_attempts.select_related('test').order_by('-completed_at')[:3]),
+    )
     
-    # Calculate progress statistics
-    total_experiments = Experiment.objects.filter(
-        subject__in=subjects,
-        is_active=True
-    ).count()
-    
-    completed_experiments = progress_data.filter(status='completed').count()
-    in_progress_experiments = progress_data.filter(status='in_progress').count()
-    
+    completed_experiments = progress_counts['completed']
     progress_percentage = (completed_experiments / total_experiments * 100) if total_experiments > 0 else 0
-    
-    # Get test statistics
-    available_tests = Test.objects.filter(
-        subject__semester=profile.current_semester,
-        subject__branch=profile.branch,
-        is_active=True
-    ).count()
-    
-    completed_tests = TestAttempt.objects.filter(
-        student=user,
-        status='completed'
-    ).count()
-    
-    # Calculate average test score
-    avg_test_score = TestAttempt.objects.filter(
-        student=user,
-        status='completed'
-    ).aggregate(avg=Avg('percentage'))['avg']
-    avg_test_score = round(avg_test_score, 1) if avg_test_score else 0
-    
-    # Recent activity
-    recent_progress = progress_data.order_by('-last_accessed')[:5]
-    
-    # Recent test attempts
-    recent_tests = TestAttempt.objects.filter(
-        student=user,
-        status='completed'
-    ).select_related('test').order_by('-completed_at')[:3]
+    avg_test_score = round(test_stats['avg'], 1) if test_stats['avg'] else 0
     
     context = {
         'profile': profile,
         'subjects': subjects,
         'total_experiments': total_experiments,
         'completed_experiments': completed_experiments,
-        'in_progress_experiments': in_progress_experiments,
+        'in_progress_experiments': progress_counts['in_progress'],
         'progress_percentage': round(progress_percentage, 1),
         'recent_progress': recent_progress,
         # Test statistics
         'available_tests': available_tests,
-        'completed_tests': completed_tests,
+        'completed_tests': test_stats['count'],
         'avg_test_score': avg_test_score,
         'recent_tests': recent_tests,
     }
-    return render(request, 'dashboard/student_dashboard.html', context)
+    return await sync_to_async(render)(request, 'dashboard/student_dashboard.html', context)
 
 @login_required
 def complete_profile(request):
@@ -140,6 +144,7 @@ def complete_profile(request):
         form = UserProfileForm(request.POST, request.FILES, instance=profile)
         if form.is_valid():
             form.save()
+            pin_to_primary(request)
             messages.success(request, 'Profile completed successfully!')
             return redirect('lab_app:dashboard')
     else:
@@ -156,6 +161,7 @@ def edit_profile(request):
         form = EditProfileForm(request.POST, request.FILES, instance=profile)
         if form.is_valid():
             form.save()
+            pin_to_primary(request)
             messages.success(request, 'Profile updated successfully!')
             return redirect('lab_app:dashboard')
     else:
@@ -163,27 +169,60 @@ def edit_profile(request):
     
     return render(request, 'account/edit_profile.html', {'form': form, 'profile': profile})
 
-@login_required
-def subject_list(request, subject_id):
+def _profile_version(user):
+    """Profile fields the page chrome and access checks depend on"""
+    return UserProfile.objects.filter(user=user).values_list(
+        'updated_at', 'thumbnail_key', 'role'
+    ).first()
+
+def _latest(*timestamps):
+    return max((t for t in timestamps if t is not None), default=None)
+
+def _subject_list_version(request, subject_id):
+    active = Q(experiments__is_active=True)
+    subject = Subject.objects.filter(id=subject_id).values_list(
+        'updated_at', 'is_active',
+    ).annotate(
+        experiment_count=Count('experiments', filter=active),
+        experiments_updated=Max('experiments__updated_at', filter=active),
+    ).order_by('id').first()
+    if subject is None:
+        return None
+    progress = LabProgress.objects.filter(
+        student=request.user, experiment__subject_id=subject_id, experiment__is_active=True
+    ).aggregate(total=Count('id'), completed=Count('id', filter=Q(status='completed')))
+    # Progress counts are not timestamps, so no Last-Modified
+    return (subject, progress, _profile_version(request.user)), None
+
+@async_login_required
+@read_from_replica
+@conditional_page(_subject_list_version)
+async def subject_list(request, subject_id):
     """View showing experiments for a specific subject"""
-    subject = get_object_or_404(Subject, id=subject_id, is_active=True)
+    subject, profile = await gather_queries(
+        lambda: get_object_or_404(Subject, id=subject_id, is_active=True),
+        lambda: UserProfile.objects.filter(user=request.user).first(),
+    )
+    if profile is not None:
+        request.user.profile = profile
     
     # Check if student has access to this subject
-    if (hasattr(request.user, 'profile') and 
-        request.user.profile.role == 'student' and
-        (subject.semester != request.user.profile.current_semester or
-         subject.branch != request.user.profile.branch)):
+    if (profile is not None and
+        profile.role == 'student' and
+        (subject.semester != profile.current_semester or
+         subject.branch != profile.branch)):
         messages.error(request, 'You do not have access to this subject.')
         return redirect('lab_app:dashboard')
     
-    experiments = subject.experiments.filter(is_active=True)
+    # Experiments and the student's progress on them, fetched concurrently
+    experiments, progress_dict = await gather_queries(
+        lambda: list(subject.experiments.filter(is_active=True)),
+        lambda: dict(LabProgress.objects.filter(
+            student=request.user, experiment__subject=subject, experiment__is_active=True
+        ).values_list('experiment_id', 'status')),
+    )
     
-    # Get student's progress for each experiment
-    if request.user.is_authenticated and hasattr(request.user, 'profile'):
-        progress_dict = {}
-        for progress in LabProgress.objects.filter(student=request.user, experiment__in=experiments):
-            progress_dict[progress.experiment.id] = progress.status
-        
+    if profile is not None:
         for experiment in experiments:
             experiment.progress_status = progress_dict.get(experiment.id, 'not_started')
     
@@ -191,52 +230,103 @@ def subject_list(request, subject_id):
         'subject': subject,
         'experiments': experiments,
     }
-    return render(request, 'subject_list.html', context)
+    return await sync_to_async(render)(request, 'subject_list.html', context)
 
-@login_required
-def experiment_detail(request, experiment_id):
+def _experiment_detail_version(request, experiment_id):
+    latest_attempt = TestAttempt.objects.filter(
+        student=request.user, test__experiment=OuterRef('pk'), status='completed'
+    ).order_by('-completed_at')
+    experiment = Experiment.objects.filter(id=experiment_id).annotate(
+        attempt_id=Subquery(latest_attempt.values('id')[:1]),
+        attempt_completed_at=Subquery(latest_attempt.values('completed_at')[:1]),
+        # The first visit creates the progress row, so the next one re-renders once
+        tracked=Exists(LabProgress.objects.filter(student=request.user, experiment=OuterRef('pk'))),
+    ).values_list(
+        'updated_at', 'is_active', 'subject__updated_at', 'mcq_test__id', 'mcq_test__updated_at',
+        'attempt_id', 'attempt_completed_at', 'tracked',
+    ).first()
+    if experiment is None:
+        return None
+    profile = _profile_version(request.user)
+    last_modified = _latest(experiment[0], experiment[2], experiment[4], experiment[6], profile and profile[0])
+    return (experiment, profile), last_modified
+
+def _touch_progress(request, experiment_id):
+    """A 304 still counts as a visit"""
+    if LabProgress.objects.filter(student=request.user, experiment_id=experiment_id).update(
+        last_accessed=timezone.now()
+    ):
+        pin_to_primary(request)
+
+@async_login_required
+@conditional_page(_experiment_detail_version, not_modified=_touch_progress)
+async def experiment_detail(request, experiment_id):
     """View showing detailed experiment information"""
-    experiment = get_object_or_404(Experiment, id=experiment_id, is_active=True)
+    user = request.user
+    experiment, profile = await gather_queries(
+        lambda: get_object_or_404(
+            Experiment.objects.select_related('subject'), id=experiment_id, is_active=True
+        ),
+        lambda: UserProfile.objects.filter(user=user).first(),
+    )
+    if profile is not None:
+        request.user.profile = profile
     
     # Check if student has access to this experiment
-    if (hasattr(request.user, 'profile') and 
-        request.user.profile.role == 'student' and
-        (experiment.subject.semester != request.user.profile.current_semester or
-         experiment.subject.branch != request.user.profile.branch)):
+    if (profile is not None and
+        profile.role == 'student' and
+        (experiment.subject.semester != profile.current_semester or
+         experiment.subject.branch != profile.branch)):
         messages.error(request, 'You do not have access to this experiment.')
         return redirect('lab_app:dashboard')
     
-    # Track student's progress
+    # Track student's progress; the write stays on the request's connection
+    # while the test lookups run alongside it
     progress = None
     test_attempt = None
-    if hasattr(request.user, 'profile') and request.user.profile.role == 'student':
-        progress, created = LabProgress.objects.get_or_create(
-            student=request.user,
-            experiment=experiment,
-            defaults={'status': 'in_progress'}
-        )
-        if not created:
-            progress.last_accessed = timezone.now()
-            if progress.status == 'not_started':
-                progress.status = 'in_progress'
-            progress.save()
-        
-        # Check if experiment has a test and get attempt status
-        if hasattr(experiment, 'mcq_test') and experiment.mcq_test:
+    if profile is not None and profile.role == 'student':
+        progress, test, test_attempt = await asyncio.gather(
+            sync_to_async(_track_progress)(user, experiment),
+            _first(Test.objects.filter(experiment=experiment)),
             # Get the most recent completed attempt
-            test_attempt = TestAttempt.objects.filter(
-                student=request.user,
-                test=experiment.mcq_test,
+            _first(TestAttempt.objects.filter(
+                student=user,
+                test__experiment=experiment,
                 status='completed'
-            ).order_by('-completed_at').first()
+            ).order_by('-completed_at')),
+        )
+        # The dashboard lists recent activity by last access
+        pin_to_primary(request)
+    else:
+        test = await _first(Test.objects.filter(experiment=experiment))
+    
+    if test is not None:
+        experiment.mcq_test = test
     
     context = {
         'experiment': experiment,
         'progress': progress,
         'test_attempt': test_attempt,
-        'has_test': hasattr(experiment, 'mcq_test') and experiment.mcq_test is not None,
+        'has_test': test is not None,
     }
-    return render(request, 'experiment_detail.html', context)
+    return await sync_to_async(render)(request, 'experiment_detail.html', context)
+
+def _track_progress(user, experiment):
+    progress, created = LabProgress.objects.get_or_create(
+        student=user,
+        experiment=experiment,
+        defaults={'status': 'in_progress'}
+    )
+    if not created:
+        progress.last_accessed = timezone.now()
+        if progress.status == 'not_started':
+            progress.status = 'in_progress'
+        progress.save()
+    return progress
+
+async def _first(queryset):
+    (obj,) = await gather_queries(queryset.first)
+    return obj
 
 @login_required
 def mark_experiment_complete(request, experiment_id):
@@ -255,6 +345,7 @@ def mark_experiment_complete(request, experiment_id):
             progress.completed_at = timezone.now()
             progress.save()
         
+        pin_to_primary(request)
         return JsonResponse({'success': True})
     
     return JsonResponse({'success': False})
@@ -318,6 +409,7 @@ def contact(request):
     return render(request, 'contact.html')
 
 # MCQ Test Views (Integrated with Experiments)
+@admission.admission_control('experiment_test', scope=lambda request, experiment_id: experiment_id)
 @login_required
 def experiment_test(request, experiment_id):
     """View for taking the experiment test"""
@@ -351,25 +443,33 @@ def experiment_test(request, experiment_id):
     if existing_started:
         # Use the existing started attempt
         attempt = existing_started
+    elif request.method == 'POST':
+        # A repeated submit of an attempt graded meanwhile; answers are only
+        # taken for a started attempt, never for a fresh one
+        messages.error(request, 'This test has already been completed.')
+        return redirect('lab_app:experiment_test_result', experiment_id=experiment.id)
     else:
-        # Create a new attempt (either first attempt or retake)
-        attempt = TestAttempt.objects.create(
+        # Create a new attempt (either first attempt or retake), with its
+        # own draw of questions if the test asks a sample of its bank
+        attempt = TestAttempt(
             student=request.user,
             test=test,
             status='started',
             total_marks=test.total_marks,
         )
+        draw_attempt(attempt, test)
+        attempt.save()
     
     # Handle test submission
     if request.method == 'POST':
         return handle_experiment_test_submission(request, experiment, test, attempt)
     
     # Get test questions
-    questions = test.mcq_questions.all().order_by('order')
+    questions = attempt_questions(attempt, test)
     
     # Get existing responses
     responses = TestResponse.objects.filter(attempt=attempt)
-    response_dict = {r.question.id: r.selected_option for r in responses}
+    response_dict = {r.question_id: r.selected_option for r in responses}
     
     # Add existing answers to questions
     for question in questions:
@@ -380,67 +480,103 @@ def experiment_test(request, experiment_id):
         'test': test,
         'attempt': attempt,
         'questions': questions,
+        'passing_marks': passing_marks_for(attempt.total_marks, test),
         'profile': profile,
     }
     return render(request, 'experiment_test.html', context)
 
 def handle_experiment_test_submission(request, experiment, test, attempt):
     """Handle experiment test answer submission"""
-    if attempt.status == 'completed':
-        messages.error(request, 'This test has already been completed.')
-        return redirect('lab_app:experiment_test_result', experiment_id=experiment.id)
-    
-    # Process each question
-    questions = test.mcq_questions.all()
-    total_score = 0
-    
-    for question in questions:
-        selected_option = request.POST.get(f'question_{question.id}')
+    with transaction.atomic():
+        # Lock the attempt row (PostgreSQL) so a double submit is graded once
+        attempt = TestAttempt.objects.select_for_update(of=('self',)).select_related('test').get(pk=attempt.pk)
+        if attempt.status == 'completed':
+            messages.error(request, 'This test has already been completed.')
+            return redirect('lab_app:experiment_test_result', experiment_id=experiment.id)
+        
+        # Grade every answered question of the attempt's draw
+        questions = attempt_questions(attempt, test)
+        total_score = 0
+        responses = []
         
-        if selected_option:
-            is_correct = selected_option == question.correct_option
-            if is_correct:
-                total_score += question.marks
+        for question in questions:
+            selected_option = request.POST.get(f'question_{question.id}')
             
-            # Update or create response
-            response, created = TestResponse.objects.update_or_create(
-                attempt=attempt,
-                question=question,
-                defaults={
-                    'selected_option': selected_option,
-                    'is_correct': is_correct,
-                }
+            if selected_option:
+                is_correct = selected_option == question.correct_option
+                if is_correct:
+                    total_score += question.marks
+                responses.append(TestResponse(
+                    attempt=attempt,
+                    question=question,
+                    selected_option=selected_option,
+                    is_correct=is_correct,
+                ))
+        
+        # Upsert all responses in one INSERT ... ON CONFLICT statement
+        TestResponse.objects.bulk_create(
+            responses,
+            update_conflicts=True,
+            unique_fields=['attempt', 'question'],
+            update_fields=['selected_option', 'is_correct'],
+        )
+        
+        # Update attempt
+        attempt.status = 'completed'
+        attempt.score = total_score
+        if attempt.draw is None:
+            attempt.total_marks = test.total_marks  # the whole bank, as it is now
+        attempt.percentage = (total_score / attempt.total_marks * 100) if attempt.total_marks > 0 else 0
+        attempt.completed_at = timezone.now()
+        attempt.time_taken = attempt.completed_at - attempt.started_at
+        attempt.save()
+        
+        # Check if test passed and mark experiment as completed
+        if attempt.is_passed:
+            progress, created = LabProgress.objects.get_or_create(
+                student=request.user,
+                experiment=experiment,
+                defaults={'status': 'completed', 'completed_at': timezone.now()}
             )
+            
+            if not created:
+                progress.status = 'completed'
+                progress.completed_at = timezone.now()
+                progress.save()
     
-    # Update attempt
-    attempt.status = 'completed'
-    attempt.score = total_score
-    attempt.percentage = (total_score / test.total_marks * 100) if test.total_marks > 0 else 0
-    attempt.completed_at = timezone.now()
-    attempt.time_taken = attempt.completed_at - attempt.started_at
-    attempt.save()
+    # Results and dashboards must reflect this submission immediately
+    pin_to_primary(request)
     
-    # Check if test passed and mark experiment as completed
     if attempt.is_passed:
-        # Mark experiment as completed
-        progress, created = LabProgress.objects.get_or_create(
-            student=request.user,
-            experiment=experiment,
-            defaults={'status': 'completed', 'completed_at': timezone.now()}
-        )
-        
-        if not created:
-            progress.status = 'completed'
-            progress.completed_at = timezone.now()
-            progress.save()
-        
         messages.success(request, f'Congratulations! You passed the test with {attempt.percentage:.1f}% and completed the experiment!')
     else:
-        messages.warning(request, f'You scored {total_score}/{test.total_marks} ({attempt.percentage:.1f}%). You need {test.passing_marks} marks to pass and complete the experiment.')
+        passing_marks = passing_marks_for(attempt.total_marks, test)
+        messages.warning(request, f'You scored {total_score}/{attempt.total_marks} ({attempt.percentage:.1f}%). You need {passing_marks} marks to pass and complete the experiment.')
     
     return redirect('lab_app:experiment_test_result', experiment_id=experiment.id)
 
+def _experiment_test_result_version(request, experiment_id):
+    test = Test.objects.filter(experiment_id=experiment_id).values_list(
+        'id', 'subject_id', 'updated_at', 'experiment__updated_at', 'subject__updated_at'
+    ).first()
+    if test is None:
+        return None
+    attempt = (
+        TestAttempt.objects.filter(student=request.user, test_id=test[0], status='completed')
+        .order_by('-completed_at').values_list('id', flat=True).first()
+        or ArchivedAttempt.objects.filter(student=request.user, test_id=test[0]).values_list('attempt_id', flat=True).first()
+    )
+    # Standings move with other students' attempts; the boards are cached
+    test_board = leaderboard.get_test_board(test[0])
+    standings = (
+        leaderboard.get_rank(test_board, request.user.id),
+        leaderboard.get_rank(leaderboard.get_subject_board(test[1]), request.user.id),
+        leaderboard.top_entries(test_board),
+    )
+    return (test, attempt, standings, _profile_version(request.user)), None
+
 @login_required
+@conditional_page(_experiment_test_result_version)
 def experiment_test_result(request, experiment_id):
     """View showing experiment test results"""
     experiment = get_object_or_404(Experiment, id=experiment_id)
@@ -462,20 +598,23 @@ def experiment_test_result(request, experiment_id):
         status='completed'
     ).order_by('-completed_at').first()
     
-    if not attempt:
-        messages.error(request, 'You have not completed this test yet.')
-        return redirect('lab_app:experiment_detail', experiment_id=experiment.id)
-    
-    if attempt.status != 'completed':
-        messages.error(request, 'Test not completed yet.')
-        return redirect('lab_app:experiment_test', experiment_id=experiment.id)
-    
-    # Get detailed responses
-    responses = TestResponse.objects.filter(attempt=attempt).select_related('question').order_by('question__order')
+    if attempt:
+        # Get detailed responses
+        responses = TestResponse.objects.filter(attempt=attempt).select_related('question').order_by('question__order')
+        
+        # Calculate statistics
+        total_questions = responses.count()
+        correct_answers = responses.filter(is_correct=True).count()
+    else:
+        # Older attempts may have been archived; read their responses back
+        attempt = ArchivedAttempt.objects.filter(student=request.user, test=test).first()
+        if not attempt:
+            messages.error(request, 'You have not completed this test yet.')
+            return redirect('lab_app:experiment_detail', experiment_id=experiment.id)
+        responses = archived_responses(attempt)
+        total_questions = len(responses)
+        correct_answers = sum(1 for r in responses if r.is_correct)
     
-    # Calculate statistics
-    total_questions = responses.count()
-    correct_answers = responses.filter(is_correct=True).count()
     incorrect_answers = total_questions - correct_answers
     
     # Get experiment progress
@@ -484,6 +623,20 @@ def experiment_test_result(request, experiment_id):
     except LabProgress.DoesNotExist:
         progress = None
     
+    # Leaderboard standing from the cached rankings
+    test_board = leaderboard.get_test_board(test.id)
+    test_rank, test_rank_total = leaderboard.get_rank(test_board, request.user.id)
+    subject_rank, subject_rank_total = leaderboard.get_rank(
+        leaderboard.get_subject_board(test.subject_id), request.user.id
+    )
+    top_entries = leaderboard.top_entries(test_board)
+    names = dict(UserProfile.objects.filter(
+        user_id__in=[entry['student_id'] for entry in top_entries]
+    ).values_list('user_id', 'full_name'))
+    for entry in top_entries:
+        entry['name'] = names.get(entry['student_id']) or 'Student'
+        entry['is_current_user'] = entry['student_id'] == request.user.id
+    
     context = {
         'experiment': experiment,
         'test': test,
@@ -496,66 +649,141 @@ def experiment_test_result(request, experiment_id):
         'incorrect_answers': incorrect_answers,
         'progress': progress,
         'profile': request.user.profile,
+        'test_rank': test_rank,
+        'test_rank_total': test_rank_total,
+        'subject_rank': subject_rank,
+        'subject_rank_total': subject_rank_total,
+        'leaderboard': top_entries,
     }
     return render(request, 'experiment_test_result.html', context)
 
-@login_required
-def student_progress(request):
+HISTORY_PAGE_SIZE = 10
+
+@async_login_required
+@read_from_replica
+async def student_progress(request):
     """View showing student's overall progress and test insights"""
-    if not hasattr(request.user, 'profile') or request.user.profile.role != 'student':
+    profile = await _get_profile(request.user)
+    if profile is None or profile.role != 'student':
         messages.error(request, 'Access denied.')
         return redirect('lab_app:dashboard')
     
-    profile = request.user.profile
-    
-    # Get all test attempts
-    attempts = TestAttempt.objects.filter(
-        student=request.user,
-        status='completed'
-    ).select_related('test__subject').order_by('-completed_at')
-    
-    # Calculate average score
-    if attempts:
-        avg_score = attempts.aggregate(avg=Avg('percentage'))['avg']
-        avg_score = round(avg_score, 1) if avg_score else 0
-    else:
-        avg_score = 0
-    
-    # Group attempts by subject
-    subject_stats = {}
-    for attempt in attempts:
-        subject_name = attempt.test.subject.name
-        if subject_name not in subject_stats:
-            subject_stats[subject_name] = {
-                'attempts': [],
-                'total_score': 0,
-                'total_tests': 0,
-                'avg_score': 0
-            }
-        
-        subject_stats[subject_name]['attempts'].append(attempt)
-        subject_stats[subject_name]['total_score'] += attempt.percentage
-        subject_stats[subject_name]['total_tests'] += 1
-    
-    # Calculate average for each subject
-    for subject_name, stats in subject_stats.items():
-        stats['avg_score'] = round(stats['total_score'] / stats['total_tests'], 1)
-    
-    # Get experiment progress
-    experiment_progress = LabProgress.objects.filter(student=request.user).select_related('experiment__subject')
-    total_experiments = experiment_progress.count()
-    completed_experiments = experiment_progress.filter(status='completed').count()
+    # Older history pages continue after the last attempt of the previous one
+    cursor = None
+    if request.GET.get('cursor'):
+        try:
+            cursor = decode_cursor(request.GET['cursor'], (datetime, int))
+        except ValueError:
+            return redirect('lab_app:student_progress')
+    
+    # Per-subject stats are grouped in the database and the history is one
+    # keyset page, so the page costs the same queries for any history length
+    subject_stats, history, progress_counts = await gather_queries(
+        lambda: subject_attempt_stats(request.user),
+        lambda: attempt_history(
+            request.user, ('score', 'total_marks', 'percentage', 'time_taken', 'test__experiment_id'),
+            {'test_title': F('test__title'), 'subject_name': F('test__subject__name')},
+            cursor=cursor, limit=HISTORY_PAGE_SIZE,
+        ),
+        lambda: LabProgress.objects.filter(student=request.user).aggregate(
+            total=Count('id'),
+            completed=Count('id', filter=Q(status='completed')),
+        ),
+    )
     
+    total_test_attempts = sum(stats['attempts'] for stats in subject_stats)
+    avg_score = round(
+        sum(stats['total_score'] for stats in subject_stats) / total_test_attempts, 1
+    ) if total_test_attempts else 0
+    next_cursor = None
+    if len(history) > HISTORY_PAGE_SIZE:
+        history = history[:HISTORY_PAGE_SIZE]
+        next_cursor = encode_cursor(history[-1]['completed_at'], history[-1]['id'])
+    
+    total_experiments = progress_counts['total']
+    completed_experiments = progress_counts['completed']
     experiment_completion_rate = (completed_experiments / total_experiments * 100) if total_experiments > 0 else 0
     
     context = {
         'profile': profile,
-        'attempts': attempts[:10],  # Recent 10 attempts
+        'attempts': history,
+        'next_cursor': next_cursor,
+        'is_first_page': cursor is None,
         'avg_score': avg_score,
         'subject_stats': subject_stats,
         'total_experiments': total_experiments,
         'completed_experiments': completed_experiments,
         'experiment_completion_rate': round(experiment_completion_rate, 1),
-        'total_test_attempts': attempts.count(),
+        'total_test_attempts': total_test_attempts,
+    }
+    return await sync_to_async(render)(request, 'tests/student_progress.html', context)
+
+@login_required
+@user_passes_test(is_admin)
+@read_from_replica
+def cohort_analytics(request):
+    """Staff view of cohort rollups; reads only the pre-computed aggregates"""
+    if request.method == 'POST':
+        rows = build_cohort_rollups()
+        messages.success(request, f'Analytics refreshed ({rows} rollup rows).')
+        return redirect('lab_app:cohort_analytics')
+    
+    rollups = CohortRollup.objects.select_related('subject')
+    
+    filters = {
+        'branch': request.GET.get('branch', ''),
+        'semester': request.GET.get('semester', ''),
+        'division': request.GET.get('division', ''),
+    }
+    if filters['branch']:
+        rollups = rollups.filter(branch=filters['branch'])
+    if filters['semester'].isdigit():
+        rollups = rollups.filter(semester=int(filters['semester']))
+    if filters['division']:
+        rollups = rollups.filter(division=filters['division'])
+    if request.GET.get('scope') == 'subjects':
+        rollups = rollups.filter(subject__isnull=False)
+    else:
+        rollups = rollups.filter(subject__isnull=True)
+    
+    rollups = list(rollups)
+    context = {
+        'rollups': rollups,
+        'filters': filters,
+        'scope': request.GET.get('scope', 'cohorts'),
+        'branch_choices': UserProfile.BRANCH_CHOICES,
+        'semester_choices': UserProfile.SEMESTER_CHOICES,
+        'computed_at': rollups[0].computed_at if rollups else None,
+    }
+    return render(request, 'analytics/cohort_analytics.html', context)
+
+@login_required
+@user_passes_test(is_admin)
+def admission_metrics(request):
+    """Staff JSON view of admission control counters and limits"""
+    return JsonResponse({'limiters': admission.metrics()})
+
+
+@login_required
+@read_from_replica
+def search_content(request):
+    """Full-text search over the lab content available to the student"""
+    query = request.GET.get('q', '').strip()[:200]
+    profile = getattr(request.user, 'profile', None)
+    
+    results = []
+    if query:
+        if profile is not None and profile.role == 'student' and not request.user.is_staff:
+            results = search.search(query, branch=profile.branch, semester=profile.current_semester)
+        else:
+            results = search.search(query)
+    
+    for result in results:
+        experiment_id = result['object_id'] if result['kind'] == search.KIND_EXPERIMENT else result['parent_id']
+        result['experiment_id'] = experiment_id
+    
+    context = {
+        'query': query,
+        'results': results,
     }
-    return render(request, 'tests/student_progress.html', context)
+    return render(request, 'search_results.html', context)
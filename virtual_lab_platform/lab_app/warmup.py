@@ -0,0 +1,134 @@
+"""
+Worker warm-up.
+
+A fresh worker pays on its first requests for everything that is loaded
+lazily: the URL resolver imports every view module (allauth's included),
+templates are compiled, the markdown filter imports its extensions and
+Pygments imports lexers (every lexer, when a code block has no language
+and one is guessed) and the highlight style, and the first queries fill
+the content type and site caches. ``warm_up`` does all of that once, when
+wsgi.py or asgi.py loads the application, so the worker is warm before it
+accepts connections. It also builds the cached leaderboards of the
+recently created tests, which the test pages share with every worker.
+
+Each step is timed; a failing step is logged and skipped, so a worker
+still starts when, say, the database is briefly unavailable. ``/readyz``
+then runs the failed steps again (``retry_failed``) and keeps the worker
+out of rotation until every one has succeeded. Database connections are
+closed at the end, so a server that loads the application before
+forking (gunicorn ``--preload``) does not share them between workers.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Leaderboards built at start-up, newest tests first
+LEADERBOARD_WARMUP_LIMIT = 50
+
+# Renders code blocks with and without a language, the second one making
+# Pygments guess the lexer, which imports all of them
+SAMPLE_MARKDOWN = """# Sample
+
+Text with *emphasis*, a [link](https://example.com) and a table:
+
+| a | b |
+|---|---|
+| 1 | 2 |
+
+```python
+print("hello")
+```
+
+```
+int main(void) { return 0; }
+```
+"""
+
+STATUS = {'finished': False, 'steps': {}, 'errors': {}}
+
+
+def _resolve_urls():
+    from django.urls import reverse
+
+    for name in ('lab_app:dashboard', 'account_login', 'admin:index'):
+        reverse(name)
+
+
+def _compile_templates():
+    from django.template.loader import get_template
+
+    root = os.path.join(settings.BASE_DIR, 'lab_app', 'templates')
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            name = os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, '/')
+            # The export templates are only used by export_static_site
+            if filename.endswith('.html') and not name.startswith('static_export/'):
+                get_template(name)
+
+
+def _render_markdown():
+    from .templatetags.markdown_extras import markdown_format
+
+    markdown_format(SAMPLE_MARKDOWN)
+
+
+def _prime_database():
+    from django.apps import apps
+    from django.contrib.contenttypes.models import ContentType
+    from django.contrib.sites.models import Site
+
+    ContentType.objects.get_for_models(*apps.get_models())
+    Site.objects.get_current()
+
+
+def _prime_leaderboards():
+    from . import leaderboard
+    from .models import Test
+
+    tests = Test.objects.filter(is_active=True, subject__is_active=True).order_by('-created_at')
+    for test_id in tests.values_list('id', flat=True)[:LEADERBOARD_WARMUP_LIMIT]:
+        leaderboard.get_test_board(test_id)
+
+
+STEPS = (
+    ('urls', _resolve_urls),
+    ('templates', _compile_templates),
+    ('markdown', _render_markdown),
+    ('database', _prime_database),
+    ('leaderboards', _prime_leaderboards),
+)
+
+
+def _run(name, step):
+    start = time.perf_counter()
+    try:
+        step()
+    except Exception as e:
+        logger.exception('Warm-up step %s failed', name)
+        STATUS['errors'][name] = str(e)
+    else:
+        STATUS['errors'].pop(name, None)
+        STATUS['steps'][name] = round(time.perf_counter() - start, 4)
+
+
+def warm_up():
+    """Run every warm-up step; returns {step: seconds} for the ones that succeeded"""
+    from django.db import connections
+
+    for name, step in STEPS:
+        _run(name, step)
+    connections.close_all()
+    STATUS['finished'] = True
+    return dict(STATUS['steps'])
+
+
+def retry_failed():
+    """Run the steps that failed again; returns whether none is failing now"""
+    for name, step in STEPS:
+        if name in STATUS['errors']:
+            _run(name, step)
+    return not STATUS['errors']
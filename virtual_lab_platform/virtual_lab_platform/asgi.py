@@ -3,6 +3,21 @@ ASGI config for virtual_lab_platform project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The read-heavy student pages (dashboard, subject list, experiment detail
+and progress) are ``async def`` views that run their independent queries
+concurrently, so they benefit from being served natively under ASGI:
+
+    uvicorn virtual_lab_platform.asgi:application --workers 4
+    # or: gunicorn virtual_lab_platform.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
+The remaining views are sync and run in Django's thread-sensitive executor,
+one thread per request. Those threads do not outlive the request, so
+persistent connections would pile up: set DB_CONN_MAX_AGE=0 and put
+PgBouncer in front of PostgreSQL (DB_POOLER=pgbouncer) instead.
+
+``python manage.py benchmark_asgi`` compares this handler with the WSGI
+one (wsgi.py) on the same pages.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -14,3 +29,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'virtual_lab_platform.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.WARM_UP_WORKERS:
+    from lab_app.warmup import warm_up
+
+    warm_up()
@@ -10,11 +10,18 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.urls import reverse_lazy
+from dotenv import load_dotenv
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Deployment settings can be provided through a .env file (see .env.example)
+load_dotenv(BASE_DIR / '.env')
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
@@ -94,12 +101,69 @@ WSGI_APPLICATION = 'virtual_lab_platform.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+def env_bool(name, default=False):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes')
+
+# DB_ENGINE=postgresql switches to the PostgreSQL profile; anything else
+# keeps SQLite. Set SQLITE_TUNED=1 for the concurrent-writer SQLite
+# profile: WAL journaling, busy timeout and BEGIN IMMEDIATE write
+# transactions (see lab_app/backends/sqlite3/base.py)
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite')
+SQLITE_TUNED = env_bool('SQLITE_TUNED')
+
+if DB_ENGINE == 'postgresql':
+    # DB_POOLER=pgbouncer for a transaction-pooling PgBouncer in front of
+    # PostgreSQL: server-side cursors do not survive across pooled
+    # transactions there.
+    DB_POOLER = os.environ.get('DB_POOLER', '')
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'vlab'),
+            'USER': os.environ.get('DB_USER', 'vlab'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # Persistent connections, re-validated before each request reuses them
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': DB_POOLER == 'pgbouncer',
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5')),
+                'application_name': 'virtual_lab_platform',
+                'sslmode': os.environ.get('DB_SSLMODE', 'prefer'),
+            },
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'lab_app.backends.sqlite3' if SQLITE_TUNED else 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {'timeout': 20} if SQLITE_TUNED else {},
+        }
+    }
+
+# Read replica: DB_REPLICA_HOST for PostgreSQL, DB_REPLICA_NAME (a database
+# file) for SQLite. Read-heavy views send their queries there through
+# lab_app.routers; the rest of the settings are copied from the primary.
+if os.environ.get('DB_REPLICA_HOST') or os.environ.get('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.environ.get('DB_REPLICA_HOST', DATABASES['default'].get('HOST', '')),
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default'].get('PORT', '')),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['lab_app.routers.PrimaryReplicaRouter']
+
+# Seconds a user keeps reading from the primary after writing
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '10'))
+
+# Worker threads the async views use to run independent queries
+# concurrently; each holds its own database connection
+ASYNC_QUERY_WORKERS = int(os.environ.get('ASYNC_QUERY_WORKERS', '8'))
 
 
 # Password validation
@@ -144,6 +208,32 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Profile pictures: larger uploads are rejected; stored originals are
+# re-encoded without EXIF data and scaled to fit PROFILE_PICTURE_MAX_SIDE,
+# and square thumbnails are built for each size (see lab_app/thumbnails.py)
+PROFILE_PICTURE_MAX_UPLOAD_BYTES = int(os.environ.get('PROFILE_PICTURE_MAX_UPLOAD_BYTES', 5 * 1024 * 1024))
+PROFILE_PICTURE_MAX_SIDE = 1024
+PROFILE_THUMBNAIL_SIZES = (40, 80, 160)
+
+# Where `manage.py export_static_site` writes the offline/CDN bundle
+STATIC_EXPORT_ROOT = os.environ.get('STATIC_EXPORT_ROOT', BASE_DIR / 'static_export')
+
+# Admission control (see lab_app/admission.py): per limited view and scope,
+# `rate` requests per second on average in bursts of up to `burst`, and at
+# most `concurrency` at a time; 0 turns a limit off. The counters live in
+# the cache, so configure a shared cache when running several processes.
+ADMISSION_CONTROL = {
+    'experiment_test': {
+        'rate': float(os.environ.get('ADMISSION_TEST_RATE', 20)),
+        'burst': int(os.environ.get('ADMISSION_TEST_BURST', 60)),
+        'concurrency': int(os.environ.get('ADMISSION_TEST_CONCURRENCY', 30)),
+    },
+}
+
+# Preload lazily imported modules and prime caches when wsgi.py/asgi.py load
+# the application, before the worker serves requests (see lab_app/warmup.py)
+WARM_UP_WORKERS = os.environ.get('WARM_UP_WORKERS', '1') == '1'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -173,26 +263,15 @@ ACCOUNT_RATE_LIMITS = {
     'login_failed': '5/5m',  # 5 failed attempts in 5 minutes
 }
 
-# Import app-specific settings from lab_app
-try:
-    from lab_app.settings import ACCOUNT_FORMS, ACCOUNT_ADAPTER, LOGIN_URL, LOGIN_REDIRECT_URL, LOGOUT_REDIRECT_URL
-    # Apply the imported settings
-    ACCOUNT_FORMS = ACCOUNT_FORMS
-    ACCOUNT_ADAPTER = ACCOUNT_ADAPTER
-    LOGIN_URL = LOGIN_URL
-    LOGIN_REDIRECT_URL = LOGIN_REDIRECT_URL
-    LOGOUT_REDIRECT_URL = LOGOUT_REDIRECT_URL
-except ImportError:
-    # Default settings if lab_app.settings is not available
-    LOGIN_URL = '/accounts/login/'
-    LOGIN_REDIRECT_URL = '/dashboard/'
-    LOGOUT_REDIRECT_URL = '/'
-    # Set custom forms directly if import fails
-    ACCOUNT_FORMS = {
-        'login': 'lab_app.forms.CustomLoginForm',
-        'signup': 'lab_app.forms.CustomSignupForm',
-    }
-    ACCOUNT_ADAPTER = 'lab_app.adapters.CustomAccountAdapter'
+ACCOUNT_FORMS = {
+    'login': 'lab_app.forms.CustomLoginForm',
+    'signup': 'lab_app.forms.CustomSignupForm',
+}
+ACCOUNT_ADAPTER = 'lab_app.adapters.CustomAccountAdapter'
+
+LOGIN_URL = reverse_lazy('account_login')
+LOGIN_REDIRECT_URL = reverse_lazy('lab_app:dashboard')
+LOGOUT_REDIRECT_URL = reverse_lazy('lab_app:index')
 ACCOUNT_LOGOUT_REDIRECT_URL = LOGOUT_REDIRECT_URL
 
 # Email Backend (for development)
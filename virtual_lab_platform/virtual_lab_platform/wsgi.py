@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'virtual_lab_platform.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.WARM_UP_WORKERS:
+    from lab_app.warmup import warm_up
+
+    warm_up()